@@ -0,0 +1,128 @@
+"""
+Fingerprinted static assets.
+
+`url(filename)` turns `uploads/a.png` into `uploads/a.3f2a9c1b0d.png`, where
+the tag is a hash of the file's contents. Because the URL changes whenever
+the file does, responses can be cached by browsers and CDNs forever.
+
+Text assets are precompressed with gzip (and brotli when installed) next to
+the original file, e.g. `css/app.css.gz`, and the matching variant is picked
+from the request's Accept-Encoding.
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip is always available
+    brotli = None
+
+TEXT_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.svg', '.txt', '.xml', '.html', '.map'}
+MIN_COMPRESS_BYTES = 512
+HASH_LENGTH = 10
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<tag>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % HASH_LENGTH)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+class AssetPipeline:
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        # filename -> ((mtime_ns, size), tag); files are only re-hashed when they change
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def _path(self, filename):
+        path = os.path.normpath(os.path.join(self.static_folder, filename))
+        if not path.startswith(os.path.normpath(self.static_folder) + os.sep):
+            return None
+        return path
+
+    def tag(self, filename):
+        """Content hash of a static file, or None if it does not exist."""
+        path = self._path(filename)
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            return None
+        if stat is None:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._tags.get(filename)
+        if cached and cached[0] == key:
+            return cached[1]
+        tag = file_hash(path)
+        with self._lock:
+            self._tags[filename] = (key, tag)
+        return tag
+
+    def fingerprint(self, filename):
+        tag = self.tag(filename)
+        if tag is None:
+            return None
+        stem, ext = os.path.splitext(filename)
+        return f'{stem}.{tag}{ext}'
+
+    def resolve(self, fingerprinted):
+        """Maps a fingerprinted name back to `(filename, is_current)`."""
+        match = _FINGERPRINTED.match(fingerprinted)
+        if not match:
+            return fingerprinted, False
+        filename = match.group('stem') + match.group('ext')
+        return filename, self.tag(filename) == match.group('tag')
+
+    def compressed_variant(self, filename, accept_encoding):
+        """Returns `(path, encoding)` of the best precompressed copy the client accepts."""
+        path = self._path(filename)
+        if not path or os.path.splitext(filename)[1] not in TEXT_EXTENSIONS:
+            return None, None
+        accepted = {part.split(';')[0].strip() for part in (accept_encoding or '').split(',')}
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            candidate = path + suffix
+            if encoding in accepted and os.path.exists(candidate) \
+                    and os.path.getmtime(candidate) >= os.path.getmtime(path):
+                return candidate, encoding
+        return None, None
+
+    def precompress(self, filename):
+        """Writes `.gz`/`.br` copies of a text asset if they are missing or stale."""
+        path = self._path(filename)
+        if not path or os.path.splitext(filename)[1] not in TEXT_EXTENSIONS:
+            return 0
+        if os.path.getsize(path) < MIN_COMPRESS_BYTES:
+            return 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        written = 0
+        compressors = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            compressors.append(('.br', lambda d: brotli.compress(d, quality=11)))
+        for suffix, compress in compressors:
+            target = path + suffix
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            tmp = f'{target}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(compress(data))
+            os.replace(tmp, target)
+            written += 1
+        return written
+
+    def build(self):
+        """Precompresses every text asset under the static folder."""
+        written = 0
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                filename = os.path.relpath(os.path.join(root, name), self.static_folder)
+                written += self.precompress(filename)
+        return written
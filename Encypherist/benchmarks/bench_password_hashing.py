@@ -0,0 +1,59 @@
+"""
+Measures password verification throughput, i.e. logins per second per core.
+
+    python benchmarks/bench_password_hashing.py
+    python benchmarks/bench_password_hashing.py --method pbkdf2:sha256:600000 --method scrypt:32768:8:1
+
+For each hash method it reports the single-threaded rate and the rate through
+PasswordHasher's pool with one worker per core.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import PasswordHasher
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--method', action='append', dest='methods',
+                        help='werkzeug hash method, may be repeated (default: werkzeug default)')
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    return parser.parse_args()
+
+
+def rate(count, fn):
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    args = parse_args()
+    print(f"{'method':28} {'1 thread/s':>12} {'pool/s':>10} {'per core/s':>12}")
+
+    for method in args.methods or [None]:
+        hasher = PasswordHasher(method=method, max_workers=args.workers, max_queue=args.logins)
+        pwhash = hasher.hash('correct horse battery staple')
+
+        single = rate(args.logins, lambda: [hasher.verify(pwhash, 'correct horse battery staple')
+                                             for _ in range(args.logins)])
+
+        # Simulate concurrent requests, each blocking on the shared pool
+        def concurrent_logins():
+            with ThreadPoolExecutor(max_workers=args.logins) as requests:
+                list(requests.map(lambda _: hasher.verify(pwhash, 'correct horse battery staple'),
+                                  range(args.logins)))
+
+        pooled = rate(args.logins, concurrent_logins)
+        cores = min(args.workers, os.cpu_count() or 1)
+        print(f"{hasher.prefix:28} {single:12.1f} {pooled:10.1f} {pooled / cores:12.1f}")
+
+
+if __name__ == '__main__':
+    main()
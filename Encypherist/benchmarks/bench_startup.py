@@ -0,0 +1,145 @@
+"""
+Measures worker cold start: the time to import the app and the memory it
+holds afterwards, and how much of that memory preloaded workers share.
+
+    python benchmarks/bench_startup.py
+    git worktree add /tmp/encypherist-before <commit>
+    python benchmarks/bench_startup.py --root /tmp/encypherist-before/Encypherist
+
+Every run imports `app` in a fresh interpreter, like a gunicorn worker
+without --preload does. `first use` is the extra time to import the libraries
+only some routes need (qrcode, reportlab, the PayPal client, Pillow), which a
+worker pays on its first ticket, report or payment when they are lazy.
+The preload section imports the app once, forks --workers children and reads
+each child's private and shared memory from /proc (Linux only). Point --root
+at an older checkout to get the "before" numbers on the same machine.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['qrcode', 'reportlab.pdfgen.canvas', 'reportlab.lib.pagesizes', 'paypalrestsdk', 'requests', 'PIL.Image']
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = r'''
+import gc, importlib, json, os, signal, sys, time
+
+def rss_kb(pid='self'):
+    with open(f'/proc/{pid}/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+
+def rollup_kb(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    shared = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    return private, shared
+
+def import_heavy():
+    start = time.perf_counter()
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    return time.perf_counter() - start
+
+HEAVY_MODULES = json.loads(sys.argv[2])
+mode, workers = sys.argv[1], int(sys.argv[3])
+baseline_kb = rss_kb()
+start = time.perf_counter()
+import app
+result = {'import_s': time.perf_counter() - start, 'rss_kb': rss_kb(), 'baseline_kb': baseline_kb}
+
+if mode == 'cold':
+    result['first_use_s'] = import_heavy()
+    result['rss_after_first_use_kb'] = rss_kb()
+else:
+    import_heavy()
+    result['rss_after_first_use_kb'] = rss_kb()
+    gc.freeze()
+    children = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            # Simulate a worker settling in: one GC pass over everything it inherited
+            gc.collect()
+            os.write(write_fd, b'x')
+            time.sleep(60)
+            os._exit(0)
+        os.close(write_fd)
+        os.read(read_fd, 1)
+        children.append(pid)
+    memory = [rollup_kb(pid) for pid in children]
+    for pid in children:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    result['worker_private_kb'] = [private for private, _ in memory]
+    result['worker_shared_kb'] = [shared for _, shared in memory]
+print(json.dumps(result))
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--root', default=ROOT, help='directory containing app.py (default: this checkout)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    return parser.parse_args()
+
+
+def probe(root, mode, workers=0):
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.db')
+    # Keep the project's .env from pointing the benchmark at a real database
+    env['PYTHON_DOTENV_DISABLED'] = '1'
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, mode, json.dumps(HEAVY_MODULES), str(workers)],
+        cwd=root, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    args = parse_args()
+    runs = [probe(args.root, 'cold') for _ in range(args.runs)]
+
+    def median(key):
+        return statistics.median(run[key] for run in runs)
+
+    print(f"cold start ({args.runs} runs, median) for {args.root}")
+    print(f"  import app        {median('import_s') * 1000:9.1f} ms")
+    print(f"  RSS after import  {median('rss_kb') / 1024:9.1f} MiB "
+          f"(interpreter alone {median('baseline_kb') / 1024:.1f} MiB)")
+    print(f"  first use         {median('first_use_s') * 1000:9.1f} ms, "
+          f"RSS then {median('rss_after_first_use_kb') / 1024:.1f} MiB")
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("preload: skipped, needs /proc/<pid>/smaps_rollup")
+        return
+    preload = probe(args.root, 'preload', args.workers)
+    private = statistics.mean(preload['worker_private_kb']) / 1024
+    shared = statistics.mean(preload['worker_shared_kb']) / 1024
+    print(f"preload ({args.workers} forked workers, mean)")
+    print(f"  private per worker {private:8.1f} MiB")
+    print(f"  shared per worker  {shared:8.1f} MiB")
+    # Without preload the master never imports the app and every worker holds its own copy
+    print(f"  total, master + workers {preload['rss_after_first_use_kb'] / 1024 + private * args.workers:8.1f} MiB "
+          f"(without preload {median('rss_after_first_use_kb') / 1024 * args.workers:.1f} MiB)")
+
+
+if __name__ == '__main__':
+    main()
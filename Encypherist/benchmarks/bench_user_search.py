@@ -0,0 +1,90 @@
+"""
+Benchmarks user search and login lookups against a large user table.
+
+    python benchmarks/bench_user_search.py --users 1000000
+    python benchmarks/bench_user_search.py --database-url postgresql://... --users 1000000
+
+Without --database-url a throwaway SQLite file is used. The table is seeded
+with bulk inserts, then each lookup is timed over --repeat runs.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--database-url')
+    return parser.parse_args()
+
+
+def seed_users(db, User, count, batch_size=50_000):
+    # One placeholder hash for everyone; hashing a million passwords is not what we measure
+    password = 'pbkdf2:sha256:600000$bench$' + '0' * 64
+    table = User.__table__
+    for start in range(0, count, batch_size):
+        rows = [{
+            'username': f'student{i:07d}@college.edu',
+            'password': password,
+            'role': 'organizer' if i % 10 == 0 else 'student',
+        } for i in range(start, min(start + batch_size, count))]
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'mean_ms': statistics.mean(samples),
+        'p50_ms': samples[len(samples) // 2],
+        'p95_ms': samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_users.db')
+    os.environ['DATABASE_URL'] = database_url
+    # Keep the project's .env from pointing the benchmark at a real database
+    os.environ['PYTHON_DOTENV_DISABLED'] = '1'
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app import app
+    from extensions import db
+    from models import User, search_users, username_exists
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        start = time.perf_counter()
+        seed_users(db, User, args.users)
+        print(f"Seeded {args.users:,} users in {time.perf_counter() - start:.1f}s")
+
+        middle = f'student{args.users // 2:07d}@college.edu'
+        cases = {
+            'search: short prefix': lambda: search_users('st'),
+            'search: trigram substring': lambda: search_users(f'{args.users // 2:07d}'),
+            'search: no match': lambda: search_users('nobody-here'),
+            'login: user by username': lambda: User.query.filter_by(username=middle).first(),
+            'register: username_exists': lambda: username_exists(middle),
+        }
+
+        print(f"{'case':32} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+        for name, fn in cases.items():
+            result = timed(fn, args.repeat)
+            print(f"{name:32} {result['mean_ms']:10.3f} {result['p50_ms']:10.3f} {result['p95_ms']:10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+A local stand-in for PayPal's REST API, for trying out and load testing
+payments without a sandbox account.
+
+    python benchmarks/fake_paypal.py --port 8001 --latency 0.2 --fail-rate 0.05
+    PAYPAL_API_URL=http://127.0.0.1:8001 gunicorn --worker-class gevent app:app
+
+It answers the calls payments.py makes: an OAuth token, executing a payment,
+looking one up and verifying a webhook signature. Any payment id is accepted
+and approved, and every webhook signature checks out. Executing the
+same payment twice returns PAYMENT_ALREADY_DONE, like PayPal does.
+--latency delays every response, --fail-rate answers that share of calls
+with a 503, and --hang-rate never answers them (until the client's read
+timeout), which is what trips the app's circuit breaker.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAYMENT_PATH = re.compile(r'^/v1/payments/payment/([^/]+)(/execute)?$')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of calls answered with a 503')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='share of calls that never get an answer')
+    return parser.parse_args()
+
+
+class FakePayPal(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive, as they would with PayPal
+    protocol_version = 'HTTP/1.1'
+    options = None
+    executed = set()
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def simulate_provider(self):
+        """Applies latency and failures; returns False if the call was already answered."""
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if random.random() < self.options.hang_rate:
+            time.sleep(3600)
+        time.sleep(self.options.latency)
+        if random.random() < self.options.fail_rate:
+            self.send_json(503, {'name': 'SERVICE_UNAVAILABLE', 'message': 'Simulated outage'})
+            return False
+        return True
+
+    def payment(self, payment_id, state='approved'):
+        return {'id': payment_id, 'intent': 'sale', 'state': state}
+
+    def do_POST(self):
+        if not self.simulate_provider():
+            return
+        if self.path == '/v1/oauth2/token':
+            return self.send_json(200, {'access_token': 'fake-token', 'token_type': 'Bearer', 'expires_in': 32400})
+        if self.path == '/v1/notifications/verify-webhook-signature':
+            return self.send_json(200, {'verification_status': 'SUCCESS'})
+
+        match = PAYMENT_PATH.match(self.path)
+        if not match or not match.group(2):
+            return self.send_json(404, {'name': 'NOT_FOUND'})
+        payment_id = match.group(1)
+        with self.lock:
+            already_done = payment_id in self.executed
+            self.executed.add(payment_id)
+        if already_done:
+            return self.send_json(400, {'name': 'PAYMENT_ALREADY_DONE', 'message': 'Payment has been done already'})
+        self.send_json(200, self.payment(payment_id))
+
+    def do_GET(self):
+        if not self.simulate_provider():
+            return
+        match = PAYMENT_PATH.match(self.path)
+        if not match or match.group(2):
+            return self.send_json(404, {'name': 'NOT_FOUND'})
+        payment_id = match.group(1)
+        with self.lock:
+            state = 'approved' if payment_id in self.executed else 'created'
+        self.send_json(200, self.payment(payment_id, state))
+
+
+def main():
+    args = parse_args()
+    FakePayPal.options = args
+    server = ThreadingHTTPServer((args.host, args.port), FakePayPal)
+    server.daemon_threads = True
+    print(f"Fake PayPal listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
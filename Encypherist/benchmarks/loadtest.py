@@ -0,0 +1,209 @@
+"""
+End-to-end load test against a running server.
+
+    flask --app app seed --students 2000 --events 300
+    gunicorn --worker-class gevent -w 4 -b 127.0.0.1:8000 app:app
+    python benchmarks/loadtest.py --host http://127.0.0.1:8000 --users 50 --duration 60
+
+Each virtual user logs in as one of the seeded students, the way a browser
+does (GET the form, post it back with its CSRF token), then loops over
+weighted scenarios until the time is up:
+
+    browse   home page and an event's reviews
+    search   filtered home page and the user search API
+    book     booking form and booking submission
+    message  send a message and open the conversation
+    ticket   open the ticket of an event booked during the run
+
+Virtual users are greenlets (the same model Locust uses), so a single
+process can hold hundreds of concurrent sessions. At the end the p50, p95
+and p99 latency and the throughput of every request type are printed, and
+optionally saved as JSON.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import json
+import random
+import re
+import time
+from collections import defaultdict
+
+import gevent
+import requests
+
+CSRF_TOKEN = re.compile(r'name="csrf_token" value="([^"]+)"')
+BOOKING_LINK = re.compile(r'/book_event/(\d+)')
+
+SCENARIOS = {'browse': 5, 'search': 3, 'book': 1, 'message': 2, 'ticket': 1}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run after ramp-up')
+    parser.add_argument('--ramp-up', type=float, default=5, help='seconds over which users start')
+    parser.add_argument('--think-time', type=float, default=0.5, help='mean pause between scenarios, in seconds')
+    parser.add_argument('--students', type=int, default=1000, help='seeded students to log in as')
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--output', help='save the report as JSON')
+    return parser.parse_args()
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.failures = defaultdict(int)
+        self.started = None
+        self.finished = None
+
+    def record(self, name, seconds, ok):
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.failures[name] += 1
+
+    @staticmethod
+    def percentile(samples, q):
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+    def summary(self):
+        elapsed = (self.finished or time.time()) - self.started
+        rows = {}
+        everything = []
+        for name in sorted(self.latencies):
+            samples = self.latencies[name]
+            everything.extend(samples)
+            rows[name] = self._row(samples, self.failures[name], elapsed)
+        rows['TOTAL'] = self._row(everything, sum(self.failures.values()), elapsed)
+        return {'duration': elapsed, 'requests': rows}
+
+    def _row(self, samples, failures, elapsed):
+        if not samples:
+            return {'count': 0, 'failures': failures, 'rps': 0.0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+        return {
+            'count': len(samples),
+            'failures': failures,
+            'rps': len(samples) / elapsed,
+            'p50_ms': self.percentile(samples, 50) * 1000,
+            'p95_ms': self.percentile(samples, 95) * 1000,
+            'p99_ms': self.percentile(samples, 99) * 1000,
+        }
+
+
+class VirtualUser:
+    def __init__(self, args, stats, username):
+        self.args = args
+        self.stats = stats
+        self.username = username
+        self.session = requests.Session()
+        self.csrf_token = None
+        self.event_ids = []
+        self.booked = []
+
+    def request(self, name, method, path, expect=None, **kwargs):
+        """Times one request, redirects included; `expect` is a path the final URL must contain."""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.args.host + path, timeout=self.args.timeout, **kwargs)
+            ok = response.status_code < 400 and (expect is None or expect in response.url)
+        except requests.RequestException:
+            response, ok = None, False
+        self.stats.record(name, time.perf_counter() - start, ok)
+        return response if ok else None
+
+    def post(self, name, path, data, expect=None):
+        return self.request(name, 'POST', path, expect=expect, data=dict(data, csrf_token=self.csrf_token))
+
+    def remember_csrf(self, response):
+        match = CSRF_TOKEN.search(response.text) if response is not None else None
+        if match:
+            self.csrf_token = match.group(1)
+
+    def login(self):
+        self.remember_csrf(self.request('GET /login', 'GET', '/login'))
+        response = self.post('POST /login', '/login', {'username': self.username, 'password': self.args.password},
+                             expect='/home')
+        if response is None:
+            return False
+        self.remember_csrf(response)
+        self.event_ids = [int(i) for i in set(BOOKING_LINK.findall(response.text))]
+        return bool(self.event_ids)
+
+    def browse(self):
+        self.remember_csrf(self.request('GET /home', 'GET', '/home'))
+        self.request('GET /event_reviews/[id]', 'GET', f'/event_reviews/{random.choice(self.event_ids)}')
+
+    def search(self):
+        category = random.choice(['all', 'music', 'tech', 'sports', 'art'])
+        self.request('GET /home?search', 'GET', '/home', params={'search': 'seed', 'category': category,
+                                                                 'sort': random.choice(['date', 'price'])})
+        self.request('GET /api/users/search', 'GET', '/api/users/search', params={'q': f'student{random.randint(1, 99)}'})
+
+    def book(self):
+        event_id = random.choice(self.event_ids)
+        response = self.request('GET /book_event/[id]', 'GET', f'/book_event/{event_id}')
+        if response is None or '/book_event/' not in response.url:
+            # Already booked or sold out: the app redirected home, which is a valid answer
+            return
+        response = self.post('POST /submit_booking/[id]', f'/submit_booking/{event_id}', {
+            'name': self.username, 'email': self.username, 'mobile': '9000000000', 'branch': 'CSE', 'year': '2'
+        }, expect='/ticket/')
+        if response is not None:
+            self.booked.append(event_id)
+
+    def message(self):
+        receiver = random.randint(1, self.args.students)
+        self.post('POST /send_message/[id]', f'/send_message/{receiver}', {'content': 'Load test message'})
+        self.remember_csrf(self.request('GET /messages/[id]', 'GET', f'/messages/{receiver}'))
+
+    def ticket(self):
+        if not self.booked:
+            return self.book()
+        self.request('GET /ticket/[id]', 'GET', f'/ticket/{random.choice(self.booked)}')
+
+    def run(self, deadline):
+        if not self.login():
+            return
+        names, weights = zip(*SCENARIOS.items())
+        while time.time() < deadline:
+            getattr(self, random.choices(names, weights)[0])()
+            gevent.sleep(random.expovariate(1 / self.args.think_time) if self.args.think_time else 0)
+
+
+def print_report(summary):
+    print(f"{'request':32} {'count':>7} {'fail':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in summary['requests'].items():
+        if not row['count']:
+            continue
+        print(f"{name:32} {row['count']:7} {row['failures']:5} {row['rps']:8.1f} "
+              f"{row['p50_ms']:9.1f} {row['p95_ms']:9.1f} {row['p99_ms']:9.1f}")
+    print(f"Ran for {summary['duration']:.1f}s")
+
+
+def main():
+    args = parse_args()
+    stats = Stats()
+    stats.started = time.time()
+    deadline = stats.started + args.ramp_up + args.duration
+
+    greenlets = []
+    for i in range(args.users):
+        user = VirtualUser(args, stats, f'student{i % args.students + 1}@seed.test')
+        greenlets.append(gevent.spawn_later(args.ramp_up * i / max(args.users, 1), user.run, deadline))
+    gevent.joinall(greenlets)
+    stats.finished = time.time()
+
+    summary = stats.summary()
+    print_report(summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
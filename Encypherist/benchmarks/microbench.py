@@ -0,0 +1,306 @@
+"""
+Microbenchmarks for the app's hot functions, each timed in isolation against
+a throwaway SQLite database seeded with a fixed, deterministic data set.
+
+    python benchmarks/microbench.py run
+    python benchmarks/microbench.py run -k ticket -k report --rounds 50
+    python benchmarks/microbench.py compare benchmarks/results/3faec87.json benchmarks/results/HEAD.json
+
+`run` writes results to benchmarks/results/<commit>.json (or --output), in
+the same shape as pytest-benchmark: machine info, commit, and per-benchmark
+min/max/mean/median/stddev in seconds. `compare` matches benchmarks by name
+and exits non-zero when any median got slower by more than --threshold, so
+running it against the previous commit's results can gate a merge.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+BENCHMARKS = {}
+
+
+def benchmark(rounds=20, login=None, path='/'):
+    """
+    Registers a benchmark. The decorated function does any setup and returns
+    `(fn, teardown)`; only `fn` is timed and `teardown` (or None) runs after
+    each round to undo what `fn` changed. With `login` ('student' or 'admin')
+    everything runs in a request for `path`, logged in as that user.
+    """
+    def decorator(setup):
+        BENCHMARKS[setup.__name__] = {'setup': setup, 'rounds': rounds, 'login': login, 'path': path}
+        return setup
+    return decorator
+
+
+class Fixture:
+    """The app, seeded on a fresh SQLite file, and the ids the benchmarks use."""
+
+    def __init__(self, scale):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'microbench.db')
+        # Keep the project's .env from pointing the benchmarks at a real database
+        os.environ['PYTHON_DOTENV_DISABLED'] = '1'
+        os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+        sys.path.insert(0, ROOT)
+
+        import app as app_module
+        import models
+        from extensions import db
+        self.app = app_module.app
+        self.models = models
+        self.db = db
+        self.scale = scale
+        with self.app.app_context():
+            self.db.create_all()
+            self.seed()
+
+    def seed(self):
+        m, db = self.models, self.db
+        now = datetime.utcnow()
+        students, organizers, events = 200 * self.scale, 10 * self.scale, 100 * self.scale
+        # One placeholder hash for everyone; hashing is benchmarked on its own
+        password = 'pbkdf2:sha256:600000$bench$' + '0' * 64
+
+        users = [{'username': f'student{i}@college.edu', 'password': password, 'role': 'student'}
+                 for i in range(students)]
+        users += [{'username': f'organizer{i}@college.edu', 'password': password, 'role': 'organizer'}
+                  for i in range(organizers)]
+        users.append({'username': 'admin@college.edu', 'password': password, 'role': 'admin'})
+        db.session.execute(db.insert(m.User), users)
+        self.student_id, self.admin_id = 1, len(users)
+        organizer_ids = range(students + 1, students + organizers + 1)
+
+        db.session.execute(db.insert(m.Event), [{
+            'title': f'Event {i}', 'description': f'Description of event {i}', 'location': f'Hall {i % 7}',
+            'price': float(i % 50), 'date': now + timedelta(days=1 + i % 90),
+            'organizer_id': organizer_ids[i % organizers], 'total_tickets': 500, 'remaining_tickets': 500,
+            'category': ('music', 'tech', 'sports', 'art')[i % 4], 'status': 'approved'
+        } for i in range(events)])
+        self.event_id = 1
+
+        # Every student books a handful of events; event 1 gets 50 * scale attendees
+        bookings = [{'user_id': s, 'event_id': 1 + (s * 7 + k) % events, 'payment_status': 'succeeded',
+                     'payment_id': f'bench_{s}_{k}', 'booking_date': now - timedelta(minutes=s * 5 + k),
+                     'name': f'Student {s}', 'email': f'student{s}@college.edu', 'mobile': '9999999999',
+                     'branch': 'CSE', 'year': '2'}
+                    for s in range(1, students + 1) for k in range(3)]
+        booked_first = {b['user_id'] for b in bookings if b['event_id'] == 1}
+        bookings += [{'user_id': s, 'event_id': 1, 'payment_status': 'succeeded', 'payment_id': f'bench_{s}_first',
+                      'booking_date': now, 'name': f'Student {s}', 'email': f'student{s}@college.edu',
+                      'mobile': '9999999999', 'branch': 'CSE', 'year': '2'}
+                     for s in range(1, 50 * self.scale + 1) if s not in booked_first]
+        db.session.execute(db.insert(m.Booking), bookings)
+
+        # The benchmarked student talks to 40 people, 20 messages each
+        db.session.execute(db.insert(m.Message), [{
+            'sender_id': self.student_id if n % 2 else partner, 'receiver_id': partner if n % 2 else self.student_id,
+            'content': f'Message {n}', 'timestamp': now - timedelta(minutes=partner * 20 + n), 'read': n % 3 == 0
+        } for partner in range(2, 42) for n in range(20)])
+
+        db.session.execute(db.insert(m.NotificationPreference), [{'user_id': i} for i in range(1, len(users) + 1)])
+        db.session.commit()
+
+    @contextmanager
+    def context(self, login, path):
+        """An app context, or a request for `path` logged in as `login`."""
+        if not login:
+            with self.app.app_context():
+                yield
+            return
+        from flask_login import login_user
+        with self.app.test_request_context(path):
+            login_user(self.db.session.get(self.models.User, self.student_id if login == 'student' else self.admin_id))
+            yield
+
+    def delete_all(self, model):
+        self.db.session.query(model).delete()
+        self.db.session.commit()
+
+
+@benchmark(rounds=50)
+def ticket_render(fx):
+    from blueprints.tickets import render_ticket
+    booking = fx.models.Booking.query.filter_by(event_id=fx.event_id).first()
+    return (lambda: render_ticket(booking.event, booking)), None
+
+
+@benchmark(rounds=20, login='student', path='/messages')
+def conversations_list(fx):
+    from blueprints.messaging import get_conversations_and_users
+    return get_conversations_and_users, None
+
+
+@benchmark(rounds=50)
+def home_query_date(fx):
+    from blueprints.events import filtered_events_query
+    return (lambda: filtered_events_query(datetime.utcnow(), '', 'all', None, None, None, None, 'date').all()), None
+
+
+@benchmark(rounds=50)
+def home_query_filtered(fx):
+    from blueprints.events import filtered_events_query
+    return (lambda: filtered_events_query(
+        datetime.utcnow(), 'event', 'tech', 5.0, 40.0, None, None, 'popularity'
+    ).all()), None
+
+
+@benchmark(rounds=10, login='admin', path='/admin/generate_report?type=events')
+def generate_report_events(fx):
+    view = fx.app.view_functions['admin.generate_report']
+    # The report logs an activity row per call
+    return (lambda: b''.join(view().response)), lambda: fx.delete_all(fx.models.UserActivity)
+
+
+@benchmark(rounds=10)
+def password_hash(fx):
+    from extensions import password_hasher
+    return (lambda: password_hasher.hash('correct horse battery staple')), None
+
+
+@benchmark(rounds=10)
+def password_verify(fx):
+    from extensions import password_hasher as hasher
+    pwhash = hasher.hash('correct horse battery staple')
+    return (lambda: hasher.verify(pwhash, 'correct horse battery staple')), None
+
+
+@benchmark(rounds=5, login='admin')
+def send_event_update_fanout(fx):
+    from blueprints.notifications import send_event_update
+    return (lambda: send_event_update(fx.event_id, 'Venue changed', 'Now in Hall 2')), \
+        lambda: fx.delete_all(fx.models.Notification)
+
+
+def measure(fx, spec, rounds=None, warmup=1):
+    rounds = rounds or spec['rounds']
+    samples = []
+    with fx.context(spec['login'], spec['path']):
+        fn, teardown = spec['setup'](fx)
+        for i in range(warmup + rounds):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            if i >= warmup:
+                samples.append(elapsed)
+            if teardown:
+                teardown()
+    return {
+        'min': min(samples),
+        'max': max(samples),
+        'mean': statistics.mean(samples),
+        'median': statistics.median(samples),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'rounds': len(samples),
+        'ops': 1 / statistics.mean(samples),
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD', '--', '.'], cwd=ROOT) != 0
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
+
+
+def run(args):
+    selected = [name for name in BENCHMARKS if not args.keyword or any(k in name for k in args.keyword)]
+    if not selected:
+        sys.exit(f"No benchmark matches {args.keyword}")
+
+    fx = Fixture(args.scale)
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'datetime': datetime.utcnow().isoformat(),
+        'scale': args.scale,
+        'machine_info': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+        },
+        'benchmarks': [],
+    }
+
+    print(f"{'benchmark':28} {'median ms':>10} {'mean ms':>10} {'stddev ms':>10} {'rounds':>7}")
+    for name in selected:
+        stats = measure(fx, BENCHMARKS[name], args.rounds)
+        results['benchmarks'].append({'name': name, 'stats': stats})
+        print(f"{name:28} {stats['median'] * 1000:10.3f} {stats['mean'] * 1000:10.3f} "
+              f"{stats['stddev'] * 1000:10.3f} {stats['rounds']:7}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {output}")
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    base_stats = {b['name']: b['stats'] for b in base['benchmarks']}
+
+    print(f"{base['commit']} -> {new['commit']}")
+    print(f"{'benchmark':28} {'base ms':>10} {'new ms':>10} {'change':>9}")
+    regressions = []
+    for bench in new['benchmarks']:
+        name, stats = bench['name'], bench['stats']
+        if name not in base_stats:
+            print(f"{name:28} {'-':>10} {stats['median'] * 1000:10.3f} {'new':>9}")
+            continue
+        before, after = base_stats[name]['median'], stats['median']
+        change = after / before - 1 if before else 0.0
+        # Sub-millisecond differences are noise, whatever the ratio
+        regressed = change > args.threshold and (after - before) * 1000 > args.min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:28} {before * 1000:10.3f} {after * 1000:10.3f} {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+
+    if regressions:
+        print(f"--- {len(regressions)} benchmark(s) slower than {args.threshold:.0%}: {', '.join(regressions)} ---")
+        sys.exit(1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and save the results')
+    run_parser.add_argument('-k', dest='keyword', action='append', help='only run benchmarks whose name contains this')
+    run_parser.add_argument('--rounds', type=int, help='override the number of timed rounds')
+    run_parser.add_argument('--scale', type=int, default=1, help='multiply the seeded data set')
+    run_parser.add_argument('--output', help='results file (default: benchmarks/results/<commit>.json)')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown of the median')
+    compare_parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                                help='ignore slowdowns smaller than this many milliseconds')
+    compare_parser.set_defaults(handler=compare)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+"""
+The app's routes, one blueprint per area. URLs are unchanged from the
+single-module app; endpoint names are prefixed with the blueprint, e.g.
+`url_for('auth.login')`.
+"""
+from blueprints.admin import bp as admin
+from blueprints.auth import bp as auth
+from blueprints.booking import bp as booking
+from blueprints.events import bp as events
+from blueprints.messaging import bp as messaging
+from blueprints.notifications import bp as notifications
+from blueprints.organizer import bp as organizer
+from blueprints.tickets import bp as tickets
+
+BLUEPRINTS = (auth, events, booking, tickets, messaging, notifications, organizer, admin)
@@ -0,0 +1,315 @@
+import os
+import secrets
+from io import BytesIO
+
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, redirect, render_template, request, send_file, \
+    url_for
+from flask_login import current_user, login_required
+
+from database import pool_metrics, read_only
+from extensions import compression_stats, db, route_query_stats, user_cache
+from metrics import render as render_metrics
+from models import Booking, Event, User, UserActivity, delete_bookings
+
+bp = Blueprint('admin', __name__)
+
+
+def log_user_activity(user_id, activity_type, description, ip_address=None):
+    try:
+        activity = UserActivity(
+            user_id=user_id,
+            activity_type=activity_type,
+            description=description,
+            ip_address=ip_address
+        )
+        db.session.add(activity)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error logging activity: {str(e)}")
+
+@bp.route('/admin/db_pool')
+@login_required
+def db_pool_stats():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    return jsonify({
+        'pid': os.getpid(),
+        'profile': current_app.config['DB_PROFILE'],
+        'pool': pool_metrics.snapshot(db.engine.pool)
+    })
+
+@bp.route('/admin/compression_stats')
+@login_required
+def compression_report():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    return jsonify({'pid': os.getpid(), 'routes': compression_stats.report()})
+
+@bp.route('/admin/perf')
+@login_required
+def perf_report():
+    as_json = request.args.get('format') == 'json'
+    if current_user.role != 'admin':
+        if as_json:
+            return jsonify({'error': 'Unauthorized access'}), 403
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    limit = request.args.get('limit', 20, type=int)
+    routes = route_query_stats.report(limit)
+    if as_json:
+        return jsonify({'pid': os.getpid(), 'routes': routes})
+    return render_template('admin/perf.html', pid=os.getpid(), routes=routes, limit=limit)
+
+# Prometheus scrape endpoint; requires "Authorization: Bearer <METRICS_TOKEN>"
+@bp.route('/metrics')
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        # Off unless a token is configured, so a deploy never exposes it by accident
+        abort(404)
+    if not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    body, content_type = render_metrics()
+    response = Response(body, content_type=content_type)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/clear_database', methods=['POST'])
+@login_required
+def clear_database():
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    try:
+        delete_bookings()
+        Event.query.delete()
+        User.query.filter(User.role != 'admin').delete()
+
+        db.session.commit()
+        flash('Database cleared successfully!')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error clearing database: {str(e)}')
+
+    return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/admin')
+@login_required
+@read_only
+def admin_dashboard():
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    total_users = User.query.count()
+    total_events = Event.query.count()
+    total_bookings = Booking.query.count()
+    pending_events = Event.query.filter_by(status='pending').count()
+
+    recent_activities = UserActivity.query.order_by(UserActivity.timestamp.desc()).limit(10).all()
+
+    events_by_category = db.session.query(
+        Event.category,
+        db.func.count(Event.id)
+    ).group_by(Event.category).all()
+
+    bookings_by_date = db.session.query(
+        db.func.date(Booking.booking_date),
+        db.func.count(Booking.id)
+    ).group_by(db.func.date(Booking.booking_date)).all()
+
+    return render_template(
+        'admin/dashboard.html',
+        total_users=total_users,
+        total_events=total_events,
+        total_bookings=total_bookings,
+        pending_events=pending_events,
+        recent_activities=recent_activities,
+        events_by_category=events_by_category,
+        bookings_by_date=bookings_by_date
+    )
+
+@bp.route('/admin/cache_stats')
+@login_required
+def cache_stats():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    return jsonify({'pid': os.getpid(), 'user_cache': user_cache.stats()})
+
+@bp.route('/admin/users')
+@login_required
+@read_only
+def admin_users():
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    users = User.query.all()
+    return render_template('admin_users.html', users=users)
+
+@bp.route('/admin/delete_user/<int:user_id>', methods=['POST'])
+@login_required
+def admin_delete_user(user_id):
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    if current_user.id == user_id:
+        flash('Cannot delete your own admin account')
+        return redirect(url_for('admin.admin_users'))
+
+    user = User.query.get_or_404(user_id)
+
+    delete_bookings(user_id=user_id)
+    Event.query.filter_by(organizer_id=user_id).delete()
+    db.session.delete(user)
+    db.session.commit()
+
+    flash('User deleted successfully')
+    return redirect(url_for('admin.admin_users'))
+
+@bp.route('/admin/delete_event/<int:event_id>', methods=['POST'])
+@login_required
+def admin_delete_event(event_id):
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    event = Event.query.get_or_404(event_id)
+
+    try:
+        delete_bookings(event_id=event_id)
+        db.session.delete(event)
+        db.session.commit()
+        flash('Event deleted successfully')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error deleting event: {str(e)}')
+
+    return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/admin/events')
+@login_required
+@read_only
+def admin_events():
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    events = Event.query.order_by(Event.created_at.desc()).all()
+    return render_template('admin/events.html', events=events)
+
+@bp.route('/admin/approve_event/<int:event_id>', methods=['POST'])
+@login_required
+def approve_event(event_id):
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    event = Event.query.get_or_404(event_id)
+    event.status = 'approved'
+    db.session.commit()
+
+    log_user_activity(
+        current_user.id,
+        'approve_event',
+        f'Approved event: {event.title}'
+    )
+
+    flash('Event approved successfully')
+    return redirect(url_for('admin.admin_events'))
+
+@bp.route('/admin/reject_event/<int:event_id>', methods=['POST'])
+@login_required
+def reject_event(event_id):
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    event = Event.query.get_or_404(event_id)
+    event.status = 'rejected'
+    db.session.commit()
+
+    log_user_activity(
+        current_user.id,
+        'reject_event',
+        f'Rejected event: {event.title}'
+    )
+
+    flash('Event rejected successfully')
+    return redirect(url_for('admin.admin_events'))
+
+@bp.route('/admin/activity_log')
+@login_required
+@read_only
+def activity_log():
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    page = request.args.get('page', 1, type=int)
+    activities = UserActivity.query.order_by(
+        UserActivity.timestamp.desc()
+    ).paginate(page=page, per_page=20)
+
+    return render_template('admin/activity_log.html', activities=activities)
+
+@bp.route('/admin/generate_report')
+@login_required
+@read_only
+def generate_report():
+    if current_user.role != 'admin':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    report_type = request.args.get('type', 'events')
+
+    if report_type == 'events':
+        # Loaded on first use, see render_ticket
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+
+        events = Event.query.all()
+        output = BytesIO()
+        c = canvas.Canvas(output, pagesize=letter)
+
+        y = 750
+        c.drawString(100, y, "Events Report")
+        y -= 20
+
+        for event in events:
+            c.drawString(100, y, f"Event: {event.title}")
+            y -= 15
+            c.drawString(120, y, f"Date: {event.date}")
+            y -= 15
+            c.drawString(120, y, f"Status: {event.status}")
+            y -= 15
+            c.drawString(120, y, f"Tickets: {event.remaining_tickets}/{event.total_tickets}")
+            y -= 20
+
+            if y < 50:
+                c.showPage()
+                y = 750
+
+        c.save()
+        output.seek(0)
+
+        log_user_activity(
+            current_user.id,
+            'generate_report',
+            'Generated events report'
+        )
+
+        return send_file(
+            output,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name='events_report.pdf'
+        )
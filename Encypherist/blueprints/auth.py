@@ -0,0 +1,345 @@
+import os
+import secrets
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+
+from blueprints.notifications import send_notification
+from database import read_only
+from extensions import db, image_pipeline, password_hasher
+from images import InvalidImage, is_processed_name, picture_name
+from models import Booking, Event, GroupBooking, User, username_exists
+from passwords import HasherBusy
+from query_stats import query_budget
+
+bp = Blueprint('auth', __name__)
+
+
+@bp.app_errorhandler(HasherBusy)
+def hasher_busy(e):
+    flash('The server is busy right now. Please try again in a moment.', 'error')
+    return redirect(request.url)
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        role = request.form.get('role')
+
+        if not username or not password or not role:
+            flash('Please fill in all fields')
+            return redirect(url_for('auth.register'))
+
+        if username_exists(username):
+            flash('Username already exists')
+            return redirect(url_for('auth.register'))
+
+        if len(password) < 6:
+            flash('Password must be at least 6 characters long')
+            return redirect(url_for('auth.register'))
+
+        if role not in ['student', 'organizer']:
+            flash('Invalid role selected')
+            return redirect(url_for('auth.register'))
+
+        try:
+            hashed_password = password_hasher.hash(password)
+            user = User(username=username, password=hashed_password, role=role)
+            db.session.add(user)
+            db.session.commit()
+            flash('Registration successful! Please login.')
+            return redirect(url_for('auth.login'))
+        except Exception as e:
+            db.session.rollback()
+            # This is the important change to print the specific error
+            print(f"--- REGISTRATION ERROR: {e} ---")
+            flash('An error occurred during registration. Please try again.')
+            return redirect(url_for('auth.register'))
+
+    return render_template('register.html')
+
+@bp.route('/register_student', methods=['GET', 'POST'])
+def register_student():
+    if request.method == 'POST':
+        full_name = request.form.get('full_name')
+        email = request.form.get('email')
+        college_name = request.form.get('college_name')
+        password = request.form.get('password')
+        confirm_password = request.form.get('confirm_password')
+
+        if not all([full_name, email, college_name, password, confirm_password]):
+            flash('Please fill in all fields')
+            return redirect(url_for('auth.register_student'))
+
+        if password != confirm_password:
+            flash('Passwords do not match')
+            return redirect(url_for('auth.register_student'))
+
+        if len(password) < 8:
+            flash('Password must be at least 8 characters long')
+            return redirect(url_for('auth.register_student'))
+
+        if username_exists(email):
+            flash('Email already registered')
+            return redirect(url_for('auth.register_student'))
+
+        try:
+            hashed_password = password_hasher.hash(password)
+            user = User(username=email, password=hashed_password, role='student')
+            db.session.add(user)
+            db.session.commit()
+            flash('Registration successful! Please login.')
+            return redirect(url_for('auth.login'))
+        except Exception as e:
+            db.session.rollback()
+            flash('An error occurred during registration. Please try again.')
+            return redirect(url_for('auth.register_student'))
+
+    return render_template('register_student.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+
+        if not username or not password:
+            flash('Please provide both username and password', 'error')
+            return redirect(url_for('auth.login'))
+
+        user = User.query.filter_by(username=username).first()
+
+        if user and password_hasher.verify(user.password, password):
+            if password_hasher.needs_rehash(user.password):
+                # Upgrade hashes made with older settings while we have the plaintext
+                try:
+                    user.password = password_hasher.hash(password)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error upgrading password hash: {str(e)}")
+
+            login_user(user, remember=True)
+            next_page = request.args.get('next')
+            flash('Logged in successfully!', 'success')
+
+            if user.role == 'admin':
+                return redirect(url_for('admin.admin_dashboard'))
+
+            return redirect(next_page) if next_page else redirect(url_for('events.home'))
+
+        flash('Invalid username or password', 'error')
+        return redirect(url_for('auth.login'))
+
+    return render_template('login.html')
+
+@bp.route('/logout', methods=['POST'])
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('events.landing'))
+
+def set_profile_picture(user_id, digest):
+    user = db.session.get(User, user_id)
+    if not user:
+        return
+    old_picture = user.profile_picture
+    user.profile_picture = picture_name(digest)
+    db.session.commit()
+
+    # Processed pictures may be shared by several users, only legacy files are removed
+    if old_picture and not is_processed_name(old_picture):
+        try:
+            old_file = os.path.join(image_pipeline.storage_dir, old_picture)
+            if os.path.exists(old_file):
+                os.remove(old_file)
+        except Exception as e:
+            print(f"Error deleting old profile picture: {str(e)}")
+
+def finish_profile_picture(app, user_id, future):
+    """Runs in the web process once the pool has written the thumbnails."""
+    with app.app_context():
+        try:
+            set_profile_picture(user_id, future.result())
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error processing profile picture: {str(e)}")
+
+@bp.route('/profile')
+@login_required
+@read_only
+@query_budget(5)
+def profile():
+    try:
+        now = datetime.utcnow()
+        if current_user.role == 'organizer':
+            events = Event.query.filter_by(organizer_id=current_user.id)\
+                .order_by(Event.date.desc())\
+                .all()
+
+            return render_template('organizer_profile.html',
+                                user=current_user,
+                                events=events,
+                                now=now)
+        else:
+            bookings = db.session.query(Booking)\
+                .join(Event, Booking.event_id == Event.id)\
+                .filter(Booking.user_id == current_user.id)\
+                .order_by(Booking.booking_date.desc())\
+                .all()
+            group_bookings = GroupBooking.query\
+                .filter(GroupBooking.user_id == current_user.id)\
+                .order_by(GroupBooking.booking_date.desc())\
+                .all()
+
+            return render_template('student_profile.html',
+                                user=current_user,
+                                bookings=bookings,
+                                group_bookings=group_bookings,
+                                now=now)
+
+    except Exception as e:
+        db.session.rollback()
+        flash('An error occurred while loading your profile. Please try again.')
+        return redirect(url_for('events.home'))
+
+@bp.route('/profile/edit', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    if request.method == 'POST':
+        try:
+            if 'profile_picture' in request.files:
+                file = request.files['profile_picture']
+                if file and file.filename:
+                    try:
+                        digest, pending = image_pipeline.submit(file.read())
+                    except InvalidImage as e:
+                        flash(str(e))
+                        return redirect(url_for('auth.edit_profile'))
+
+                    if pending is None:
+                        # Someone already uploaded this exact image
+                        set_profile_picture(current_user.id, digest)
+                    else:
+                        app = current_app._get_current_object()
+                        user_id = current_user.id
+                        pending.add_done_callback(lambda future: finish_profile_picture(app, user_id, future))
+                        flash('Your new profile picture is being processed and will appear shortly')
+
+            db.session.commit()
+            flash('Profile updated successfully')
+            return redirect(url_for('auth.profile'))
+
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error updating profile: {str(e)}')
+            return redirect(url_for('auth.edit_profile'))
+
+    return render_template('edit_profile.html', user=current_user)
+
+@bp.route('/reset_password', methods=['GET', 'POST'])
+@login_required
+def reset_password():
+    if request.method == 'POST':
+        current_password = request.form.get('current_password')
+        new_password = request.form.get('new_password')
+        confirm_password = request.form.get('confirm_password')
+
+        if not current_password or not new_password or not confirm_password:
+            flash('Please fill in all fields')
+            return redirect(url_for('auth.reset_password'))
+
+        if not password_hasher.verify(current_user.password, current_password):
+            flash('Current password is incorrect')
+            return redirect(url_for('auth.reset_password'))
+
+        if new_password != confirm_password:
+            flash('New passwords do not match')
+            return redirect(url_for('auth.reset_password'))
+
+        if len(new_password) < 6:
+            flash('New password must be at least 6 characters long')
+            return redirect(url_for('auth.reset_password'))
+
+        try:
+            current_user.password = password_hasher.hash(new_password)
+            db.session.commit()
+            flash('Password updated successfully')
+            return redirect(url_for('auth.profile'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error updating password: {str(e)}')
+            return redirect(url_for('auth.reset_password'))
+
+    return render_template('reset_password.html')
+
+@bp.route('/forgot_password', methods=['GET', 'POST'])
+def forgot_password():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        if not email:
+            flash('Please enter your email address')
+            return redirect(url_for('auth.forgot_password'))
+
+        user = User.query.filter_by(username=email).first()
+        if not user:
+            flash('No account found with that email address')
+            return redirect(url_for('auth.forgot_password'))
+
+        reset_token = secrets.token_urlsafe(32)
+        user.reset_token = reset_token
+        user.reset_token_expiry = datetime.utcnow() + timedelta(hours=1)
+        db.session.commit()
+
+        reset_url = url_for('auth.reset_password_token', token=reset_token, _external=True)
+        send_notification(
+            user.id,
+            'Password Reset Request',
+            f'Click the following link to reset your password: {reset_url}\nThis link will expire in 1 hour.',
+            'email'
+        )
+
+        flash('Password reset instructions have been sent to your email')
+        return redirect(url_for('auth.login'))
+
+    return render_template('forgot_password.html')
+
+@bp.route('/reset_password/<token>', methods=['GET', 'POST'])
+def reset_password_token(token):
+    user = User.query.filter_by(reset_token=token).first()
+
+    if not user or not user.reset_token_expiry or user.reset_token_expiry < datetime.utcnow():
+        flash('Invalid or expired password reset link')
+        return redirect(url_for('auth.login'))
+
+    if request.method == 'POST':
+        new_password = request.form.get('new_password')
+        confirm_password = request.form.get('confirm_password')
+
+        if not new_password or not confirm_password:
+            flash('Please fill in all fields')
+            return redirect(url_for('auth.reset_password_token', token=token))
+
+        if new_password != confirm_password:
+            flash('Passwords do not match')
+            return redirect(url_for('auth.reset_password_token', token=token))
+
+        if len(new_password) < 6:
+            flash('Password must be at least 6 characters long')
+            return redirect(url_for('auth.reset_password_token', token=token))
+
+        try:
+            user.password = password_hasher.hash(new_password)
+            user.reset_token = None
+            user.reset_token_expiry = None
+            db.session.commit()
+            flash('Password has been reset successfully. Please login with your new password.')
+            return redirect(url_for('auth.login'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error resetting password: {str(e)}')
+            return redirect(url_for('auth.reset_password_token', token=token))
+
+    return render_template('reset_password_token.html')
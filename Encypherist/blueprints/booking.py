@@ -0,0 +1,336 @@
+from datetime import datetime
+
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, session, url_for
+from flask_login import current_user, login_required
+
+from extensions import csrf, db, payment_gateway
+from idempotency import idempotent
+from ids import new_reference
+from metrics import BOOKINGS, SOLD_OUT_REJECTIONS
+from models import Booking, Event, GroupAttendee, GroupBooking
+from payment_queue import enqueue_execute, enqueue_webhook
+from payments import GatewayUnavailable, PaymentError
+
+bp = Blueprint('booking', __name__)
+
+ATTENDEE_FIELDS = ('name', 'email', 'mobile', 'branch', 'year')
+
+
+@bp.route('/book_event/<int:event_id>', methods=['GET', 'POST'])
+@login_required
+def book_event(event_id):
+    if current_user.role != 'student':
+        flash('Only students can book events')
+        return redirect(url_for('events.home'))
+
+    event = Event.query.get_or_404(event_id)
+
+    if datetime.utcnow() >= event.date:
+        flash('Registration closed: Event has already started')
+        return redirect(url_for('events.home'))
+
+    if event.remaining_tickets <= 0:
+        SOLD_OUT_REJECTIONS.labels(request.endpoint).inc()
+        flash('Event is sold out!')
+        return redirect(url_for('events.home'))
+
+    existing_booking = Booking.query.filter_by(
+        user_id=current_user.id,
+        event_id=event.id
+    ).first()
+
+    if existing_booking:
+        flash('You have already booked this event')
+        return redirect(url_for('events.home'))
+
+    return render_template('booking_form.html', event=event)
+
+@bp.route('/payment/<int:event_id>', methods=['GET', 'POST'])
+@login_required
+@idempotent()
+def payment(event_id):
+    if current_user.role != 'student':
+        flash('Only students can book events')
+        return redirect(url_for('events.home'))
+
+    event = Event.query.get_or_404(event_id)
+
+    if request.method == 'POST':
+        name = request.form.get('name')
+        email = request.form.get('email')
+        mobile = request.form.get('mobile')
+        branch = request.form.get('branch')
+        year = request.form.get('year')
+
+        if not all([name, email, mobile, branch, year]):
+            flash('Please fill in all fields')
+            return redirect(url_for('booking.book_event', event_id=event_id))
+
+        # Kept for process_payment, which only gets PayPal's ids on the way back
+        session['booking_details'] = {
+            'event_id': event.id,
+            **{field: request.form[field] for field in ATTENDEE_FIELDS}
+        }
+
+        try:
+            booking = Booking(
+                user_id=current_user.id,
+                event_id=event.id,
+                name=name,
+                email=email,
+                mobile=mobile,
+                branch=branch,
+                year=year,
+                payment_status='pending',
+                payment_id=new_reference('booking'),
+                booking_date=datetime.utcnow()
+            )
+
+            # A conditional UPDATE, so two students cannot both take the last ticket
+            claimed = db.session.execute(
+                db.update(Event)
+                .where(Event.id == event.id, Event.remaining_tickets > 0)
+                .values(remaining_tickets=Event.remaining_tickets - 1)
+            ).rowcount
+            if not claimed:
+                db.session.rollback()
+                SOLD_OUT_REJECTIONS.labels(request.endpoint).inc()
+                flash('Sorry, this event is now sold out')
+                return redirect(url_for('events.home'))
+
+            db.session.add(booking)
+            db.session.commit()
+
+            booking.payment_status = 'succeeded'
+            db.session.commit()
+            BOOKINGS.labels('single').inc()
+
+            flash('Booking successful!')
+            return redirect(url_for('tickets.ticket', event_id=event_id))
+
+        except Exception as e:
+            db.session.rollback()
+            flash('An error occurred during booking. Please try again.')
+            return redirect(url_for('booking.book_event', event_id=event_id))
+
+    return redirect(url_for('booking.submit_booking', event_id=event_id))
+
+@bp.route('/submit_booking/<int:event_id>', methods=['POST'])
+@login_required
+@idempotent()
+def submit_booking(event_id):
+    if current_user.role != 'student':
+        flash('Only students can book events')
+        return redirect(url_for('events.home'))
+
+    try:
+        event = Event.query.get_or_404(event_id)
+
+        if event.remaining_tickets <= 0:
+            SOLD_OUT_REJECTIONS.labels(request.endpoint).inc()
+            flash('Event is sold out!')
+            return redirect(url_for('events.home'))
+
+        booking = Booking(
+            user_id=current_user.id,
+            event_id=event.id,
+            name=request.form['name'],
+            email=request.form['email'],
+            mobile=request.form['mobile'],
+            branch=request.form['branch'],
+            year=request.form['year'],
+            payment_status='succeeded',
+            payment_id=new_reference('direct_booking'),
+            booking_date=datetime.utcnow()
+        )
+
+        # A conditional UPDATE, so two students cannot both take the last ticket
+        claimed = db.session.execute(
+            db.update(Event)
+            .where(Event.id == event.id, Event.remaining_tickets > 0)
+            .values(remaining_tickets=Event.remaining_tickets - 1)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            SOLD_OUT_REJECTIONS.labels(request.endpoint).inc()
+            flash('Event is sold out!')
+            return redirect(url_for('events.home'))
+
+        db.session.add(booking)
+        db.session.commit()
+        BOOKINGS.labels('single').inc()
+
+        flash('Booking successful!')
+
+        return redirect(url_for('tickets.ticket', event_id=event_id))
+
+    except Exception as e:
+        db.session.rollback()
+        flash('An error occurred while processing your booking')
+        return redirect(url_for('events.home'))
+
+@bp.route('/process_payment/<int:event_id>')
+@login_required
+def process_payment(event_id):
+    if current_user.role != 'student':
+        return redirect(url_for('events.home'))
+
+    event = Event.query.get_or_404(event_id)
+
+    if event.remaining_tickets <= 0:
+        SOLD_OUT_REJECTIONS.labels(request.endpoint).inc()
+        flash('Event is sold out!')
+        return redirect(url_for('events.home'))
+
+    payment_id = request.args.get('paymentId')
+    payer_id = request.args.get('PayerID')
+
+    if not payment_id or not payer_id:
+        flash('Payment failed')
+        return redirect(url_for('events.home'))
+
+    try:
+        booking = Booking.query.filter_by(
+            user_id=current_user.id,
+            event_id=event.id
+        ).first()
+
+        if booking and booking.payment_status == 'succeeded':
+            flash('You have already booked this event')
+            return redirect(url_for('events.home'))
+
+        if booking is None:
+            details = session.get('booking_details')
+            if not details or details.get('event_id') != event.id:
+                flash('Please fill in your booking details')
+                return redirect(url_for('booking.book_event', event_id=event_id))
+
+            booking = Booking(
+                user_id=current_user.id,
+                event_id=event.id,
+                payment_status='pending',
+                payment_id=payment_id,
+                booking_date=datetime.utcnow(),
+                **{field: details[field] for field in ATTENDEE_FIELDS}
+            )
+            db.session.add(booking)
+        elif booking.payment_id != payment_id:
+            booking.payment_id = payment_id
+            booking.payment_status = 'pending'
+
+        # The payment is executed and the ticket taken by `flask process-payments`;
+        # reloading this page enqueues nothing new
+        enqueue_execute(payment_id, payer_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Payment failed: {str(e)}')
+        return redirect(url_for('events.home'))
+
+    return redirect(url_for('booking.payment_pending', payment_id=payment_id))
+
+@bp.route('/payment/pending/<payment_id>')
+@login_required
+def payment_pending(payment_id):
+    booking = Booking.query.filter_by(payment_id=payment_id, user_id=current_user.id).first_or_404()
+    if booking.payment_status == 'succeeded':
+        return redirect(url_for('tickets.ticket', event_id=booking.event_id))
+    return render_template('payment_pending.html', booking=booking, event=booking.event)
+
+@bp.route('/api/payments/<payment_id>')
+@login_required
+def payment_status(payment_id):
+    """Polled by the pending page; a single lookup on the unique payment_id index."""
+    booking = Booking.query.filter_by(payment_id=payment_id, user_id=current_user.id).first_or_404()
+    return jsonify({
+        'status': booking.payment_status,
+        'ticket_url': url_for('tickets.ticket', event_id=booking.event_id)
+        if booking.payment_status == 'succeeded' else None
+    })
+
+@bp.route('/webhooks/paypal', methods=['POST'])
+@csrf.exempt
+def paypal_webhook():
+    event = request.get_json(silent=True)
+    if not isinstance(event, dict) or not event.get('id'):
+        return jsonify({'error': 'Invalid payload'}), 400
+
+    try:
+        verified = payment_gateway.verify_webhook(request.headers, event)
+    except GatewayUnavailable:
+        # PayPal redelivers failed webhooks, so ask it to come back later
+        return jsonify({'error': 'Verification unavailable'}), 503
+    except PaymentError:
+        verified = False
+    if not verified:
+        return jsonify({'error': 'Invalid signature'}), 400
+
+    enqueue_webhook(event)
+    db.session.commit()
+    return jsonify({'status': 'queued'})
+
+@bp.route('/book_group/<int:event_id>', methods=['GET', 'POST'])
+@login_required
+@idempotent()
+def book_group(event_id):
+    event = Event.query.get_or_404(event_id)
+
+    if not event.is_group_event:
+        flash('This event does not support group bookings.', 'error')
+        return redirect(url_for('events.home'))
+
+    if request.method == 'POST':
+        try:
+            group_size = int(request.form.get('group_size'))
+
+            if group_size < event.min_group_size or group_size > event.max_group_size:
+                flash('Invalid group size.', 'error')
+                return redirect(url_for('booking.book_group', event_id=event_id))
+
+            members = [
+                (request.form.get(f'member_name_{i}', '').strip(), request.form.get(f'member_email_{i}', '').strip())
+                for i in range(group_size)
+            ]
+            if not all(name and email for name, email in members):
+                flash('Please enter a name and email for every member.', 'error')
+                return redirect(url_for('booking.book_group', event_id=event_id))
+
+            # One conditional UPDATE takes the whole group's tickets or none of them
+            claimed = db.session.execute(
+                db.update(Event)
+                .where(Event.id == event.id, Event.remaining_tickets >= group_size)
+                .values(remaining_tickets=Event.remaining_tickets - group_size)
+            ).rowcount
+            if not claimed:
+                db.session.rollback()
+                SOLD_OUT_REJECTIONS.labels(request.endpoint).inc()
+                flash('Not enough tickets available for the group.', 'error')
+                return redirect(url_for('booking.book_group', event_id=event_id))
+
+            group = GroupBooking(
+                reference=new_reference('group'),
+                user_id=current_user.id,
+                event_id=event.id,
+                size=group_size,
+                payment_status='succeeded'
+            )
+            db.session.add(group)
+            db.session.flush()
+
+            # Every member in a single multi-row INSERT
+            db.session.execute(db.insert(GroupAttendee), [
+                {'group_booking_id': group.id, 'position': position, 'name': name, 'email': email}
+                for position, (name, email) in enumerate(members)
+            ])
+            db.session.commit()
+            BOOKINGS.labels('group').inc(group_size)
+
+            flash('Group booking successful!', 'success')
+            return redirect(url_for('tickets.group_ticket', reference=group.reference))
+
+        except Exception as e:
+            db.session.rollback()
+            flash('An error occurred while processing your booking. Please try again.', 'error')
+            return redirect(url_for('booking.book_group', event_id=event_id))
+
+    return render_template('group_booking.html', event=event)
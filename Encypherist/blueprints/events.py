@@ -0,0 +1,357 @@
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from database import read_only
+from extensions import db
+from models import Booking, Event, Review, User, delete_bookings
+from query_stats import query_budget
+from response_cache import cached_response
+
+bp = Blueprint('events', __name__)
+
+REVIEWS_PER_PAGE = 20
+EVENT_DATE_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M')
+MAX_FIELD_LENGTHS = {'title': 100, 'location': 200, 'category': 50}
+
+
+class InvalidEvent(ValueError):
+    """An event field that fails validation; the message is shown to the organizer."""
+
+
+@bp.route('/')
+@cached_response(timeout=300, tags=('event',))
+def landing():
+    now = datetime.utcnow()
+    try:
+        past_events = Event.query.filter(Event.date < now).all()
+        for event in past_events:
+            delete_bookings(event_id=event.id)
+            db.session.delete(event)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error cleaning up past events: {str(e)}')
+
+    featured_events = Event.query.filter(
+        Event.date > now
+    ).order_by(Event.date).limit(3).all()
+
+    return render_template('landing.html', featured_events=featured_events)
+
+def filtered_events_query(now, search_query, category, min_price, max_price, start_date, end_date, sort_by):
+    """The upcoming-events query behind the home page filters."""
+    query = Event.query.filter(Event.date > now)
+
+    if search_query:
+        search = f"%{search_query}%"
+        query = query.filter(
+            db.or_(
+                Event.title.ilike(search),
+                Event.description.ilike(search),
+                Event.location.ilike(search)
+            )
+        )
+
+    if category and category != 'all':
+        query = query.filter(Event.category == category)
+
+    if min_price is not None:
+        query = query.filter(Event.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Event.price <= max_price)
+
+    if start_date:
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            query = query.filter(Event.date >= start)
+        except ValueError:
+            pass
+
+    if end_date:
+        try:
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+            end = end.replace(hour=23, minute=59, second=59)
+            query = query.filter(Event.date <= end)
+        except ValueError:
+            pass
+
+    if sort_by == 'price':
+        query = query.order_by(Event.price)
+    elif sort_by == 'popularity':
+        # Tickets sold, which counts every member of a group booking
+        query = query.order_by((Event.total_tickets - Event.remaining_tickets).desc(), Event.date)
+    else:
+        query = query.order_by(Event.date)
+
+    return query
+
+@bp.route('/home')
+@login_required
+@query_budget(6)
+def home():
+    now = datetime.utcnow()
+    try:
+        past_events = Event.query.filter(Event.date < now).all()
+        for event in past_events:
+            delete_bookings(event_id=event.id)
+            db.session.delete(event)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error cleaning up past events: {str(e)}')
+
+    search_query = request.args.get('search', '').strip()
+    category = request.args.get('category', 'all')
+    min_price = request.args.get('min_price', type=float)
+    max_price = request.args.get('max_price', type=float)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    sort_by = request.args.get('sort', 'date')
+
+    query = filtered_events_query(now, search_query, category, min_price, max_price, start_date, end_date, sort_by)
+
+    categories = db.session.query(Event.category).distinct().all()
+    categories = [cat[0] for cat in categories if cat[0]]
+
+    events = query.all()
+
+    return render_template(
+        'home.html',
+        events=events,
+        now=now,
+        search_query=search_query,
+        selected_category=category,
+        min_price=min_price,
+        max_price=max_price,
+        start_date=start_date,
+        end_date=end_date,
+        sort_by=sort_by,
+        categories=categories
+    )
+
+def parse_event_fields(fields, is_group_event, now=None):
+    """
+    Validates the fields of a new event (strings, as submitted) and returns
+    the Event column values, or raises InvalidEvent. Shared by the create
+    form and the bulk import, so both apply the same rules.
+    """
+    title = fields.get('title')
+    description = fields.get('description')
+    location = fields.get('location')
+    price = fields.get('price')
+    date_str = fields.get('date')
+    total_tickets = fields.get('total_tickets')
+    category = fields.get('category')
+
+    if not all([title, description, location, price, date_str, total_tickets, category]):
+        raise InvalidEvent('Please fill in all required fields')
+
+    for name, max_length in MAX_FIELD_LENGTHS.items():
+        if len(fields[name]) > max_length:
+            raise InvalidEvent(f'{name.title()} must be at most {max_length} characters')
+
+    try:
+        price = float(price)
+        total_tickets = int(total_tickets)
+    except ValueError:
+        raise InvalidEvent('Invalid price or ticket quantity')
+    if price < 0 or total_tickets < 1:
+        raise InvalidEvent('Price and total tickets must be positive numbers')
+
+    for date_format in EVENT_DATE_FORMATS:
+        try:
+            event_date = datetime.strptime(date_str, date_format)
+            break
+        except ValueError:
+            continue
+    else:
+        raise InvalidEvent('Invalid date format')
+    if event_date < (now or datetime.now()):
+        raise InvalidEvent('Event date must be in the future')
+
+    min_group_size = 1
+    max_group_size = 1
+    if is_group_event:
+        try:
+            min_group_size = int(fields.get('min_group_size') or 2)
+            max_group_size = int(fields.get('max_group_size') or 10)
+        except ValueError:
+            raise InvalidEvent('Invalid group size values')
+        if min_group_size < 2 or max_group_size < min_group_size:
+            raise InvalidEvent('Invalid group size settings')
+
+    return {
+        'title': title,
+        'description': description,
+        'location': location,
+        'price': price,
+        'date': event_date,
+        'total_tickets': total_tickets,
+        'remaining_tickets': total_tickets,
+        'is_group_event': is_group_event,
+        'min_group_size': min_group_size,
+        'max_group_size': max_group_size,
+        'category': category
+    }
+
+@bp.route('/create_event', methods=['GET', 'POST'])
+@login_required
+def create_event():
+    if current_user.role != 'organizer':
+        flash('Only organizers can create events')
+        return redirect(url_for('events.home'))
+
+    if request.method == 'POST':
+        try:
+            try:
+                values = parse_event_fields(request.form, 'is_group_event' in request.form)
+            except InvalidEvent as e:
+                flash(str(e))
+                return redirect(url_for('events.create_event'))
+
+            event = Event(
+                organizer_id=current_user.id,
+                status='pending',
+                created_at=datetime.utcnow(),
+                **values
+            )
+
+            db.session.add(event)
+            db.session.commit()
+            flash('Event created successfully!')
+            return redirect(url_for('events.home'))
+
+        except Exception as e:
+            db.session.rollback()
+            flash(f'An error occurred while creating the event: {str(e)}')
+            return redirect(url_for('events.create_event'))
+
+    return render_template('create_event.html')
+
+@bp.route('/delete_event/<int:event_id>', methods=['POST'])
+@login_required
+def delete_event(event_id):
+    if current_user.role != 'organizer':
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    event = Event.query.get_or_404(event_id)
+    if event.organizer_id != current_user.id:
+        flash('You can only delete your own events')
+        return redirect(url_for('events.home'))
+
+    delete_bookings(event_id=event_id)
+    db.session.delete(event)
+    db.session.commit()
+
+    flash('Event deleted successfully')
+    return redirect(url_for('events.home'))
+
+@bp.route('/submit_review/<int:event_id>', methods=['POST'])
+@login_required
+def submit_review(event_id):
+    if current_user.role != 'student':
+        flash('Only students can submit reviews')
+        return redirect(url_for('events.home'))
+
+    try:
+        event = Event.query.get_or_404(event_id)
+        booking = Booking.query.filter_by(
+            user_id=current_user.id,
+            event_id=event_id
+        ).first()
+
+        if not booking:
+            flash('You can only review events you have booked')
+            return redirect(url_for('auth.profile'))
+
+        existing_review = Review.query.filter_by(
+            user_id=current_user.id,
+            event_id=event_id
+        ).first()
+
+        if existing_review:
+            flash('You have already reviewed this event')
+            return redirect(url_for('auth.profile'))
+
+        rating = request.form.get('rating')
+        review_text = request.form.get('review_text')
+
+        if not rating or not rating.isdigit() or int(rating) < 1 or int(rating) > 5:
+            flash('Please provide a valid rating (1-5 stars)')
+            return redirect(url_for('auth.profile'))
+
+        review = Review(
+            user_id=current_user.id,
+            event_id=event_id,
+            rating=int(rating),
+            review_text=review_text
+        )
+
+        db.session.add(review)
+        # Update the aggregates in SQL so concurrent reviews cannot overwrite each other
+        Event.query.filter_by(id=event_id).update({
+            'rating_sum': Event.rating_sum + int(rating),
+            'rating_count': Event.rating_count + 1
+        })
+        db.session.commit()
+
+        flash('Review submitted successfully!')
+        return redirect(url_for('auth.profile'))
+
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error submitting review: {str(e)}')
+        return redirect(url_for('auth.profile'))
+
+@bp.route('/event_reviews/<int:event_id>')
+@cached_response(timeout=60, tags=('event', 'review'), query_args=('page', 'per_page'))
+@read_only
+@query_budget(5)
+def event_reviews(event_id):
+    event = Event.query.get_or_404(event_id)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', REVIEWS_PER_PAGE, type=int), 1), 100)
+
+    # Reviews are append-only, so the aggregates identify the review set
+    etag = f'reviews-{event.id}-{event.rating_count}-{event.rating_sum}-{page}-{per_page}'
+    # Weak comparison: compressed responses carry the tag as W/"..." (see shrink_response)
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        return response
+
+    rows = db.session.query(
+        Review.rating,
+        Review.review_text,
+        Review.created_at,
+        User.username
+    ).join(User, Review.user_id == User.id)\
+        .filter(Review.event_id == event_id)\
+        .order_by(Review.created_at.desc(), Review.id.desc())\
+        .offset((page - 1) * per_page)\
+        .limit(per_page)\
+        .all()
+
+    total_pages = (event.rating_count + per_page - 1) // per_page
+
+    response = jsonify({
+        'reviews': [{
+            'username': row.username,
+            'rating': row.rating,
+            'review_text': row.review_text,
+            'created_at': row.created_at.strftime('%B %d, %Y')
+        } for row in rows],
+        'average_rating': float(event.average_rating),
+        'total_reviews': event.rating_count,
+        'page': page,
+        'per_page': per_page,
+        'pages': total_pages,
+        'has_next': page < total_pages
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
@@ -0,0 +1,278 @@
+from datetime import datetime
+
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from blueprints.notifications import publish_to_user, send_notification
+from extensions import cache, db
+from helpers import avatar_url
+from models import USER_SEARCH_LIMIT, Message, NotificationPreference, User, search_users
+
+bp = Blueprint('messaging', __name__)
+
+MESSAGES_PAGE_SIZE = 50
+
+
+# --- FIX: Helper function to get and categorize conversations ---
+def get_conversations_and_users(search_query=None):
+    """
+    Gets existing conversations and/or searches for users.
+    Returns categorized lists of conversations.
+    """
+    organizer_conversations = {}
+    student_conversations = {}
+
+    user_pool = []
+
+    if search_query:
+        # If searching, the pool of users is the search result
+        user_pool = search_users(search_query, exclude_id=current_user.id)
+    else:
+        # If not searching, the pool is users with existing conversations
+        sent_to_ids = db.session.query(Message.receiver_id).filter(Message.sender_id == current_user.id)
+        received_from_ids = db.session.query(Message.sender_id).filter(Message.receiver_id == current_user.id)
+        user_ids = {r for r, in sent_to_ids}.union({s for s, in received_from_ids})
+        if user_ids:
+            user_pool = User.query.filter(User.id.in_(user_ids)).all()
+
+    for user in user_pool:
+        last_message = Message.query.filter(
+            db.or_(
+                db.and_(Message.sender_id == current_user.id, Message.receiver_id == user.id),
+                db.and_(Message.sender_id == user.id, Message.receiver_id == current_user.id)
+            )
+        ).order_by(Message.timestamp.desc()).first()
+
+        # If searching and no message history, we still show the user
+        if not last_message and search_query:
+            # Create a placeholder for display
+            last_message = Message(content='Start a new conversation!', timestamp=datetime.min)
+
+        if last_message: # Only add users if there's a conversation or it's a search result
+            conv_data = {
+                'user': user,
+                'last_message': last_message,
+                'unread': Message.query.filter_by(
+                    sender_id=user.id,
+                    receiver_id=current_user.id,
+                    read=False
+                ).count()
+            }
+            if user.role == 'organizer':
+                organizer_conversations[user.id] = conv_data
+            else:
+                student_conversations[user.id] = conv_data
+
+    # Sort conversations by last message timestamp
+    def sort_key(item):
+        return item[1]['last_message'].timestamp
+
+    sorted_organizers = dict(sorted(organizer_conversations.items(), key=sort_key, reverse=True))
+    sorted_students = dict(sorted(student_conversations.items(), key=sort_key, reverse=True))
+
+    return sorted_organizers, sorted_students
+
+@bp.route('/api/users/search')
+@login_required
+def user_search():
+    """Typeahead lookup for the messaging search box."""
+    limit = min(max(request.args.get('limit', USER_SEARCH_LIMIT, type=int), 1), USER_SEARCH_LIMIT)
+    users = search_users(request.args.get('q', ''), limit=limit, exclude_id=current_user.id)
+
+    return jsonify({
+        'users': [{
+            'id': user.id,
+            'username': user.username,
+            'role': user.role,
+            'profile_picture': avatar_url(user, 64) if user.profile_picture else None,
+            'url': url_for('messaging.conversation', user_id=user.id)
+        } for user in users]
+    })
+
+@bp.route('/messages')
+@login_required
+def messages():
+    try:
+        search_query = request.args.get('search', '').strip()
+        organizer_conversations, student_conversations = get_conversations_and_users(search_query)
+
+        return render_template('messages.html',
+                               organizer_conversations=organizer_conversations,
+                               student_conversations=student_conversations,
+                               search_query=search_query) # Pass search query back to template
+
+    except Exception as e:
+        print(f"--- ERROR in /messages: {e} ---") # For debugging
+        flash('An error occurred while loading messages')
+        return render_template('messages.html',
+                               organizer_conversations=None,
+                               student_conversations=None)
+
+# --- Conversation paging helpers ---
+
+def conversation_query(user_id):
+    """Base query for every message exchanged between the current user and `user_id`."""
+    return Message.query.filter(
+        db.or_(
+            db.and_(Message.sender_id == current_user.id, Message.receiver_id == user_id),
+            db.and_(Message.sender_id == user_id, Message.receiver_id == current_user.id)
+        )
+    )
+
+def encode_message_cursor(message):
+    return f"{message.timestamp.isoformat()}_{message.id}"
+
+def decode_message_cursor(cursor):
+    """Parses a `<iso timestamp>_<id>` cursor. Returns None for anything malformed."""
+    try:
+        timestamp, message_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), int(message_id)
+    except (AttributeError, ValueError):
+        return None
+
+def get_message_page(user_id, before=None, limit=MESSAGES_PAGE_SIZE):
+    """
+    Returns (messages, next_cursor) for the newest `limit` messages older than
+    the `before` cursor, oldest first. `next_cursor` is None once the start of
+    the thread has been reached.
+    """
+    query = conversation_query(user_id)
+    if before:
+        before_timestamp, before_id = before
+        query = query.filter(
+            db.or_(
+                Message.timestamp < before_timestamp,
+                db.and_(Message.timestamp == before_timestamp, Message.id < before_id)
+            )
+        )
+
+    # Fetch one extra row to find out whether an older page exists
+    rows = query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+
+    next_cursor = encode_message_cursor(rows[0]) if has_more and rows else None
+    return rows, next_cursor
+
+def mark_conversation_read(user_id):
+    updated = Message.query.filter_by(
+        sender_id=user_id,
+        receiver_id=current_user.id,
+        read=False
+    ).update({'read': True})
+    db.session.commit()
+    if updated:
+        cache.delete(f'unread:messages:{current_user.id}')
+
+def serialize_message(message):
+    return {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'receiver_id': message.receiver_id,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+        'time': message.timestamp.strftime('%H:%M'),
+        'cursor': encode_message_cursor(message)
+    }
+
+@bp.route('/messages/<int:user_id>')
+@login_required
+def conversation(user_id):
+    try:
+        search_query = request.args.get('search', '').strip()
+        other_user = User.query.get_or_404(user_id)
+
+        messages, next_cursor = get_message_page(user_id)
+        mark_conversation_read(user_id)
+
+        organizer_conversations, student_conversations = get_conversations_and_users(search_query)
+
+        return render_template('messages.html',
+                             organizer_conversations=organizer_conversations,
+                             student_conversations=student_conversations,
+                             messages=messages,
+                             next_cursor=next_cursor,
+                             last_message_id=max((m.id for m in messages), default=0),
+                             other_user=other_user,
+                             search_query=search_query) # Pass search query back
+
+    except Exception as e:
+        print(f"--- ERROR in /messages/<user_id>: {e} ---") # For debugging
+        flash('An error occurred while loading the conversation')
+        return redirect(url_for('messaging.messages'))
+
+@bp.route('/api/messages/<int:user_id>/history')
+@login_required
+def conversation_history(user_id):
+    """Older messages in a thread, paged backwards by `before` cursor."""
+    before = request.args.get('before')
+    cursor = decode_message_cursor(before) if before else None
+    if before and not cursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    limit = min(request.args.get('limit', MESSAGES_PAGE_SIZE, type=int), MESSAGES_PAGE_SIZE)
+    messages, next_cursor = get_message_page(user_id, before=cursor, limit=max(limit, 1))
+
+    return jsonify({
+        'messages': [serialize_message(m) for m in messages],
+        'next_cursor': next_cursor
+    })
+
+@bp.route('/api/messages/<int:user_id>/new')
+@login_required
+def conversation_updates(user_id):
+    """Messages in a thread newer than `after_id`, for incremental refresh."""
+    after_id = request.args.get('after_id', 0, type=int)
+    messages = conversation_query(user_id).filter(
+        Message.id > after_id
+    ).order_by(Message.id.asc()).limit(MESSAGES_PAGE_SIZE).all()
+
+    if any(m.receiver_id == current_user.id and not m.read for m in messages):
+        mark_conversation_read(user_id)
+
+    return jsonify({
+        'messages': [serialize_message(m) for m in messages],
+        'last_id': messages[-1].id if messages else after_id
+    })
+
+@bp.route('/send_message/<int:user_id>', methods=['POST'])
+@login_required
+def send_message(user_id):
+    try:
+        content = request.form.get('content')
+        if not content:
+            flash('Message cannot be empty')
+            return redirect(url_for('messaging.conversation', user_id=user_id))
+
+        message = Message(
+            sender_id=current_user.id,
+            receiver_id=user_id,
+            content=content,
+            timestamp=datetime.utcnow()
+        )
+
+        db.session.add(message)
+        db.session.commit()
+
+        cache.incr(f'unread:messages:{user_id}')
+
+        payload = serialize_message(message)
+        publish_to_user(user_id, 'message', payload)
+        publish_to_user(current_user.id, 'message', payload)
+
+        receiver_prefs = NotificationPreference.query.filter_by(user_id=user_id).first()
+        if receiver_prefs and receiver_prefs.messages:
+            send_notification(
+                user_id,
+                f"New message from {current_user.username}",
+                content[:100] + "..." if len(content) > 100 else content,
+                'in-app'
+            )
+
+        return redirect(url_for('messaging.conversation', user_id=user_id))
+
+    except Exception as e:
+        db.session.rollback()
+        flash('An error occurred while sending the message')
+        return redirect(url_for('messaging.conversation', user_id=user_id))
@@ -0,0 +1,220 @@
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, flash, jsonify, redirect, render_template, request, stream_with_context, url_for
+from flask_login import current_user, login_required
+
+from extensions import broker, cache, db
+from metrics import NOTIFICATION_QUEUE_DEPTH, NOTIFICATIONS_SENT
+from models import Booking, Event, Message, Notification, NotificationPreference
+from query_stats import query_budget
+
+bp = Blueprint('notifications', __name__)
+
+SSE_HEARTBEAT_SECONDS = 15
+UNREAD_COUNT_TIMEOUT = 300
+
+
+def send_notification(user_id, title, content, notification_type, event_id=None):
+    try:
+        notification = Notification(
+            user_id=user_id,
+            event_id=event_id,
+            type=notification_type,
+            title=title,
+            content=content
+        )
+        db.session.add(notification)
+
+        prefs = NotificationPreference.query.filter_by(user_id=user_id).first()
+        if not prefs:
+            prefs = NotificationPreference(user_id=current_user.id)
+            db.session.add(prefs)
+
+        if notification_type == 'email' and prefs.email_notifications and prefs.email:
+            send_email(prefs.email, title, content)
+            notification.sent = True
+
+        if notification_type == 'sms' and prefs.sms_notifications and prefs.phone:
+            send_sms(prefs.phone, content)
+            notification.sent = True
+
+        db.session.commit()
+        NOTIFICATIONS_SENT.labels(notification_type, 'sent' if notification.sent else 'stored').inc()
+        cache.incr(f'unread:notifications:{user_id}')
+
+        if notification_type == 'in-app':
+            publish_to_user(user_id, 'notification', {
+                'id': notification.id,
+                'event_id': event_id,
+                'title': title,
+                'content': content,
+                'timestamp': notification.timestamp.isoformat()
+            })
+        return True
+    except Exception as e:
+        db.session.rollback()
+        NOTIFICATIONS_SENT.labels(notification_type, 'failed').inc()
+        print(f"Error sending notification: {str(e)}")
+        return False
+
+def deliver_notifications(deliveries, title, content, event_id):
+    """Sends `(user_id, type)` pairs in order, tracking what is left in notification_queue_depth."""
+    pending = len(deliveries)
+    NOTIFICATION_QUEUE_DEPTH.inc(pending)
+    try:
+        for user_id, notification_type in deliveries:
+            send_notification(user_id, title, content, notification_type, event_id)
+            pending -= 1
+            NOTIFICATION_QUEUE_DEPTH.dec()
+    finally:
+        # Deliveries abandoned by an error leave the queue too
+        NOTIFICATION_QUEUE_DEPTH.dec(pending)
+
+def send_event_update(event_id, title, content):
+    event = Event.query.get(event_id)
+    if not event:
+        return False
+
+    bookings = Booking.query.filter_by(event_id=event_id).all()
+
+    deliver_notifications(
+        [(booking.user_id, kind) for booking in bookings for kind in ('in-app', 'email', 'sms')],
+        title, content, event_id
+    )
+
+    return True
+
+def send_event_reminder():
+    tomorrow = datetime.utcnow() + timedelta(days=1)
+    events = Event.query.filter(
+        Event.date > datetime.utcnow(),
+        Event.date <= tomorrow
+    ).all()
+
+    for event in events:
+        bookings = Booking.query.filter_by(event_id=event.id).all()
+        title = f"Reminder: {event.title} is tomorrow!"
+        content = f"Don't forget! {event.title} is happening tomorrow at {event.date.strftime('%I:%M %p')} at {event.location}."
+        deliver_notifications(
+            [(booking.user_id, kind) for booking in bookings for kind in ('email', 'sms')],
+            title, content, event.id
+        )
+
+def publish_to_user(user_id, event_type, data):
+    """Pushes a live update to every open /stream connection of `user_id`."""
+    try:
+        broker.publish(f'user:{user_id}', {'type': event_type, 'data': data})
+    except Exception as e:
+        # Live updates are best-effort; the data is already committed
+        print(f"Error publishing {event_type} update: {str(e)}")
+
+@bp.route('/stream')
+@login_required
+def stream():
+    subscription = broker.subscribe(f'user:{current_user.id}')
+    # The stream never touches the database; hand the connection that loaded
+    # current_user back to the pool instead of holding it until the tab closes
+    db.session.remove()
+
+    def events():
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield 'retry: 5000\n\n'
+            while True:
+                item = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if item is None:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"event: {item['type']}\ndata: {json.dumps(item['data'])}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/notifications')
+@login_required
+@query_budget(6)
+def notifications():
+    page = request.args.get('page', 1, type=int)
+    notifications = Notification.query.filter_by(
+        user_id=current_user.id
+    ).order_by(
+        Notification.timestamp.desc()
+    ).paginate(page=page, per_page=20)
+
+    # Opening the notifications page counts as reading all of them
+    Notification.query.filter_by(
+        user_id=current_user.id,
+        read=False
+    ).update({'read': True})
+    db.session.commit()
+    cache.set(f'unread:notifications:{current_user.id}', 0, timeout=UNREAD_COUNT_TIMEOUT)
+
+    return render_template('notifications.html', notifications=notifications)
+
+def get_unread_counts(user_id):
+    """Unread message and notification counts, served from the cache when possible."""
+    messages_key = f'unread:messages:{user_id}'
+    notifications_key = f'unread:notifications:{user_id}'
+
+    unread_messages = cache.get(messages_key)
+    if unread_messages is None:
+        unread_messages = Message.query.filter_by(receiver_id=user_id, read=False).count()
+        cache.set(messages_key, unread_messages, timeout=UNREAD_COUNT_TIMEOUT)
+
+    unread_notifications = cache.get(notifications_key)
+    if unread_notifications is None:
+        unread_notifications = Notification.query.filter_by(user_id=user_id, read=False).count()
+        cache.set(notifications_key, unread_notifications, timeout=UNREAD_COUNT_TIMEOUT)
+
+    return unread_messages, unread_notifications
+
+@bp.route('/api/unread')
+@login_required
+@query_budget(3)
+def unread_counts():
+    unread_messages, unread_notifications = get_unread_counts(current_user.id)
+
+    response = jsonify({
+        'messages': unread_messages,
+        'notifications': unread_notifications
+    })
+    response.set_etag(f'{current_user.id}-{unread_messages}-{unread_notifications}')
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@bp.route('/notification_preferences', methods=['GET', 'POST'])
+@login_required
+def notification_preferences():
+    prefs = NotificationPreference.query.filter_by(user_id=current_user.id).first()
+    if not prefs:
+        prefs = NotificationPreference(user_id=current_user.id)
+        db.session.add(prefs)
+        db.session.commit()
+
+    if request.method == 'POST':
+        prefs.email_notifications = 'email_notifications' in request.form
+        prefs.sms_notifications = 'sms_notifications' in request.form
+        prefs.event_updates = 'event_updates' in request.form
+        prefs.event_reminders = 'event_reminders' in request.form
+        prefs.messages = 'messages' in request.form
+        prefs.email = request.form.get('email')
+        prefs.phone = request.form.get('phone')
+
+        db.session.commit()
+        flash('Notification preferences updated successfully')
+        return redirect(url_for('notifications.notification_preferences'))
+
+    return render_template('notification_preferences.html', preferences=prefs)
+
+def send_email(to_email, subject, content):
+    pass
+
+def send_sms(phone_number, message):
+    pass
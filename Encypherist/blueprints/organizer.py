@@ -0,0 +1,251 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, flash, redirect, render_template, request, stream_with_context, url_for
+from flask_login import current_user, login_required
+
+from blueprints.events import InvalidEvent, parse_event_fields
+from database import insert_in_batches, read_only
+from exports import CSV_MIMETYPE, XLSX_MIMETYPE, stream_csv, stream_xlsx
+from extensions import db
+from models import Booking, Event, GroupAttendee, GroupBooking
+from query_stats import query_budget
+from response_cache import invalidate_tags
+
+bp = Blueprint('organizer', __name__)
+
+ATTENDEES_PER_PAGE = 50
+# Rows fetched per round trip from the server-side cursor during an export
+EXPORT_FETCH_SIZE = 1000
+ATTENDEE_COLUMNS = ('Name', 'Email', 'Mobile', 'Branch', 'Year', 'Reference', 'Group size', 'Booked at')
+IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ROWS = 20000
+MAX_REPORTED_ERRORS = 200
+IMPORT_COLUMNS = ('title', 'description', 'location', 'price', 'date', 'total_tickets', 'category',
+                  'is_group_event', 'min_group_size', 'max_group_size')
+
+
+def attendees_query(event_id, search=None):
+    """
+    Paid attendees of an event: single bookings and every member of a group
+    booking, as one `roster` subquery. `search` matches name, email or branch.
+    """
+    no_text = db.cast(db.null(), db.String)
+    singles = db.select(
+        Booking.name,
+        Booking.email,
+        Booking.mobile,
+        Booking.branch,
+        Booking.year,
+        Booking.payment_id.label('reference'),
+        db.cast(db.null(), db.Integer).label('group_size'),
+        Booking.booking_date
+    ).where(Booking.event_id == event_id, Booking.payment_status == 'succeeded')
+
+    members = db.select(
+        GroupAttendee.name,
+        GroupAttendee.email,
+        no_text.label('mobile'),
+        no_text.label('branch'),
+        no_text.label('year'),
+        GroupBooking.reference,
+        GroupBooking.size.label('group_size'),
+        GroupBooking.booking_date
+    ).join(GroupBooking, GroupAttendee.group_booking_id == GroupBooking.id)\
+        .where(GroupBooking.event_id == event_id, GroupBooking.payment_status == 'succeeded')
+
+    if search:
+        pattern = f"%{search}%"
+        singles = singles.where(db.or_(
+            Booking.name.ilike(pattern),
+            Booking.email.ilike(pattern),
+            Booking.branch.ilike(pattern)
+        ))
+        # Group members have no branch on record
+        members = members.where(db.or_(
+            GroupAttendee.name.ilike(pattern),
+            GroupAttendee.email.ilike(pattern)
+        ))
+
+    return db.union_all(singles, members).subquery('roster')
+
+def roster_rows(roster):
+    return db.select(
+        roster.c.name, roster.c.email, roster.c.mobile, roster.c.branch, roster.c.year,
+        roster.c.reference, roster.c.group_size, roster.c.booking_date
+    ).order_by(roster.c.name, roster.c.email, roster.c.reference)
+
+def event_for_organizer(event_id):
+    """The event, if the current user organizes it or is an admin; otherwise None."""
+    event = Event.query.get_or_404(event_id)
+    if current_user.role == 'admin' or event.organizer_id == current_user.id:
+        return event
+    return None
+
+@bp.route('/events/<int:event_id>/attendees')
+@login_required
+@read_only
+@query_budget(5)
+def attendees(event_id):
+    event = event_for_organizer(event_id)
+    if event is None:
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    search_query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    roster = attendees_query(event.id, search_query)
+    total = db.session.scalar(db.select(db.func.count()).select_from(roster))
+    rows = db.session.execute(
+        roster_rows(roster).offset((page - 1) * ATTENDEES_PER_PAGE).limit(ATTENDEES_PER_PAGE)
+    ).all()
+    pages = max((total + ATTENDEES_PER_PAGE - 1) // ATTENDEES_PER_PAGE, 1)
+
+    return render_template(
+        'event_attendees.html',
+        event=event,
+        attendees=rows,
+        search_query=search_query,
+        page=page,
+        pages=pages,
+        total=total
+    )
+
+@bp.route('/events/<int:event_id>/attendees.<fmt>')
+@login_required
+@read_only
+def export_attendees(event_id, fmt):
+    if fmt not in ('csv', 'xlsx'):
+        abort(404)
+    event = event_for_organizer(event_id)
+    if event is None:
+        flash('Unauthorized access')
+        return redirect(url_for('events.home'))
+
+    search_query = request.args.get('q', '').strip()
+    statement = roster_rows(attendees_query(event.id, search_query))\
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+
+    def rows():
+        # yield_per streams the result through a server-side cursor, so only
+        # EXPORT_FETCH_SIZE rows are held at a time however large the event
+        for row in db.session.execute(statement):
+            yield tuple(row)
+
+    if fmt == 'csv':
+        chunks, mimetype = stream_csv(ATTENDEE_COLUMNS, rows()), CSV_MIMETYPE
+    else:
+        chunks, mimetype = stream_xlsx(ATTENDEE_COLUMNS, rows(), sheet_name=event.title), XLSX_MIMETYPE
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename=attendees-event-{event.id}.{fmt}',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def read_import_rows(upload):
+    """Yields (row number, fields) from an uploaded CSV or JSON file of events."""
+    if upload.filename.lower().endswith('.json') or upload.mimetype == 'application/json':
+        try:
+            data = json.load(upload.stream)
+        except ValueError:
+            raise InvalidEvent('The file is not valid JSON')
+        if isinstance(data, dict):
+            data = data.get('events')
+        if not isinstance(data, list):
+            raise InvalidEvent('Expected a JSON list of events')
+        for number, item in enumerate(data, start=1):
+            yield number, item if isinstance(item, dict) else {}
+    else:
+        reader = csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+        try:
+            # Row 1 is the header
+            for number, row in enumerate(reader, start=2):
+                yield number, row
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise InvalidEvent(f'Could not read the CSV file: {str(e)}')
+
+def import_fields(item):
+    """Normalizes an imported row to the stripped strings the create form would submit."""
+    return {
+        str(key).strip().lower(): '' if value is None else str(value).strip()
+        for key, value in item.items() if key is not None
+    }
+
+@bp.route('/events/import', methods=['GET', 'POST'])
+@login_required
+def import_events():
+    if current_user.role != 'organizer':
+        flash('Only organizers can create events')
+        return redirect(url_for('events.home'))
+
+    if request.method == 'GET':
+        return render_template('import_events.html', columns=IMPORT_COLUMNS)
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Please choose a CSV or JSON file to import')
+        return redirect(url_for('organizer.import_events'))
+
+    now = datetime.now()
+    created_at = datetime.utcnow()
+    errors = []
+    error_count = 0
+
+    def valid_rows():
+        nonlocal error_count
+        for count, (number, item) in enumerate(read_import_rows(upload), start=1):
+            if count > MAX_IMPORT_ROWS:
+                raise InvalidEvent(f'Import at most {MAX_IMPORT_ROWS} events at a time')
+            fields = import_fields(item)
+            is_group_event = fields.get('is_group_event', '').lower() in ['true', '1', 't', 'yes', 'y']
+            try:
+                values = parse_event_fields(fields, is_group_event, now=now)
+            except InvalidEvent as e:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((number, fields.get('title', ''), str(e)))
+                continue
+            # Every column, since COPY does not apply the model defaults
+            values.update(
+                organizer_id=current_user.id,
+                payment_qr=None,
+                status='pending',
+                created_at=created_at,
+                rating_sum=0,
+                rating_count=0
+            )
+            yield values
+
+    try:
+        # All valid rows go in with batched COPY/executemany statements, in one transaction
+        imported = insert_in_batches(db.session.connection(), Event, valid_rows(), IMPORT_BATCH_SIZE)
+        db.session.commit()
+    except InvalidEvent as e:
+        db.session.rollback()
+        flash(str(e))
+        return redirect(url_for('organizer.import_events'))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'An error occurred while importing events: {str(e)}')
+        return redirect(url_for('organizer.import_events'))
+
+    # The bulk insert bypasses the ORM events that invalidate cached event
+    # pages, so refresh them once for the whole import
+    if imported:
+        invalidate_tags('event')
+
+    return render_template(
+        'import_events.html',
+        columns=IMPORT_COLUMNS,
+        imported=imported,
+        errors=errors,
+        error_count=error_count
+    )
@@ -0,0 +1,134 @@
+import base64
+import json
+import os
+from io import BytesIO
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, url_for
+from flask_login import current_user, login_required
+
+from helpers import asset_url
+from metrics import TICKET_RENDER_SECONDS
+from models import Booking, Event, GroupBooking
+
+bp = Blueprint('tickets', __name__)
+
+
+def qr_data_uri(data):
+    """Encodes `data` as JSON in a QR code and returns it as a PNG data URI."""
+    # qrcode is slow to import and only tickets need it, so workers load it
+    # on the first ticket rather than at boot
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(json.dumps(data))
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+
+    buffered = BytesIO()
+    qr_img.save(buffered, format="PNG")
+    return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode()}"
+
+def render_ticket(event, booking):
+    """Returns the ticket's QR code as a data URI and the ticket PDF as bytes."""
+    # Loaded on first use, like qrcode in qr_data_uri
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    ticket_data = {
+        'booking_id': booking.id,
+        'event_title': event.title,
+        'event_date': event.date.strftime('%Y-%m-%d %H:%M'),
+        'booking_date': booking.booking_date.strftime('%Y-%m-%d %H:%M'),
+        'attendee': {
+            'name': booking.name,
+            'email': booking.email,
+            'mobile': booking.mobile,
+            'branch': booking.branch,
+            'year': booking.year
+        },
+        'payment_status': booking.payment_status,
+        'payment_id': booking.payment_id
+    }
+
+    qr_code = qr_data_uri(ticket_data)
+
+    pdf_buffer = BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=letter)
+    c.drawString(100, 750, f"Event: {event.title}")
+    c.drawString(100, 730, f"Date: {event.date.strftime('%B %d, %Y')}")
+    c.drawString(100, 710, f"Time: {event.date.strftime('%I:%M %p')}")
+    c.drawString(100, 690, f"Booking ID: {booking.id}")
+    c.drawString(100, 670, f"Booking Date: {booking.booking_date.strftime('%B %d, %Y %I:%M %p')}")
+    c.drawString(100, 650, f"Attendee: {booking.name}")
+    c.drawString(100, 630, f"Email: {booking.email}")
+    c.drawString(100, 610, f"Mobile: {booking.mobile}")
+    c.drawString(100, 590, f"Branch: {booking.branch}")
+    c.drawString(100, 570, f"Year: {booking.year}")
+    c.drawString(100, 550, f"Payment Status: {booking.payment_status}")
+    c.drawString(100, 530, f"Payment ID: {booking.payment_id}")
+    c.save()
+
+    return qr_code, pdf_buffer.getvalue()
+
+@bp.route('/ticket/<int:event_id>')
+@login_required
+def ticket(event_id):
+    event = Event.query.get_or_404(event_id)
+    booking = Booking.query.filter_by(event_id=event_id, user_id=current_user.id).first_or_404()
+
+    if booking.payment_status != 'succeeded':
+        flash('Payment not completed')
+        return redirect(url_for('booking.payment', event_id=event_id))
+
+    with TICKET_RENDER_SECONDS.time():
+        qr_code, pdf_data = render_ticket(event, booking)
+
+    os.makedirs(current_app.static_folder, exist_ok=True)
+    pdf_filename = f"ticket_{booking.id}.pdf"
+    pdf_path = os.path.join(current_app.static_folder, pdf_filename)
+    with open(pdf_path, 'wb') as f:
+        f.write(pdf_data)
+
+    return render_template('ticket.html',
+                          event=event,
+                          booking=booking,
+                          qr_code=qr_code,
+                          ticket_pdf_url=asset_url(pdf_filename))
+
+@bp.route('/group_ticket/<reference>')
+@login_required
+def group_ticket(reference):
+    group = GroupBooking.query.filter_by(reference=reference, user_id=current_user.id).first_or_404()
+
+    # The gate scans one code for the whole group and expands it with expand_group
+    with TICKET_RENDER_SECONDS.time():
+        qr_code = qr_data_uri({
+            'group_reference': group.reference,
+            'event_id': group.event_id,
+            'event_title': group.event.title,
+            'event_date': group.event.date.strftime('%Y-%m-%d %H:%M'),
+            'size': group.size,
+            'lead': group.attendees[0].name if group.attendees else None,
+            'gate_url': url_for('tickets.expand_group', reference=group.reference, _external=True)
+        })
+
+    return render_template('group_ticket.html', group=group, event=group.event, qr_code=qr_code)
+
+@bp.route('/api/gate/groups/<reference>')
+@login_required
+def expand_group(reference):
+    """Every member behind a scanned group ticket, for the event's organizer or an admin."""
+    group = GroupBooking.query.filter_by(reference=reference).first_or_404()
+    if current_user.role != 'admin' and group.event.organizer_id != current_user.id:
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    return jsonify({
+        'reference': group.reference,
+        'event_id': group.event_id,
+        'payment_status': group.payment_status,
+        'size': group.size,
+        'attendees': [
+            {'position': attendee.position, 'name': attendee.name, 'email': attendee.email}
+            for attendee in group.attendees
+        ]
+    })
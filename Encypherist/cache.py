@@ -0,0 +1,198 @@
+"""
+Small key/value cache shared by the app's counters and cached lookups.
+
+`SimpleCache` lives in the worker's memory and is the default. `RedisCache`
+is shared by every gunicorn worker and is selected with a `redis://` URL.
+Both expose the same handful of operations and store JSON-serialisable values.
+`LRUCache` is a bounded, strictly per-process cache for hot objects.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class SimpleCache:
+    """
+    Per-process cache with per-key expiry. Holds at most `max_entries` keys:
+    when full, expired entries are swept and then the least recently used
+    ones are evicted, as Redis does under its maxmemory policy.
+    """
+
+    def __init__(self, default_timeout=300, max_entries=10000):
+        self.default_timeout = default_timeout
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expiry(self, timeout):
+        timeout = self.default_timeout if timeout is None else timeout
+        return time.monotonic() + timeout if timeout else None
+
+    def _lookup(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key, value, expires):
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_entries:
+            now = time.monotonic()
+            for stale in [k for k, (_, at) in self._data.items() if at is not None and at <= now]:
+                del self._data[stale]
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            return self._lookup(key)
+
+    def get_many(self, *keys):
+        with self._lock:
+            return [self._lookup(key) for key in keys]
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._store(key, value, self._expiry(timeout))
+
+    def add(self, key, value, timeout=None):
+        """Sets `key` only if it is missing (or expired). Returns whether it was set."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] > time.monotonic()):
+                return False
+            self._store(key, value, self._expiry(timeout))
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key, delta=1):
+        """Adds `delta` to an existing integer. Missing keys stay missing and return None."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or (item[1] is not None and item[1] <= time.monotonic()):
+                return None
+            value = item[0] + delta
+            self._data[key] = (value, item[1])
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class LRUCache:
+    """
+    Bounded per-process cache that evicts the least recently used entry and
+    expires entries after `timeout` seconds. Keeps hit/miss counters.
+    """
+
+    def __init__(self, maxsize=1024, timeout=60):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class RedisCache:
+    """Cache shared across processes through Redis."""
+
+    prefix = 'encypherist:cache:'
+
+    # INCRBY only when the key exists, so a missing counter is recomputed
+    # from the database instead of starting again from zero
+    _incr_existing = "if redis.call('exists', KEYS[1]) == 1 then return redis.call('incrby', KEYS[1], ARGV[1]) end return nil"
+
+    def __init__(self, url, default_timeout=300):
+        import redis  # Optional dependency, only needed for multi-worker deployments
+
+        self.default_timeout = default_timeout
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def get_many(self, *keys):
+        # One MGET round trip for all the keys
+        values = self._redis.mget([self.prefix + key for key in keys])
+        return [json.loads(value) if value is not None else None for value in values]
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        self._redis.set(self.prefix + key, json.dumps(value), ex=timeout or None)
+
+    def add(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        return bool(self._redis.set(self.prefix + key, json.dumps(value), ex=timeout or None, nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self._redis.delete(*[self.prefix + key for key in keys])
+
+    def incr(self, key, delta=1):
+        return self._redis.eval(self._incr_existing, 1, self.prefix + key, delta)
+
+    def clear(self):
+        for key in self._redis.scan_iter(self.prefix + '*'):
+            self._redis.delete(key)
+
+
+def create_cache(url=None, default_timeout=300, max_entries=10000):
+    """
+    Builds a cache from a URL such as `redis://localhost:6379/1`; defaults to
+    in-process, holding at most `max_entries` keys.
+    """
+    if url and url.startswith(('redis://', 'rediss://')):
+        return RedisCache(url, default_timeout)
+    return SimpleCache(default_timeout, max_entries)
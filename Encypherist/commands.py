@@ -0,0 +1,344 @@
+"""
+`flask` CLI commands: asset and avatar builds, the query plan check, the
+bulk seed and the payment worker. `create_app` registers every command in
+COMMANDS.
+"""
+import collections
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+
+from blueprints.auth import set_profile_picture
+from blueprints.events import REVIEWS_PER_PAGE
+from blueprints.messaging import MESSAGES_PAGE_SIZE
+from blueprints.organizer import ATTENDEES_PER_PAGE, attendees_query, roster_rows
+from database import insert_in_batches, reset_sequence
+from extensions import asset_pipeline, db, image_pipeline, password_hasher
+from images import InvalidImage, is_processed_name
+from models import Booking, Event, Message, Notification, NotificationPreference, PaymentEvent, Review, User, \
+    UserActivity, invalidate_all_users
+from payment_queue import run_worker
+from query_plans import analyze, discourage_seqscans, explain, sequential_scans
+from response_cache import invalidate_tags
+
+
+@click.command('assets-build')
+@with_appcontext
+def assets_build():
+    """Precompresses text assets in static/ with gzip and brotli."""
+    written = asset_pipeline.build()
+    print(f"Wrote {written} compressed asset(s)")
+
+@click.command('process-avatars')
+@with_appcontext
+def process_avatars():
+    """Converts profile pictures uploaded before thumbnails existed."""
+    users = User.query.filter(User.profile_picture.isnot(None)).all()
+    for user in users:
+        if is_processed_name(user.profile_picture):
+            continue
+        path = os.path.join(image_pipeline.storage_dir, user.profile_picture)
+        try:
+            with open(path, 'rb') as f:
+                digest = image_pipeline.process(f.read())
+            set_profile_picture(user.id, digest)
+            print(f"Processed picture for {user.username}")
+        except (OSError, InvalidImage) as e:
+            print(f"Skipping {user.username}: {str(e)}")
+
+# --- Query plan checks ---
+# Every query a hot page runs should be served by an index. `flask
+# check-query-plans` EXPLAINs each of them and fails if one would read a
+# whole table, so a dropped index or a rewritten filter shows up before it
+# reaches production.
+
+def hot_queries(user_id, other_user_id, organizer_id, event_id):
+    now = datetime.utcnow()
+    conversation = db.or_(
+        db.and_(Message.sender_id == user_id, Message.receiver_id == other_user_id),
+        db.and_(Message.sender_id == other_user_id, Message.receiver_id == user_id)
+    )
+    return {
+        'landing: past events': db.select(Event).where(Event.date < now),
+        'landing: featured events': db.select(Event).where(Event.date > now).order_by(Event.date).limit(3),
+        'home: upcoming events': db.select(Event).where(Event.date > now).order_by(Event.date),
+        'login: user by username': db.select(User).where(User.username == 'alice'),
+        'book: existing booking': db.select(Booking).where(
+            Booking.event_id == event_id, Booking.user_id == user_id).limit(1),
+        'profile: student bookings': db.select(Booking)
+            .join(Event, Booking.event_id == Event.id)
+            .where(Booking.user_id == user_id)
+            .order_by(Booking.booking_date.desc()),
+        'profile: organizer events': db.select(Event)
+            .where(Event.organizer_id == organizer_id).order_by(Event.date.desc()),
+        'admin: pending events': db.select(db.func.count()).select_from(Event)
+            .where(Event.status == 'pending'),
+        'admin: activity log': db.select(UserActivity)
+            .order_by(UserActivity.timestamp.desc()).limit(20),
+        'event update: bookings': db.select(Booking).where(Booking.event_id == event_id),
+        'reminders: events tomorrow': db.select(Event)
+            .where(Event.date > now, Event.date <= now + timedelta(days=1)),
+        'messages: partners sent to': db.select(Message.receiver_id).where(Message.sender_id == user_id),
+        'messages: partners received from': db.select(Message.sender_id).where(Message.receiver_id == user_id),
+        'messages: conversation page': db.select(Message).where(conversation)
+            .order_by(Message.timestamp.desc(), Message.id.desc()).limit(MESSAGES_PAGE_SIZE),
+        'messages: unread from user': db.select(db.func.count()).select_from(Message)
+            .where(Message.sender_id == other_user_id, Message.receiver_id == user_id, Message.read == False),
+        'unread: messages': db.select(db.func.count()).select_from(Message)
+            .where(Message.receiver_id == user_id, Message.read == False),
+        'unread: notifications': db.select(db.func.count()).select_from(Notification)
+            .where(Notification.user_id == user_id, Notification.read == False),
+        'notifications: page': db.select(Notification).where(Notification.user_id == user_id)
+            .order_by(Notification.timestamp.desc()).limit(20),
+        'notifications: preferences': db.select(NotificationPreference)
+            .where(NotificationPreference.user_id == user_id),
+        'reviews: page': db.select(Review, User.username).join(User, Review.user_id == User.id)
+            .where(Review.event_id == event_id)
+            .order_by(Review.created_at.desc(), Review.id.desc()).limit(REVIEWS_PER_PAGE),
+        'reviews: existing review': db.select(Review)
+            .where(Review.user_id == user_id, Review.event_id == event_id),
+        'payments: booking status': db.select(Booking)
+            .where(Booking.payment_id == f'plan_{event_id}_0', Booking.user_id == user_id),
+        'payments: next due event': db.select(PaymentEvent)
+            .where(PaymentEvent.processed_at.is_(None), PaymentEvent.next_attempt_at <= now)
+            .order_by(PaymentEvent.next_attempt_at).limit(1),
+        'organizer: attendee count': db.select(db.func.count()).select_from(attendees_query(event_id)),
+        'organizer: attendee page': roster_rows(attendees_query(event_id, 'a')).limit(ATTENDEES_PER_PAGE),
+    }
+
+def seed_query_plan_data(count):
+    """Inserts `count` synthetic rows per table so plans reflect a realistic size."""
+    now = datetime.utcnow()
+    base_user = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    base_event = (db.session.query(db.func.max(Event.id)).scalar() or 0) + 1
+    users = range(base_user, base_user + count)
+    events = range(base_event, base_event + count)
+
+    db.session.execute(db.insert(User), [
+        {'id': i, 'username': f'plan_user_{i}', 'password': '!', 'role': 'organizer' if i % 10 == 0 else 'student'}
+        for i in users
+    ])
+    db.session.execute(db.insert(Event), [
+        {'id': i, 'title': f'Event {i}', 'description': '', 'location': '', 'price': 0,
+         'date': now + timedelta(days=i % 365 - 30), 'organizer_id': base_user + i % count // 10 * 10,
+         'total_tickets': 100, 'remaining_tickets': 100, 'status': 'approved' if i % 5 else 'pending',
+         'created_at': now - timedelta(minutes=i)}
+        for i in events
+    ])
+    db.session.execute(db.insert(Booking), [
+        {'user_id': base_user + n % count, 'event_id': base_event + n * 7 % count,
+         'payment_id': f'plan_{base_event}_{n}', 'payment_status': 'completed', 'booking_date': now - timedelta(minutes=n),
+         'name': '', 'email': '', 'mobile': '', 'branch': '', 'year': ''}
+        for n in range(count)
+    ])
+    db.session.execute(db.insert(Message), [
+        {'sender_id': base_user + n % count, 'receiver_id': base_user + (n * 7 + 1) % count,
+         'content': '', 'timestamp': now - timedelta(minutes=n), 'read': n % 3 == 0}
+        for n in range(count)
+    ])
+    db.session.execute(db.insert(Notification), [
+        {'user_id': base_user + n % count, 'type': 'in_app', 'title': '', 'content': '',
+         'timestamp': now - timedelta(minutes=n), 'read': n % 3 == 0}
+        for n in range(count)
+    ])
+    db.session.execute(db.insert(NotificationPreference), [{'user_id': i} for i in users])
+    db.session.execute(db.insert(Review), [
+        {'user_id': base_user + n % count, 'event_id': base_event + n * 3 % count, 'rating': n % 5 + 1,
+         'created_at': now - timedelta(minutes=n)}
+        for n in range(count)
+    ])
+    db.session.execute(db.insert(UserActivity), [
+        {'user_id': base_user + n % count, 'activity_type': 'login', 'timestamp': now - timedelta(minutes=n)}
+        for n in range(count)
+    ])
+    # Almost every payment event has been applied; only the due ones are looked at
+    db.session.execute(db.insert(PaymentEvent), [
+        {'event_key': f'plan_{base_event}_{n}', 'event_type': 'PAYMENT.SALE.COMPLETED',
+         'payment_id': f'plan_{base_event}_{n}', 'payload': '{}', 'received_at': now - timedelta(minutes=n),
+         'next_attempt_at': now - timedelta(minutes=n), 'processed_at': None if n % 100 == 0 else now}
+        for n in range(count)
+    ])
+    return base_user, base_event
+
+@click.command('check-query-plans')
+@click.option('--seed', default=2000, show_default=True,
+              help='Synthetic rows per table to insert first (rolled back afterwards). 0 uses the data as it is.')
+@click.option('--verbose', is_flag=True, help='Print every plan, not only the failing ones.')
+@with_appcontext
+def check_query_plans(seed, verbose):
+    """Fails if any hot query falls back to a sequential scan."""
+    failures = []
+    try:
+        connection = db.session.connection()
+        if seed:
+            base_user, base_event = seed_query_plan_data(seed)
+            user_id, other_user_id, organizer_id, event_id = base_user, base_user + 1, base_user + 10, base_event
+            analyze(connection)
+        else:
+            user_id, other_user_id, organizer_id, event_id = 1, 2, 1, 1
+        discourage_seqscans(connection)
+
+        for name, statement in hot_queries(user_id, other_user_id, organizer_id, event_id).items():
+            scanned = sequential_scans(connection, statement)
+            if scanned:
+                failures.append(name)
+            if scanned or verbose:
+                status = f"SEQ SCAN on {', '.join(scanned)}" if scanned else 'ok'
+                print(f"{name}: {status}")
+                if verbose:
+                    print(f"    {explain(connection, statement)}")
+    finally:
+        # Nothing seeded here is ever kept
+        db.session.rollback()
+
+    if failures:
+        print(f"--- {len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} without a usable index ---")
+        sys.exit(1)
+    print("All hot queries use an index")
+
+# --- Seed data ---
+# `flask seed` bulk-loads synthetic data for capacity testing. Accounts are
+# named student<n>@seed.test / organizer<n>@seed.test, numbered on from any
+# earlier run, and all share one password so load tests can log in as them.
+
+SEED_DOMAIN = 'seed.test'
+SEED_CATEGORIES = ['music', 'tech', 'sports', 'art', 'workshop', 'cultural']
+
+def seeded_count(role):
+    return User.query.filter(User.username.like(f'{role}%@{SEED_DOMAIN}'), User.role == role).count()
+
+@click.command('seed')
+@click.option('--students', default=1000, show_default=True)
+@click.option('--organizers', default=50, show_default=True)
+@click.option('--events', default=200, show_default=True)
+@click.option('--bookings', default=5000, show_default=True)
+@click.option('--messages', default=20000, show_default=True)
+@click.option('--notifications', default=20000, show_default=True)
+@click.option('--reviews', default=2000, show_default=True, help='Only students who booked an event review it.')
+@click.option('--password', default='password123', show_default=True, help='Password of every seeded account.')
+@click.option('--batch-size', default=10000, show_default=True)
+@click.option('--random-seed', default=42, show_default=True)
+@with_appcontext
+def seed(students, organizers, events, bookings, messages, notifications, reviews, password, batch_size, random_seed):
+    """Bulk-loads synthetic users, events, bookings, messages, notifications and reviews."""
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    connection = db.session.connection()
+
+    first_student = seeded_count('student') + 1
+    first_organizer = seeded_count('organizer') + 1
+    base_user = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    base_event = (db.session.query(db.func.max(Event.id)).scalar() or 0) + 1
+    student_ids = list(range(base_user, base_user + students))
+    organizer_ids = list(range(base_user + students, base_user + students + organizers))
+    event_ids = list(range(base_event, base_event + events))
+    # Without new organizers, seeded events go to the existing ones
+    hosts = organizer_ids or [user_id for user_id, in db.session.query(User.id).filter_by(role='organizer')]
+    if events and not hosts:
+        raise click.UsageError('Events need organizers: pass --organizers or create one first')
+
+    # One hash for everyone; hashing thousands of passwords would dominate the run
+    password_hash = password_hasher.hash(password)
+    counts = {}
+    counts['user'] = insert_in_batches(connection, User, itertools.chain(
+        ({'id': user_id, 'username': f'student{first_student + i}@{SEED_DOMAIN}', 'password': password_hash,
+          'role': 'student'} for i, user_id in enumerate(student_ids)),
+        ({'id': user_id, 'username': f'organizer{first_organizer + i}@{SEED_DOMAIN}', 'password': password_hash,
+          'role': 'organizer'} for i, user_id in enumerate(organizer_ids)),
+    ), batch_size)
+    reset_sequence(connection, User.__table__)
+
+    # Bookings and reviews are drawn first so the event rows can carry matching counters
+    booking_pairs = set()
+    bookings = min(bookings, len(student_ids) * len(event_ids))
+    while len(booking_pairs) < bookings:
+        booking_pairs.add((rng.choice(student_ids), rng.choice(event_ids)))
+    booking_pairs = sorted(booking_pairs)
+    booked = collections.Counter(event_id for _, event_id in booking_pairs)
+    review_rows = [(user_id, event_id, rng.randint(1, 5))
+                   for user_id, event_id in rng.sample(booking_pairs, min(reviews, len(booking_pairs)))]
+    rating_sums = collections.Counter()
+    for _, event_id, rating in review_rows:
+        rating_sums[event_id] += rating
+    rated = collections.Counter(event_id for _, event_id, _ in review_rows)
+
+    def event_rows():
+        for event_id in event_ids:
+            # Past events are deleted by the home page, so every seeded event is upcoming
+            total_tickets = max(rng.choice([50, 100, 200, 500, 1000]), booked[event_id])
+            yield {
+                'id': event_id, 'title': f'Seed event {event_id}',
+                'description': f'Synthetic event {event_id} for load testing.',
+                'location': f'Hall {rng.randint(1, 20)}', 'price': float(rng.choice([0, 0, 50, 100, 250, 500])),
+                'date': now + timedelta(days=rng.randint(1, 180), hours=rng.randint(0, 23)),
+                'organizer_id': rng.choice(hosts), 'total_tickets': total_tickets,
+                'remaining_tickets': total_tickets - booked[event_id], 'is_group_event': False,
+                'min_group_size': 1, 'max_group_size': 1, 'category': rng.choice(SEED_CATEGORIES),
+                'status': 'approved' if rng.random() < 0.9 else 'pending',
+                'created_at': now - timedelta(days=rng.randint(0, 60)),
+                'rating_sum': rating_sums[event_id], 'rating_count': rated[event_id],
+            }
+
+    counts['event'] = insert_in_batches(connection, Event, event_rows(), batch_size)
+    reset_sequence(connection, Event.__table__)
+
+    counts['booking'] = insert_in_batches(connection, Booking, ({
+        'user_id': user_id, 'event_id': event_id, 'payment_status': 'succeeded',
+        'payment_id': f'seed_{user_id}_{event_id}', 'booking_date': now - timedelta(minutes=rng.randint(0, 86400)),
+        'name': f'Student {user_id}', 'email': f'student{user_id}@{SEED_DOMAIN}', 'mobile': '9000000000',
+        'branch': rng.choice(['CSE', 'ECE', 'ME', 'CE', 'EE']), 'year': str(rng.randint(1, 4)),
+    } for user_id, event_id in booking_pairs), batch_size)
+
+    people = student_ids + organizer_ids
+
+    def message_rows():
+        for n in range(messages if len(people) > 1 else 0):
+            sender, receiver = rng.sample(people, 2)
+            yield {
+                'sender_id': sender, 'receiver_id': receiver, 'content': f'Seed message {n}',
+                'timestamp': now - timedelta(seconds=rng.randint(0, 30 * 86400)), 'read': rng.random() < 0.7,
+            }
+
+    counts['message'] = insert_in_batches(connection, Message, message_rows(), batch_size)
+
+    counts['notification'] = insert_in_batches(connection, Notification, ({
+        'user_id': rng.choice(people), 'event_id': rng.choice(event_ids) if event_ids else None, 'type': 'in-app',
+        'title': 'Event update', 'content': f'Seed notification {n}',
+        'timestamp': now - timedelta(seconds=rng.randint(0, 30 * 86400)), 'sent': True, 'read': rng.random() < 0.5,
+    } for n in range(notifications if people else 0)), batch_size)
+
+    counts['review'] = insert_in_batches(connection, Review, ({
+        'user_id': user_id, 'event_id': event_id, 'rating': rating,
+        'review_text': 'Great event!' if rating >= 4 else 'Could be better.',
+        'created_at': now - timedelta(minutes=rng.randint(0, 86400)),
+    } for user_id, event_id, rating in review_rows), batch_size)
+
+    db.session.commit()
+    # COPY bypasses the ORM events that normally invalidate these
+    invalidate_tags('event', 'booking', 'review')
+    invalidate_all_users()
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"{table:14} {count:>10,}")
+    print(f"Loaded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s). "
+          f"Accounts use the password '{password}'.")
+
+@click.command('process-payments')
+@click.option('--once', is_flag=True, help='Apply the events that are due and exit instead of polling.')
+@click.option('--poll', default=1.0, show_default=True, help='Seconds to wait when the queue is empty.')
+@with_appcontext
+def process_payments(once, poll):
+    """Applies queued payment events: checkout returns and PayPal webhooks."""
+    print("Processing payment events" + ("" if once else ", Ctrl+C to stop"))
+    run_worker(poll_seconds=poll, once=once)
+
+COMMANDS = (assets_build, process_avatars, check_query_plans, seed, process_payments)
@@ -0,0 +1,91 @@
+"""
+HTML minification and on-the-fly response compression.
+
+`minify_html` collapses whitespace and drops comments while leaving <pre>,
+<textarea> and <script> blocks untouched. `compress` encodes a body with
+brotli (when installed) or gzip. `CompressionStats` keeps per-route byte
+counts so the savings can be checked in production.
+"""
+import gzip
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip is always available
+    brotli = None
+
+# Smallest body worth compressing for each content type; anything else is left alone
+MIN_SIZE_BY_TYPE = {
+    'text/html': 1024,
+    'application/json': 1024,
+    'text/plain': 1024,
+    'text/csv': 1024,
+    'text/css': 512,
+    'text/javascript': 512,
+    'application/javascript': 512,
+    'image/svg+xml': 512,
+    'text/event-stream': None,
+}
+
+_PROTECTED = re.compile(r'(<(pre|textarea|script)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+_WHITESPACE = re.compile(r'\s+')
+_BETWEEN_BLOCKS = re.compile(r'>\s+<')
+
+
+def minify_html(html):
+    parts = _PROTECTED.split(html)
+    out = []
+    # split() with two groups yields: text, protected block, tag name, text, ...
+    for i in range(0, len(parts), 3):
+        text = _COMMENT.sub('', parts[i])
+        text = _WHITESPACE.sub(' ', text)
+        # A single space between tags renders the same as any longer run
+        out.append(_BETWEEN_BLOCKS.sub('> <', text))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return ''.join(out).strip()
+
+
+def choose_encoding(accept_encoding):
+    accepted = {part.split(';')[0].strip() for part in (accept_encoding or '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def min_size_for(mimetype):
+    return MIN_SIZE_BY_TYPE.get(mimetype)
+
+
+class CompressionStats:
+    """Per-endpoint totals of bytes rendered, after minification and on the wire."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, original, minified, sent):
+        with self._lock:
+            totals = self._routes.setdefault(route, {'responses': 0, 'original': 0, 'minified': 0, 'sent': 0})
+            totals['responses'] += 1
+            totals['original'] += original
+            totals['minified'] += minified
+            totals['sent'] += sent
+
+    def report(self):
+        with self._lock:
+            routes = {route: dict(totals) for route, totals in self._routes.items()}
+        for totals in routes.values():
+            totals['saved'] = totals['original'] - totals['sent']
+            totals['saved_ratio'] = totals['saved'] / totals['original'] if totals['original'] else 0.0
+        return dict(sorted(routes.items(), key=lambda item: item[1]['saved'], reverse=True))
@@ -0,0 +1,316 @@
+"""
+Database engine profiles and connection pool metrics.
+
+Each profile is a set of SQLAlchemy engine options tuned for one way of
+running the app:
+
+    dev        local SQLite, library defaults
+    prod       direct PostgreSQL connections, pooled per worker
+    pgbouncer  PostgreSQL behind a transaction-mode pooler (pgbouncer, Supavisor)
+
+Pick one with DB_PROFILE, or let `resolve_profile` guess from the URL.
+Individual settings can be overridden with DB_POOL_SIZE, DB_MAX_OVERFLOW,
+DB_POOL_RECYCLE, DB_POOL_TIMEOUT and DB_STATEMENT_TIMEOUT_MS.
+
+Views marked with `@read_only` can be served from read replicas through
+`RoutingSession`, see `ReplicaRouter`. `bulk_insert` loads large batches of
+rows with COPY on PostgreSQL.
+"""
+import csv
+import io
+import itertools
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+ENGINE_PROFILES = {
+    'dev': {
+        'pool': {},
+        'statement_timeout_ms': None,
+    },
+    'prod': {
+        'pool': {
+            'pool_size': 5,
+            'max_overflow': 10,
+            'pool_timeout': 10,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+        },
+        'statement_timeout_ms': 5000,
+        # Sent once as a startup parameter, so it costs nothing per query
+        'statement_timeout_mode': 'startup',
+    },
+    'pgbouncer': {
+        'pool': {
+            # The pooler multiplexes server connections, keep only a few client ones warm
+            'pool_size': 3,
+            'max_overflow': 5,
+            'pool_timeout': 10,
+            # Poolers drop idle clients, recycle before they do
+            'pool_recycle': 300,
+            'pool_pre_ping': True,
+        },
+        'statement_timeout_ms': 5000,
+        # Transaction poolers reject startup options and share sessions, so use SET LOCAL
+        'statement_timeout_mode': 'transaction',
+    },
+}
+
+_ENV_OVERRIDES = {
+    'DB_POOL_SIZE': 'pool_size',
+    'DB_MAX_OVERFLOW': 'max_overflow',
+    'DB_POOL_RECYCLE': 'pool_recycle',
+    'DB_POOL_TIMEOUT': 'pool_timeout',
+}
+
+
+def normalize_database_url(url):
+    # Render and Heroku hand out postgres:// URLs, which SQLAlchemy no longer accepts
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def resolve_profile(url, name=None):
+    """Returns the profile name to use for `url`."""
+    if name:
+        if name not in ENGINE_PROFILES:
+            raise ValueError(f"Unknown DB_PROFILE '{name}', expected one of {', '.join(ENGINE_PROFILES)}")
+        return name
+    parsed = make_url(url)
+    if parsed.get_backend_name() != 'postgresql':
+        return 'dev'
+    # 6543 is the conventional transaction-pooler port (Supabase, Render)
+    if parsed.port == 6543 or 'pgbouncer' in (parsed.host or '') or 'pooler' in (parsed.host or ''):
+        return 'pgbouncer'
+    return 'prod'
+
+
+def engine_options(profile_name, environ=os.environ):
+    """Builds SQLALCHEMY_ENGINE_OPTIONS for a profile, applying env overrides."""
+    profile = ENGINE_PROFILES[profile_name]
+    options = dict(profile['pool'])
+    for env_key, option in _ENV_OVERRIDES.items():
+        if environ.get(env_key):
+            options[option] = int(environ[env_key])
+
+    timeout = int(environ.get('DB_STATEMENT_TIMEOUT_MS', profile['statement_timeout_ms'] or 0)) or None
+    if timeout and profile.get('statement_timeout_mode') == 'startup':
+        options['connect_args'] = {'options': f'-c statement_timeout={timeout}'}
+
+    if profile_name != 'dev':
+        options['poolclass'] = InstrumentedQueuePool
+    return options, timeout
+
+
+def install_transaction_timeout(engine, timeout_ms):
+    """Applies a statement timeout at the start of every transaction (pooler-safe)."""
+    @event.listens_for(engine, 'begin')
+    def set_statement_timeout(connection):
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout_ms)}')
+
+
+class PoolMetrics:
+    """Process-wide counters for connection checkouts and the time spent waiting for one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': self.wait_total / self.wait_count * 1000 if self.wait_count else 0.0,
+                'wait_max_ms': self.wait_max * 1000,
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                'pool_size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+@event.listens_for(Pool, 'checkout')
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.record_checkout()
+
+
+@event.listens_for(Pool, 'connect')
+def _count_connect(dbapi_connection, connection_record):
+    pool_metrics.record_connect()
+
+
+class ReplicaRouter:
+    """
+    Chooses between the primary and the read replicas for the current request.
+
+    Reads go to a replica only when the view is marked `@read_only`, nothing
+    has been written yet in this request, and the client has not written
+    within the last `sticky_seconds` (so users always see their own writes).
+    """
+
+    def __init__(self, sticky_seconds=5):
+        self.sticky_seconds = sticky_seconds
+        self.engines = []
+        self._cycle = None
+
+    def configure(self, urls, options_for_url):
+        self.engines = [create_engine(url, **options_for_url(url)) for url in urls]
+        self._cycle = itertools.cycle(self.engines) if self.engines else None
+
+    def mark_write(self):
+        if has_request_context():
+            g.db_wrote = True
+
+    def replica_for_request(self):
+        if not self.engines or not has_request_context():
+            return None
+        if not g.get('db_read_only') or g.get('db_wrote') or g.get('db_sticky'):
+            return None
+        if 'db_replica' not in g:
+            # One replica per request keeps its reads consistent with each other
+            g.db_replica = next(self._cycle)
+        return g.db_replica
+
+
+replica_router = ReplicaRouter()
+
+
+def read_only(view):
+    """
+    Marks a view whose reads may be served by a replica. Only for views that
+    never write: a view that reads and then writes would decide what to
+    change from possibly stale replica data.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Session that sends reads from read-only views to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            is_write = self._flushing or getattr(clause, 'is_dml', False) \
+                or getattr(clause, '_for_update_arg', None) is not None
+            if is_write:
+                replica_router.mark_write()
+            else:
+                replica = replica_router.replica_for_request()
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _copy_value(value):
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+def bulk_insert(connection, table, rows):
+    """
+    Inserts a batch of row dicts (all with the same keys) in one round trip:
+    COPY FROM STDIN on PostgreSQL with psycopg2, executemany everywhere else.
+    """
+    if not rows:
+        return 0
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        buffer.seek(0)
+        preparer = connection.dialect.identifier_preparer
+        column_list = ', '.join(preparer.quote(column) for column in columns)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {preparer.format_table(table)} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+        finally:
+            cursor.close()
+    else:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+
+def insert_in_batches(connection, model, rows, batch_size):
+    """Feeds an iterable of row dicts to bulk_insert `batch_size` rows at a time."""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += bulk_insert(connection, model.__table__, batch)
+            batch = []
+    return total + bulk_insert(connection, model.__table__, batch)
+
+
+def reset_sequence(connection, table, column='id'):
+    """Moves a PostgreSQL serial sequence past ids that were inserted explicitly."""
+    if connection.dialect.name != 'postgresql':
+        return
+    name = connection.dialect.identifier_preparer.format_table(table)
+    connection.exec_driver_sql(
+        f"SELECT setval(pg_get_serial_sequence('{name}', '{column}'), COALESCE(MAX({column}), 1)) FROM {name}"
+    )
@@ -0,0 +1,36 @@
+"""
+Extension and service objects shared by the blueprints.
+
+The Flask extensions are created unbound and attached to the app by
+`create_app`. The app's own services (cache, broker, password hasher, ...)
+are built from the environment at the same time and stored in
+`app.extensions`; the names below are proxies to the current app's instance,
+so modules can import them at the top without importing the app.
+"""
+from flask import current_app
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+from flask_wtf.csrf import CSRFProtect
+from werkzeug.local import LocalProxy
+
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+csrf = CSRFProtect()
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+
+def _service(name):
+    return LocalProxy(lambda: current_app.extensions[name])
+
+
+broker = _service('broker')
+cache = _service('cache')
+password_hasher = _service('password_hasher')
+image_pipeline = _service('image_pipeline')
+asset_pipeline = _service('asset_pipeline')
+user_cache = _service('user_cache')
+compression_stats = _service('compression_stats')
+route_query_stats = _service('route_query_stats')
+payment_gateway = _service('payment_gateway')
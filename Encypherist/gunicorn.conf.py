@@ -0,0 +1,53 @@
+# Gunicorn settings picked up automatically from the working directory.
+#
+# Each worker keeps its own Prometheus counters; pointing them all at one
+# directory lets /metrics merge them (see metrics.py). The directory is set
+# here, before the app is imported, and emptied on every start so counters
+# from a previous run are not added to the new ones.
+#
+# GUNICORN_PRELOAD=true imports the app once in the master and forks workers
+# from it, so they start faster and share its memory copy-on-write.
+import gc
+import os
+import shutil
+import sys
+import tempfile
+
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'encypherist-metrics')
+)
+shutil.rmtree(multiproc_dir, ignore_errors=True)
+os.makedirs(multiproc_dir, exist_ok=True)
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() in ['true', '1', 't']
+
+# gevent workers patch the standard library after forking, which is too late
+# for modules the master already imported; patch before the app is loaded
+if preload_app and 'gevent' in ' '.join(sys.argv + [os.getenv('GUNICORN_CMD_ARGS', '')]):
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from app import preload_heavy_modules
+    preload_heavy_modules()
+    # Keep the garbage collector from touching (and so copying) the master's objects in every worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if 'gevent' in server.cfg.worker_class_str:
+        # psycopg2 is a C extension that gevent cannot patch; without a wait
+        # callback every query blocks the whole worker, not just its greenlet
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    if server.cfg.preload_app:
+        from app import app, reset_after_fork
+        reset_after_fork(app)
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -0,0 +1,48 @@
+"""
+Template globals and the /assets route for fingerprinted static files.
+"""
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory, url_for
+
+from extensions import asset_pipeline
+from images import is_processed_name
+
+
+def asset_url(filename):
+    """Fingerprinted URL for a file in static/, or the plain static URL as a fallback."""
+    if current_app.config['ASSET_FINGERPRINTS']:
+        fingerprinted = asset_pipeline.fingerprint(filename)
+        if fingerprinted:
+            return url_for('assets', filename=fingerprinted)
+    return url_for('static', filename=filename)
+
+def avatar_url(user, size=64, fmt='webp'):
+    """URL of a user's profile picture at `size` px (64 or 256)."""
+    if not user or not user.profile_picture:
+        return f'https://www.gravatar.com/avatar/{user.id if user else 0}?d=mp&s={size}'
+    if is_processed_name(user.profile_picture):
+        return asset_url(f'uploads/{user.profile_picture}_{size}.{fmt}')
+    # Uploads from before thumbnails existed are served as they are
+    return asset_url('uploads/' + user.profile_picture)
+
+def assets(filename):
+    static_folder = current_app.static_folder
+    original, is_current = asset_pipeline.resolve(filename)
+    compressed, encoding = asset_pipeline.compressed_variant(original, request.headers.get('Accept-Encoding'))
+    mimetype = mimetypes.guess_type(original)[0] or 'application/octet-stream'
+
+    if compressed:
+        response = send_from_directory(static_folder, os.path.relpath(compressed, static_folder), mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(static_folder, original, mimetype=mimetype)
+
+    response.vary.add('Accept-Encoding')
+    if is_current:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        # Stale or unhashed URL: serve the current file but make clients revalidate
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,98 @@
+"""
+Idempotency keys for POST routes that create things.
+
+Forms carry a hidden `idempotency_key` (from the `idempotency_key()`
+template global); API clients can send an `Idempotency-Key` header instead.
+The first request with a key claims it in the shared cache and runs the view.
+Its response is stored for `timeout` seconds. A repeated request with the
+same key, such as a double-clicked submit button or a browser retry, gets
+that stored response back instead of booking again. A repeat that arrives
+while the first request is still running waits briefly for it to finish.
+
+Keys are scoped to the user and endpoint. Use a shared cache (CACHE_URL)
+when running several workers, or a repeat that lands on another worker will
+not see the key.
+"""
+import re
+import time
+from functools import wraps
+
+from flask import current_app, flash, request, session
+from flask_login import current_user
+
+from extensions import cache
+from ids import new_ulid
+
+IDEMPOTENCY_TIMEOUT = 24 * 60 * 60
+WAIT_SECONDS = 5
+MAX_STORED_BODY = 64 * 1024
+VALID_KEY = re.compile(r'^[A-Za-z0-9_\-:.]{8,100}$')
+
+
+def idempotency_key():
+    return new_ulid()
+
+def request_key():
+    key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key')
+    return key if key and VALID_KEY.match(key) else None
+
+def replay(entry):
+    # The flashes went out with the first response, which the browser may never have shown
+    if 300 <= entry['status'] < 400:
+        for category, message in entry['flashes']:
+            flash(message, category)
+    response = current_app.response_class(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+    if entry['location']:
+        response.headers['Location'] = entry['location']
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(timeout=IDEMPOTENCY_TIMEOUT):
+    """Runs a POST view at most once per idempotency key and replays its response for repeats."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request_key() if request.method == 'POST' else None
+            if key is None:
+                return view(*args, **kwargs)
+
+            user_id = current_user.get_id() if current_user.is_authenticated else 'anonymous'
+            cache_key = f'idempotency:{user_id}:{request.endpoint}:{key}'
+
+            if not cache.add(cache_key, {'state': 'running'}, timeout=timeout):
+                deadline = time.monotonic() + WAIT_SECONDS
+                entry = cache.get(cache_key)
+                while entry is not None and entry['state'] == 'running' and time.monotonic() < deadline:
+                    time.sleep(0.1)
+                    entry = cache.get(cache_key)
+                if entry is None:
+                    # The first attempt failed and released the key; this one may try again
+                    return wrapper(*args, **kwargs)
+                if entry['state'] == 'running':
+                    return current_app.response_class(
+                        'This request is already being processed.\n', status=409, mimetype='text/plain')
+                return replay(entry)
+
+            flashes_before = len(session.get('_flashes', []))
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                cache.delete(cache_key)
+                raise
+
+            if response.status_code >= 500 or response.is_streamed or response.direct_passthrough:
+                cache.delete(cache_key)
+                return response
+
+            body = response.get_data(as_text=True)
+            cache.set(cache_key, {
+                'state': 'done',
+                'status': response.status_code,
+                'location': response.headers.get('Location'),
+                'mimetype': response.mimetype,
+                'body': body if len(body) <= MAX_STORED_BODY else '',
+                'flashes': [list(item) for item in session.get('_flashes', [])[flashes_before:]]
+            }, timeout=timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,59 @@
+"""
+Unique, time-sortable identifiers.
+
+`new_ulid()` returns a ULID: a 48-bit millisecond timestamp followed by 80
+random bits, as 26 Crockford base32 characters. IDs from any number of
+workers never collide in practice and sort by creation time, so they make
+good booking references and keep a unique index append-mostly. Within one
+process, IDs made in the same millisecond are still ordered: the random part
+is incremented instead of drawn again.
+"""
+import os
+import threading
+import time
+
+CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def _reset():
+    global _last_ms, _last_random
+    _last_ms = 0
+    _last_random = 0
+
+
+# A forked worker must not continue its parent's sequence, or two workers
+# would hand out the same IDs in the same millisecond
+os.register_at_fork(after_in_child=_reset)
+
+
+def encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(CROCKFORD[digit])
+    return ''.join(reversed(chars))
+
+def new_ulid():
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms <= _last_ms:
+            now_ms = _last_ms
+            _last_random += 1
+            if _last_random >> RANDOM_BITS:
+                # 2**80 IDs in one millisecond: borrow the next one
+                now_ms += 1
+                _last_random = int.from_bytes(os.urandom(10), 'big')
+        else:
+            _last_random = int.from_bytes(os.urandom(10), 'big')
+        _last_ms = now_ms
+        return encode((now_ms << RANDOM_BITS) | _last_random, 26)
+
+def new_reference(prefix):
+    """A booking reference such as `booking_01HF3Q...`."""
+    return f'{prefix}_{new_ulid()}'
@@ -0,0 +1,128 @@
+"""
+Profile picture processing.
+
+Uploads are validated in the request, then re-encoded into fixed-size square
+thumbnails (WebP and JPEG) by a process pool. Files are stored under the
+SHA-256 of the uploaded bytes, so the same picture uploaded twice is only
+processed and stored once:
+
+    uploads/avatars/ab/abcdef..._64.webp
+    uploads/avatars/ab/abcdef..._256.jpg
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+THUMBNAIL_SIZES = (64, 256)
+ENCODINGS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+}
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_PIXELS = 40_000_000
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image we accept."""
+
+
+def picture_name(digest):
+    """The value stored in `User.profile_picture` for a processed upload."""
+    return f'avatars/{digest[:2]}/{digest}'
+
+
+def is_processed_name(name):
+    return bool(name) and name.startswith('avatars/')
+
+
+def thumbnail_paths(storage_dir, digest):
+    base = os.path.join(storage_dir, picture_name(digest))
+    return [f'{base}_{size}.{ext}' for size in THUMBNAIL_SIZES for ext in ENCODINGS]
+
+
+def validate_image(data):
+    """Cheap checks run in the request: size, format and pixel count."""
+    if not data:
+        raise InvalidImage('The uploaded file is empty')
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise InvalidImage(f'Images must be smaller than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB')
+    # Pillow is imported on first upload rather than when every worker boots
+    from PIL import Image
+    try:
+        with Image.open(BytesIO(data)) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise InvalidImage('Please upload a JPEG, PNG, WebP or GIF image')
+            if image.width * image.height > MAX_PIXELS:
+                raise InvalidImage('Image dimensions are too large')
+            image.verify()
+    except InvalidImage:
+        raise
+    except Exception:
+        raise InvalidImage('The uploaded file is not a valid image')
+
+
+def render_thumbnails(data, storage_dir, digest):
+    """Decodes the upload and writes every thumbnail. Runs in a pool process."""
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # Flatten transparency onto white so the JPEG variant looks the same
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+
+        base = os.path.join(storage_dir, picture_name(digest))
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        for size in THUMBNAIL_SIZES:
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            for ext, options in ENCODINGS.items():
+                path = f'{base}_{size}.{ext}'
+                # Write then rename, so a half-written file is never served
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                thumbnail.save(tmp_path, **options)
+                os.replace(tmp_path, path)
+    return digest
+
+
+class ImagePipeline:
+    def __init__(self, storage_dir, max_workers=2):
+        self.storage_dir = storage_dir
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Spawned lazily so forked gunicorn workers do not inherit pool state
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def submit(self, data):
+        """
+        Validates `data` and schedules thumbnailing. Returns `(digest, future)`;
+        `future` is None when the same image has already been processed.
+        """
+        validate_image(data)
+        digest = hashlib.sha256(data).hexdigest()
+        if all(os.path.exists(path) for path in thumbnail_paths(self.storage_dir, digest)):
+            return digest, None
+        return digest, self._get_executor().submit(render_thumbnails, data, self.storage_dir, digest)
+
+    def process(self, data):
+        """Synchronous variant for CLI use."""
+        validate_image(data)
+        digest = hashlib.sha256(data).hexdigest()
+        return render_thumbnails(data, self.storage_dir, digest)
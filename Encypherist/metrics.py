@@ -0,0 +1,95 @@
+"""
+Prometheus metrics.
+
+Under gunicorn every worker is its own process with its own counters. When
+PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this) each process
+writes its values to files in that directory and `render()` merges the files
+of all workers, so /metrics reports the whole server no matter which worker
+answers the scrape. Without it, e.g. under `flask run`, the values of the
+current process are reported.
+
+Business counters are meant to be read as rates, e.g.
+`rate(bookings_total[1m])` for bookings per second.
+"""
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+if MULTIPROCESS:
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time spent handling a request',
+    ['route', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'Requests currently being handled',
+    multiprocess_mode='livesum'
+)
+BOOKINGS = Counter('bookings_total', 'Tickets booked', ['kind'])
+SOLD_OUT_REJECTIONS = Counter('booking_sold_out_rejections_total', 'Booking attempts turned away because the event is sold out', ['route'])
+TICKET_RENDER_SECONDS = Histogram(
+    'ticket_render_seconds', 'Time spent rendering a ticket QR code and PDF',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+NOTIFICATION_QUEUE_DEPTH = Gauge(
+    'notification_queue_depth', 'Notification deliveries queued by event updates and reminders but not sent yet',
+    multiprocess_mode='livesum'
+)
+PAYMENT_GATEWAY_SECONDS = Histogram(
+    'payment_gateway_request_seconds', 'Time spent waiting on the payment provider',
+    ['operation', 'outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+PAYMENT_CIRCUIT_OPEN = Gauge(
+    'payment_gateway_circuit_open', 'Whether calls to the payment provider are being short-circuited',
+    multiprocess_mode='livemax'
+)
+PAYMENT_EVENTS = Counter('payment_events_total', 'Payment events received and applied', ['type', 'outcome'])
+NOTIFICATIONS_SENT = Counter('notifications_sent_total', 'Notifications processed', ['type', 'outcome'])
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections', 'Database connections currently checked out of the pool',
+    ['pool'], multiprocess_mode='livesum'
+)
+DB_POOL_SIZE = Gauge(
+    'db_pool_size', 'Configured database pool size (excluding overflow)',
+    ['pool'], multiprocess_mode='livesum'
+)
+
+
+def instrument_pool(pool, name):
+    """Tracks checked out connections of `pool` in the pool gauges, labelled `name`."""
+    size = pool.size() if isinstance(pool, QueuePool) else 1
+    pool_size = DB_POOL_SIZE.labels(name)
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+
+    @event.listens_for(pool, 'checkout')
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        # Set here rather than once, so every forked worker reports its own pool
+        pool_size.set(size)
+        checked_out.inc()
+
+    @event.listens_for(pool, 'checkin')
+    def _checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+
+def render():
+    """Returns `(body, content_type)` for a scrape."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Called by gunicorn when a worker exits, so its live gauges stop counting."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,45 @@
+"""Add trigram user search index
+
+Revision ID: 7a2f4e9b1c63
+Revises: 5e1d8a4c2b90
+Create Date: 2026-10-19 12:40:05.113876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2f4e9b1c63'
+down_revision = '5e1d8a4c2b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute('CREATE INDEX IF NOT EXISTS ix_user_username_trgm ON "user" USING gin (username gin_trgm_ops)')
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(username, content='user', content_rowid='id', tokenize='trigram')")
+        op.execute("CREATE TRIGGER IF NOT EXISTS user_search_ai AFTER INSERT ON user BEGIN "
+                   "INSERT INTO user_search(rowid, username) VALUES (new.id, new.username); END")
+        op.execute("CREATE TRIGGER IF NOT EXISTS user_search_ad AFTER DELETE ON user BEGIN "
+                   "INSERT INTO user_search(user_search, rowid, username) VALUES ('delete', old.id, old.username); END")
+        op.execute("CREATE TRIGGER IF NOT EXISTS user_search_au AFTER UPDATE OF username ON user BEGIN "
+                   "INSERT INTO user_search(user_search, rowid, username) VALUES ('delete', old.id, old.username); "
+                   "INSERT INTO user_search(rowid, username) VALUES (new.id, new.username); END")
+        # Index the users that already exist
+        op.execute("INSERT INTO user_search(user_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_user_username_trgm")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS user_search_au")
+        op.execute("DROP TRIGGER IF EXISTS user_search_ad")
+        op.execute("DROP TRIGGER IF EXISTS user_search_ai")
+        op.execute("DROP TABLE IF EXISTS user_search")
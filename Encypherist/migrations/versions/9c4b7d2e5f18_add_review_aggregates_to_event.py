@@ -0,0 +1,35 @@
+"""Add denormalized review aggregates to Event
+
+Revision ID: 9c4b7d2e5f18
+Revises: 7a2f4e9b1c63
+Create Date: 2026-10-19 13:55:32.640219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4b7d2e5f18'
+down_revision = '7a2f4e9b1c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the reviews that already exist
+    op.execute(
+        "UPDATE event SET "
+        "rating_sum = COALESCE((SELECT SUM(rating) FROM review WHERE review.event_id = event.id), 0), "
+        "rating_count = (SELECT COUNT(*) FROM review WHERE review.event_id = event.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,83 @@
+"""Add indexes for hot queries and a unique paid booking constraint
+
+Revision ID: b2e6f0a9d3c7
+Revises: 9c4b7d2e5f18
+Create Date: 2026-10-19 15:12:08.415630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e6f0a9d3c7'
+down_revision = '9c4b7d2e5f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Refuse to guess which duplicate paid booking is the real one
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT event_id, user_id FROM booking WHERE payment_id IS NOT NULL "
+        "GROUP BY event_id, user_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            f"{len(duplicates)} student(s) hold more than one paid booking for the same event, "
+            f"e.g. (event_id, user_id) = {tuple(duplicates[0])}. Resolve them before upgrading."
+        )
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_event_user', ['event_id', 'user_id'], unique=False)
+        batch_op.create_index('ix_booking_user_booking_date', ['user_id', 'booking_date'], unique=False)
+        batch_op.create_index('uq_booking_event_user_paid', ['event_id', 'user_id'], unique=True,
+                              postgresql_where=sa.text('payment_id IS NOT NULL'),
+                              sqlite_where=sa.text('payment_id IS NOT NULL'))
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.create_index('ix_event_date', ['date'], unique=False)
+        batch_op.create_index('ix_event_status_created_at', ['status', 'created_at'], unique=False)
+        batch_op.create_index('ix_event_organizer_date', ['organizer_id', 'date'], unique=False)
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.create_index('ix_message_receiver_read', ['receiver_id', 'read'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_timestamp', ['user_id', 'timestamp'], unique=False)
+
+    with op.batch_alter_table('notification_preference', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_preference_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.create_index('ix_review_event_created_at', ['event_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('user_activity', schema=None) as batch_op:
+        batch_op.create_index('ix_user_activity_timestamp', ['timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_activity', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_activity_timestamp')
+
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_index('ix_review_event_created_at')
+
+    with op.batch_alter_table('notification_preference', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_preference_user_id')
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_user_timestamp')
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_receiver_read')
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_organizer_date')
+        batch_op.drop_index('ix_event_status_created_at')
+        batch_op.drop_index('ix_event_date')
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_index('uq_booking_event_user_paid')
+        batch_op.drop_index('ix_booking_user_booking_date')
+        batch_op.drop_index('ix_booking_event_user')
@@ -0,0 +1,44 @@
+"""Add payment_event table
+
+Revision ID: c7d1e4a8f2b6
+Revises: b2e6f0a9d3c7
+Create Date: 2026-10-19 17:40:26.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d1e4a8f2b6'
+down_revision = 'b2e6f0a9d3c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payment_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_key', sa.String(length=100), nullable=False),
+    sa.Column('event_type', sa.String(length=60), nullable=False),
+    sa.Column('payment_id', sa.String(length=100), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_key')
+    )
+    with op.batch_alter_table('payment_event', schema=None) as batch_op:
+        batch_op.create_index('ix_payment_event_due', ['next_attempt_at'], unique=False,
+                              postgresql_where=sa.text('processed_at IS NULL'),
+                              sqlite_where=sa.text('processed_at IS NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('payment_event', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_event_due')
+
+    op.drop_table('payment_event')
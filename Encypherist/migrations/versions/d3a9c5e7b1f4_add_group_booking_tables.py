@@ -0,0 +1,55 @@
+"""Add group_booking and group_attendee tables
+
+Revision ID: d3a9c5e7b1f4
+Revises: c7d1e4a8f2b6
+Create Date: 2026-10-19 18:55:41.602317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a9c5e7b1f4'
+down_revision = 'c7d1e4a8f2b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('group_booking',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reference', sa.String(length=40), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('payment_status', sa.String(length=20), nullable=False),
+    sa.Column('booking_date', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reference')
+    )
+    with op.batch_alter_table('group_booking', schema=None) as batch_op:
+        batch_op.create_index('ix_group_booking_event', ['event_id'], unique=False)
+        batch_op.create_index('ix_group_booking_user_booking_date', ['user_id', 'booking_date'], unique=False)
+
+    op.create_table('group_attendee',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_booking_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.ForeignKeyConstraint(['group_booking_id'], ['group_booking.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('group_booking_id', 'position', name='uq_group_attendee_position')
+    )
+
+
+def downgrade():
+    op.drop_table('group_attendee')
+    with op.batch_alter_table('group_booking', schema=None) as batch_op:
+        batch_op.drop_index('ix_group_booking_user_booking_date')
+        batch_op.drop_index('ix_group_booking_event')
+
+    op.drop_table('group_booking')
@@ -0,0 +1,312 @@
+"""
+Database models, the username search index and the per-worker user cache
+behind `load_user`.
+"""
+import time
+from datetime import datetime
+
+from flask_login import UserMixin
+from sqlalchemy.orm import make_transient_to_detached
+
+from extensions import cache, db, login_manager, user_cache
+
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    # --- CHANGE: Increased password length to accommodate modern hashes ---
+    password = db.Column(db.String(256), nullable=False)
+    # --------------------------------------------------------------------
+    role = db.Column(db.String(20), nullable=False)
+    profile_picture = db.Column(db.String(200))
+    messages_sent = db.relationship('Message', foreign_keys='Message.sender_id', backref='sender', lazy='dynamic')
+    messages_received = db.relationship('Message', foreign_keys='Message.receiver_id', backref='receiver', lazy='dynamic')
+    notifications = db.relationship('Notification', backref='user', lazy='dynamic')
+    notification_preferences = db.relationship('NotificationPreference', backref='user', uselist=False)
+    bookings = db.relationship('Booking', backref='user', lazy='dynamic')
+    events = db.relationship('Event', foreign_keys='Event.organizer_id', backref='organizer', lazy='dynamic')
+
+class Event(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    location = db.Column(db.String(200), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    organizer_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    payment_qr = db.Column(db.String(500))
+    total_tickets = db.Column(db.Integer, nullable=False, default=0)
+    remaining_tickets = db.Column(db.Integer, nullable=False, default=0)
+    is_group_event = db.Column(db.Boolean, default=False)
+    min_group_size = db.Column(db.Integer, default=1)
+    max_group_size = db.Column(db.Integer, default=1)
+    category = db.Column(db.String(50), nullable=True)
+    status = db.Column(db.String(20), default='pending')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Denormalized review aggregates, maintained by submit_review
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    notifications = db.relationship('Notification', backref='event', lazy='dynamic')
+    messages = db.relationship('Message', backref='event', lazy='dynamic')
+    __table_args__ = (
+        db.Index('ix_event_date', 'date'),
+        db.Index('ix_event_status_created_at', 'status', 'created_at'),
+        db.Index('ix_event_organizer_date', 'organizer_id', 'date'),
+    )
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+
+class Booking(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'))
+    booking_date = db.Column(db.DateTime, default=datetime.utcnow)
+    payment_status = db.Column(db.String(20), default='pending')
+    payment_id = db.Column(db.String(100), unique=True, nullable=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(100), nullable=False)
+    mobile = db.Column(db.String(20), nullable=False)
+    branch = db.Column(db.String(50), nullable=False)
+    year = db.Column(db.String(10), nullable=False)
+    event = db.relationship('Event', backref='bookings', lazy='joined')
+    __table_args__ = (
+        db.Index('ix_booking_event_user', 'event_id', 'user_id'),
+        db.Index('ix_booking_user_booking_date', 'user_id', 'booking_date'),
+        # One paid booking per student and event. Group bookings are stored
+        # separately, in GroupBooking.
+        db.Index('uq_booking_event_user_paid', 'event_id', 'user_id', unique=True,
+                 postgresql_where=db.text('payment_id IS NOT NULL'),
+                 sqlite_where=db.text('payment_id IS NOT NULL')),
+    )
+
+class GroupBooking(db.Model):
+    """
+    A booking for a whole group: one row per group, one `GroupAttendee` row
+    per member and a single QR ticket that the gate expands into the members.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    reference = db.Column(db.String(40), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    payment_status = db.Column(db.String(20), nullable=False, default='succeeded')
+    booking_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    event = db.relationship('Event', lazy='joined')
+    attendees = db.relationship('GroupAttendee', backref='group', order_by='GroupAttendee.position')
+    __table_args__ = (
+        db.Index('ix_group_booking_event', 'event_id'),
+        db.Index('ix_group_booking_user_booking_date', 'user_id', 'booking_date'),
+    )
+
+class GroupAttendee(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    group_booking_id = db.Column(db.Integer, db.ForeignKey('group_booking.id', ondelete='CASCADE'), nullable=False)
+    # 0 is the member who made the booking
+    position = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(100), nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint('group_booking_id', 'position', name='uq_group_attendee_position'),
+    )
+
+def delete_bookings(**filters):
+    """Deletes the single and group bookings matching `filters`, e.g. `event_id=...`."""
+    groups = db.select(GroupBooking.id).filter_by(**filters)
+    GroupAttendee.query.filter(GroupAttendee.group_booking_id.in_(groups)).delete(synchronize_session=False)
+    GroupBooking.query.filter_by(**filters).delete(synchronize_session=False)
+    return Booking.query.filter_by(**filters).delete()
+
+class PaymentEvent(db.Model):
+    """
+    Inbox of payment events, PayPal webhooks and checkout returns alike,
+    applied to bookings by `flask process-payments` (see payment_queue.py).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    # PayPal's webhook event id, or "execute:<payment id>" for a checkout return
+    event_key = db.Column(db.String(100), unique=True, nullable=False)
+    event_type = db.Column(db.String(60), nullable=False)
+    payment_id = db.Column(db.String(100), nullable=True)
+    payload = db.Column(db.Text, nullable=False)
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    __table_args__ = (
+        db.Index('ix_payment_event_due', 'next_attempt_at',
+                 postgresql_where=db.text('processed_at IS NULL'),
+                 sqlite_where=db.text('processed_at IS NULL')),
+    )
+
+class UserActivity(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    activity_type = db.Column(db.String(50), nullable=False)
+    description = db.Column(db.Text)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    ip_address = db.Column(db.String(50))
+    __table_args__ = (
+        db.Index('ix_user_activity_timestamp', 'timestamp'),
+    )
+
+class Message(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=True)
+    content = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    read = db.Column(db.Boolean, default=False)
+    __table_args__ = (
+        db.Index('ix_message_sender_receiver_timestamp', 'sender_id', 'receiver_id', 'timestamp'),
+        db.Index('ix_message_receiver_read', 'receiver_id', 'read'),
+    )
+
+class Notification(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=True)
+    type = db.Column(db.String(50))
+    title = db.Column(db.String(200))
+    content = db.Column(db.Text)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    sent = db.Column(db.Boolean, default=False)
+    read = db.Column(db.Boolean, default=False, nullable=False, server_default=db.false())
+    error = db.Column(db.Text, nullable=True)
+    __table_args__ = (
+        db.Index('ix_notification_user_timestamp', 'user_id', 'timestamp'),
+    )
+
+class NotificationPreference(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    email_notifications = db.Column(db.Boolean, default=True)
+    sms_notifications = db.Column(db.Boolean, default=True)
+    event_updates = db.Column(db.Boolean, default=True)
+    event_reminders = db.Column(db.Boolean, default=True)
+    messages = db.Column(db.Boolean, default=True)
+    email = db.Column(db.String(120), nullable=True)
+    phone = db.Column(db.String(20), nullable=True)
+    __table_args__ = (
+        db.Index('ix_notification_preference_user_id', 'user_id'),
+    )
+
+class Review(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'))
+    rating = db.Column(db.Integer, nullable=False)
+    review_text = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User', backref='reviews')
+    event = db.relationship('Event', backref='reviews')
+    __table_args__ = (
+        db.Index('ix_review_event_created_at', 'event_id', 'created_at'),
+    )
+
+# --- User search index ---
+# Substring search on usernames is served by pg_trgm on PostgreSQL and by an
+# FTS5 trigram table kept in sync with triggers on SQLite.
+USER_SEARCH_DDL = {
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        'CREATE INDEX IF NOT EXISTS ix_user_username_trgm ON "user" USING gin (username gin_trgm_ops)',
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(username, content='user', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS user_search_ai AFTER INSERT ON user BEGIN "
+        "INSERT INTO user_search(rowid, username) VALUES (new.id, new.username); END",
+        "CREATE TRIGGER IF NOT EXISTS user_search_ad AFTER DELETE ON user BEGIN "
+        "INSERT INTO user_search(user_search, rowid, username) VALUES ('delete', old.id, old.username); END",
+        "CREATE TRIGGER IF NOT EXISTS user_search_au AFTER UPDATE OF username ON user BEGIN "
+        "INSERT INTO user_search(user_search, rowid, username) VALUES ('delete', old.id, old.username); "
+        "INSERT INTO user_search(rowid, username) VALUES (new.id, new.username); END",
+    ],
+}
+
+def create_user_search_index(target, connection, **kw):
+    for statement in USER_SEARCH_DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
+
+def drop_user_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS user_search")
+
+# Keeps `db.create_all()` in sync with the migration for local databases
+db.event.listen(User.__table__, 'after_create', create_user_search_index)
+db.event.listen(User.__table__, 'before_drop', drop_user_search_index)
+
+USER_SEARCH_LIMIT = 20
+
+def search_users(search_query, limit=USER_SEARCH_LIMIT, exclude_id=None):
+    """
+    Finds users whose username contains `search_query`, prefix matches first.
+    Matching is case-insensitive. SQLite uses its trigram table for queries
+    of 3 characters or more; shorter ones fall back to a scan.
+    """
+    search_query = search_query.strip()
+    if not search_query:
+        return []
+
+    query = User.query
+    if exclude_id is not None:
+        query = query.filter(User.id != exclude_id)
+
+    escaped = search_query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'sqlite' and len(search_query) >= 3:
+        phrase = '"' + search_query.replace('"', '""') + '"'
+        matches = db.select(db.column('rowid')).select_from(db.table('user_search')).where(
+            db.text('user_search MATCH :phrase').bindparams(phrase=phrase)
+        )
+        query = query.filter(User.id.in_(matches))
+    else:
+        # PostgreSQL, or a query too short for SQLite's trigrams: a
+        # case-insensitive substring match, as the search has always done
+        query = query.filter(User.username.ilike(f'%{escaped}%', escape='\\'))
+
+    prefix_first = db.case((User.username.ilike(f'{escaped}%', escape='\\'), 0), else_=1)
+    return query.order_by(prefix_first, db.func.length(User.username), User.username).limit(limit).all()
+
+def username_exists(username):
+    """Existence check that only touches the unique username index."""
+    return db.session.query(User.id).filter_by(username=username).first() is not None
+
+# --- User cache ---
+# Per-worker cache of logged-in users so load_user does not hit the database
+# on every request. Entries are checked against a version stamp kept in the
+# shared cache, which is bumped whenever the user row changes.
+
+def user_cache_version(user_id):
+    return cache.get_many('user_version:all', f'user_version:{user_id}')
+
+def invalidate_user(user_id):
+    user_cache.delete(user_id)
+    cache.set(f'user_version:{user_id}', time.time_ns(), timeout=0)
+
+def invalidate_all_users():
+    user_cache.clear()
+    cache.set('user_version:all', time.time_ns(), timeout=0)
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    version = list(user_cache_version(user_id))
+    entry = user_cache.get(user_id)
+
+    if entry is not None and entry['version'] == version:
+        # Rebuild the row from the snapshot and attach it without a SELECT
+        user = User(**entry['columns'])
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        user_cache.set(user_id, {
+            'version': version,
+            'columns': {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        })
+    return user
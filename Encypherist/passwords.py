@@ -0,0 +1,80 @@
+"""
+Password hashing off the request thread.
+
+Hashing is deliberately slow. werkzeug's pbkdf2 and scrypt both go through
+hashlib, which releases the GIL, so a small thread pool hashes in parallel
+while the request thread only waits. Under gevent the work goes to the hub's
+native threadpool so only the calling greenlet waits, not the whole worker.
+
+The number of hashes that may run or wait at once is capped. Past that,
+`HasherBusy` is raised so an overloaded worker sheds logins quickly instead
+of queueing them until the client times out.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashes are already queued."""
+
+
+def _gevent_threadpool():
+    try:
+        from gevent import get_hub
+        from gevent.monkey import is_module_patched
+    except ImportError:
+        return None
+    return get_hub().threadpool if is_module_patched('threading') else None
+
+
+class PasswordHasher:
+    def __init__(self, method=None, max_workers=None, max_queue=32):
+        # None keeps werkzeug's current default, e.g. "scrypt" or "pbkdf2:sha256:600000"
+        self.method = method
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._slots = threading.BoundedSemaphore(self.max_workers + max_queue)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._prefix = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy('Password hashing queue is full')
+        try:
+            pool = _gevent_threadpool()
+            if pool is not None:
+                return pool.apply(fn, args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _get_executor(self):
+        # Created on first use so gunicorn --preload does not fork live threads
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hasher')
+            return self._executor
+
+    def _generate(self, password):
+        if self.method:
+            return generate_password_hash(password, method=self.method)
+        return generate_password_hash(password)
+
+    def hash(self, password):
+        return self._run(self._generate, password)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    @property
+    def prefix(self):
+        """The `method:params` part that hashes made with the current settings start with."""
+        if self._prefix is None:
+            self._prefix = self._generate('').split('$', 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.prefix
@@ -0,0 +1,177 @@
+"""
+Payment confirmation off the request path.
+
+Requests only record what happened: PayPal's webhooks and the payer's
+return from checkout are stored as `PaymentEvent` rows, and the return page
+polls the booking's status. `flask process-payments` (see commands.py) then
+applies the events in the background: it executes approved payments
+through the gateway and moves bookings between states.
+
+Every step is idempotent, keyed on the PayPal payment id. Events are
+deduplicated by `event_key`, and a booking only gives up a ticket on the
+`pending -> succeeded` transition, which is made under a row lock. Redelivered
+webhooks, reloaded return pages and retried events change nothing twice.
+Events that cannot be applied yet (gateway down, webhook ahead of the
+booking) are retried with backoff.
+"""
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db, payment_gateway
+from metrics import BOOKINGS, PAYMENT_EVENTS
+from models import Booking, Event, PaymentEvent
+from payments import GatewayUnavailable, PaymentError
+
+EXECUTE = 'CHECKOUT.EXECUTE'
+MAX_ATTEMPTS = 10
+MAX_BACKOFF_SECONDS = 300
+
+# Webhook event type -> booking status it leads to
+WEBHOOK_STATUSES = {
+    'PAYMENT.SALE.COMPLETED': 'succeeded',
+    'PAYMENT.SALE.DENIED': 'failed',
+    'PAYMENT.SALE.REFUNDED': 'refunded',
+    'PAYMENT.SALE.REVERSED': 'refunded',
+}
+
+
+class RetryLater(Exception):
+    """Raised when an event cannot be applied yet but may succeed later."""
+
+
+def enqueue(event_key, event_type, payment_id, payload):
+    """
+    Adds an event to the session unless one with the same key was already
+    stored. Returns False for duplicates. The caller commits.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.add(PaymentEvent(
+                event_key=event_key,
+                event_type=event_type,
+                payment_id=payment_id,
+                payload=json.dumps(payload)
+            ))
+    except IntegrityError:
+        PAYMENT_EVENTS.labels(event_type, 'duplicate').inc()
+        return False
+    return True
+
+def enqueue_webhook(event):
+    resource = event.get('resource') or {}
+    # Sale and refund resources point at their payment through parent_payment
+    payment_id = resource.get('parent_payment') or resource.get('id')
+    return enqueue(event['id'], event.get('event_type', 'UNKNOWN'), payment_id, event)
+
+def enqueue_execute(payment_id, payer_id):
+    return enqueue(f'execute:{payment_id}', EXECUTE, payment_id, {'payment_id': payment_id, 'payer_id': payer_id})
+
+def locked_booking(payment_id):
+    booking = Booking.query.filter_by(payment_id=payment_id).with_for_update().first()
+    if booking is None:
+        # The webhook can arrive before the payer is back on our site
+        raise RetryLater(f'No booking for payment {payment_id} yet')
+    return booking
+
+def mark_paid(payment_id):
+    booking = locked_booking(payment_id)
+    if booking.payment_status != 'pending':
+        return booking
+
+    # Take the ticket only now, and only if one is left
+    claimed = db.session.execute(
+        db.update(Event)
+        .where(Event.id == booking.event_id, Event.remaining_tickets > 0)
+        .values(remaining_tickets=Event.remaining_tickets - 1)
+    ).rowcount
+    if claimed:
+        booking.payment_status = 'succeeded'
+        BOOKINGS.labels('paypal').inc()
+    else:
+        # Paid for a ticket that sold out while the payment was in flight
+        booking.payment_status = 'refund_due'
+        print(f"--- WARNING: payment {payment_id} succeeded but event {booking.event_id} is sold out ---")
+    return booking
+
+def mark_unpaid(payment_id, status):
+    booking = locked_booking(payment_id)
+    if booking.payment_status == 'succeeded':
+        db.session.execute(
+            db.update(Event)
+            .where(Event.id == booking.event_id)
+            .values(remaining_tickets=Event.remaining_tickets + 1)
+        )
+    if booking.payment_status in ('pending', 'succeeded'):
+        booking.payment_status = status
+    return booking
+
+def apply(event):
+    payload = json.loads(event.payload)
+    if event.event_type == EXECUTE:
+        try:
+            payment_gateway.execute_payment(payload['payment_id'], payload['payer_id'])
+        except GatewayUnavailable as e:
+            raise RetryLater(str(e)) from e
+        except PaymentError:
+            mark_unpaid(event.payment_id, 'failed')
+            return
+        mark_paid(event.payment_id)
+        return
+
+    status = WEBHOOK_STATUSES.get(event.event_type)
+    if status == 'succeeded':
+        mark_paid(event.payment_id)
+    elif status:
+        mark_unpaid(event.payment_id, status)
+
+def next_due_event():
+    # SKIP LOCKED lets several workers drain the queue without waiting on each other
+    return db.session.execute(
+        db.select(PaymentEvent)
+        .where(PaymentEvent.processed_at.is_(None), PaymentEvent.next_attempt_at <= datetime.utcnow())
+        .order_by(PaymentEvent.next_attempt_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+
+def process_due_events(limit=100):
+    """Applies up to `limit` due events, one transaction each. Returns how many were handled."""
+    handled = 0
+    while handled < limit:
+        event = next_due_event()
+        if event is None:
+            break
+        handled += 1
+        try:
+            apply(event)
+            event.processed_at = datetime.utcnow()
+            event.error = None
+            outcome = 'applied'
+        except Exception as e:
+            db.session.rollback()
+            event = db.session.get(PaymentEvent, event.id)
+            event.attempts += 1
+            event.error = str(e)
+            if isinstance(e, RetryLater) and event.attempts < MAX_ATTEMPTS:
+                event.next_attempt_at = datetime.utcnow() + timedelta(
+                    seconds=min(2 ** event.attempts, MAX_BACKOFF_SECONDS))
+                outcome = 'retry'
+            else:
+                # Kept with its error for an admin to look at
+                event.processed_at = datetime.utcnow()
+                outcome = 'failed'
+                print(f"--- ERROR applying payment event {event.event_key}: {e} ---")
+        db.session.commit()
+        PAYMENT_EVENTS.labels(event.event_type, outcome).inc()
+    return handled
+
+def run_worker(poll_seconds=1.0, once=False):
+    while True:
+        handled = process_due_events()
+        if once and not handled:
+            return
+        if not handled:
+            time.sleep(poll_seconds)
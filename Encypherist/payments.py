@@ -0,0 +1,249 @@
+"""
+Payment gateway used when the payer comes back from PayPal.
+
+`PayPalGateway` talks to PayPal's REST API directly over one pooled,
+keep-alive HTTP session per worker instead of going through paypalrestsdk,
+which opened a new connection and waited without a timeout on every call.
+Every request has a connect and a read timeout, so a slow provider costs a
+request a few seconds at most. A call answered with 401 fetches a new
+access token and is retried once.
+
+Repeated failures (timeouts, connection errors, 5xx responses) open a
+circuit breaker: for a cool-down period calls fail immediately with
+`GatewayUnavailable` instead of tying up more workers, then a single trial
+call decides whether to close it again. The breaker is per worker.
+
+Only blocking sockets and standard threading primitives are used, so under
+gevent (after monkey patching) a request waiting on PayPal is a parked
+greenlet and the worker keeps serving other requests.
+"""
+import threading
+import time
+
+from metrics import PAYMENT_CIRCUIT_OPEN, PAYMENT_GATEWAY_SECONDS
+
+PAYPAL_URLS = {
+    'sandbox': 'https://api-m.sandbox.paypal.com',
+    'live': 'https://api-m.paypal.com',
+}
+
+
+class PaymentError(Exception):
+    """Raised when the gateway declines or cannot complete a payment."""
+
+
+class GatewayUnavailable(PaymentError):
+    """Raised when the gateway timed out, failed, or the circuit is open."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures for `reset_timeout` seconds."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return 'open'
+            return 'half-open'
+
+    def allow(self):
+        """Whether a call may go out now; while half-open only one trial call is let through."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def release(self):
+        """Ends a trial call that neither succeeded nor failed, so the next call may try again."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+        PAYMENT_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                opened = True
+            else:
+                opened = False
+        if opened:
+            PAYMENT_CIRCUIT_OPEN.set(1)
+
+
+class PayPalGateway:
+    def __init__(self, base_url, client_id, client_secret, webhook_id=None, connect_timeout=3.05, read_timeout=10,
+                 pool_size=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.webhook_id = webhook_id
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._token = None
+        self._token_expires = 0
+        self._token_lock = threading.Lock()
+
+    def _get_session(self):
+        # Created on first use so gunicorn --preload does not share sockets between workers
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                # No automatic retries: executing a payment twice is not safe to retry blindly
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _request(self, operation, method, path, **kwargs):
+        import requests
+
+        if not self.breaker.allow():
+            PAYMENT_GATEWAY_SECONDS.labels(operation, 'rejected').observe(0)
+            raise GatewayUnavailable('Payment provider is unavailable, please try again shortly')
+
+        start = time.perf_counter()
+        try:
+            response = self._get_session().request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            PAYMENT_GATEWAY_SECONDS.labels(operation, 'error').observe(time.perf_counter() - start)
+            raise GatewayUnavailable(f'Payment provider did not respond: {e.__class__.__name__}') from e
+        except BaseException:
+            # Not the provider's fault, but a half-open breaker must not wait on this trial forever
+            self.breaker.release()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            PAYMENT_GATEWAY_SECONDS.labels(operation, 'error').observe(time.perf_counter() - start)
+            raise GatewayUnavailable(f'Payment provider error ({response.status_code})')
+
+        # A 4xx is the provider answering, so it does not count against the circuit
+        self.breaker.record_success()
+        PAYMENT_GATEWAY_SECONDS.labels(operation, 'ok' if response.ok else 'declined').observe(
+            time.perf_counter() - start)
+        return response
+
+    def _access_token(self):
+        with self._token_lock:
+            if self._token is None or time.monotonic() >= self._token_expires:
+                response = self._request(
+                    'token', 'POST', '/v1/oauth2/token',
+                    auth=(self.client_id, self.client_secret),
+                    data={'grant_type': 'client_credentials'}
+                )
+                if not response.ok:
+                    # Our credentials, not the payment: retry later rather than fail the payment
+                    raise GatewayUnavailable(f'Payment provider rejected our credentials ({response.status_code})')
+                body = response.json()
+                self._token = body['access_token']
+                # Refresh a minute early so a token never expires mid-request
+                self._token_expires = time.monotonic() + max(int(body.get('expires_in', 0)) - 60, 0)
+            return self._token
+
+    def _authorized_request(self, operation, method, path, **kwargs):
+        """Makes a call with the access token, fetching a new one and retrying once on a 401."""
+        token = self._access_token()
+        response = self._request(operation, method, path, headers={'Authorization': f'Bearer {token}'}, **kwargs)
+        if response.status_code != 401:
+            return response
+
+        # Token revoked or expired early
+        with self._token_lock:
+            if self._token == token:
+                self._token = None
+        response = self._request(
+            operation, method, path, headers={'Authorization': f'Bearer {self._access_token()}'}, **kwargs)
+        if response.status_code == 401:
+            raise GatewayUnavailable('Payment provider rejected our access token')
+        return response
+
+    def execute_payment(self, payment_id, payer_id):
+        """
+        Executes an approved PayPal payment. Returns the payment as a dict
+        once PayPal reports it approved, raises `PaymentError` otherwise.
+        """
+        response = self._authorized_request(
+            'execute', 'POST', f'/v1/payments/payment/{payment_id}/execute',
+            json={'payer_id': payer_id}
+        )
+        if response.status_code == 400 and self._error_name(response) == 'PAYMENT_ALREADY_DONE':
+            # A retried return (e.g. after a timeout) finds the payment already executed
+            return self._approved(self.get_payment(payment_id))
+        if not response.ok:
+            raise PaymentError(f'Payment was not completed ({response.status_code})')
+
+        return self._approved(response.json())
+
+    def get_payment(self, payment_id):
+        response = self._authorized_request('get', 'GET', f'/v1/payments/payment/{payment_id}')
+        if not response.ok:
+            raise PaymentError(f'Payment not found ({response.status_code})')
+        return response.json()
+
+    def verify_webhook(self, headers, event):
+        """Asks PayPal whether a webhook delivery with these headers really came from it."""
+        if not self.webhook_id:
+            return False
+        response = self._authorized_request(
+            'verify_webhook', 'POST', '/v1/notifications/verify-webhook-signature',
+            json={
+                'auth_algo': headers.get('PAYPAL-AUTH-ALGO'),
+                'cert_url': headers.get('PAYPAL-CERT-URL'),
+                'transmission_id': headers.get('PAYPAL-TRANSMISSION-ID'),
+                'transmission_sig': headers.get('PAYPAL-TRANSMISSION-SIG'),
+                'transmission_time': headers.get('PAYPAL-TRANSMISSION-TIME'),
+                'webhook_id': self.webhook_id,
+                'webhook_event': event,
+            }
+        )
+        return response.ok and response.json().get('verification_status') == 'SUCCESS'
+
+    @staticmethod
+    def _approved(payment):
+        if payment.get('state') != 'approved':
+            raise PaymentError(f"Payment was not completed ({payment.get('state')})")
+        return payment
+
+    @staticmethod
+    def _error_name(response):
+        try:
+            return response.json().get('name')
+        except ValueError:
+            return None
+
+
+def create_gateway(mode=None, base_url=None, client_id=None, client_secret=None, **options):
+    """Builds the PayPal gateway; `base_url` (e.g. a local fake server) overrides `mode`."""
+    return PayPalGateway(
+        base_url or PAYPAL_URLS.get(mode or 'sandbox', PAYPAL_URLS['sandbox']),
+        client_id, client_secret, **options
+    )
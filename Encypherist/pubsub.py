@@ -0,0 +1,116 @@
+"""
+Lightweight publish/subscribe used to push live updates to connected clients.
+
+`LocalBroker` keeps everything inside the current process, which is all a
+single worker (or local development) needs. `RedisBroker` relays messages
+between gunicorn workers: every worker holds one Redis subscription and fans
+incoming messages out to its own local subscribers, so the number of Redis
+connections does not grow with the number of open browser streams.
+
+Only standard threading primitives are used, so under gevent (after monkey
+patching) waiting subscribers are cheap greenlets instead of OS threads.
+"""
+import json
+import queue
+import threading
+
+
+class Subscription:
+    """A single listener on a channel. Call `close()` when done."""
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        """Returns the next payload, or None if nothing arrived within `timeout`."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process broker. Messages only reach subscribers in the same worker."""
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            listeners = self._subscribers.get(subscription.channel)
+            if listeners:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, payload):
+        self.deliver(channel, payload)
+
+    def deliver(self, channel, payload):
+        with self._lock:
+            listeners = list(self._subscribers.get(channel, ()))
+        for subscription in listeners:
+            try:
+                subscription.queue.put_nowait(payload)
+            except queue.Full:
+                # A stalled client should not hold up everyone else
+                pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(listeners) for listeners in self._subscribers.values())
+
+
+class RedisBroker(LocalBroker):
+    """Relays messages across worker processes through Redis pub/sub."""
+
+    prefix = 'encypherist:'
+
+    def __init__(self, url, max_queue_size=100):
+        super().__init__(max_queue_size)
+        import redis  # Optional dependency, only needed for multi-worker deployments
+
+        self._redis = redis.Redis.from_url(url)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        # Started lazily so that gunicorn --preload does not fork a running thread
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(self.prefix + '*')
+        for item in pubsub.listen():
+            channel = item['channel'].decode()[len(self.prefix):]
+            self.deliver(channel, json.loads(item['data']))
+
+    def subscribe(self, channel):
+        self._ensure_listener()
+        return super().subscribe(channel)
+
+    def publish(self, channel, payload):
+        self._redis.publish(self.prefix + channel, json.dumps(payload))
+
+
+def create_broker(url=None):
+    """Builds a broker from a URL such as `redis://localhost:6379/0`; defaults to local."""
+    if url and url.startswith(('redis://', 'rediss://')):
+        return RedisBroker(url)
+    return LocalBroker()
@@ -0,0 +1,85 @@
+"""
+Query plan checks.
+
+`sequential_scans(connection, statement)` runs EXPLAIN on a statement and
+returns the tables the database would read in full instead of through an
+index. It understands SQLite (`EXPLAIN QUERY PLAN`) and PostgreSQL
+(`EXPLAIN (FORMAT JSON)`).
+
+PostgreSQL happily seq-scans small tables even when a good index exists, so
+run the checks with `enable_seqscan` off (see `discourage_seqscans`). The
+planner then only picks a Seq Scan when no index can serve the query, which
+is exactly what we want to catch.
+"""
+import json
+import re
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+# "SCAN event" or "SCAN event AS e"; index scans read "SCAN event USING INDEX ..."
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>[\w"]+)(?: AS \w+)?$')
+# Subqueries and CTEs are planned as "CO-ROUTINE roster" or "MATERIALIZE roster",
+# and reading them back shows up as "SCAN roster", which touches no table
+_SQLITE_SUBQUERY = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (?P<name>[\w"]+)$')
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    if compiler.dialect.name == 'postgresql':
+        prefix = 'EXPLAIN (FORMAT JSON) '
+    elif compiler.dialect.name == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        raise NotImplementedError(f'Query plans are not supported on {compiler.dialect.name}')
+    return prefix + compiler.process(element.statement, **kw)
+
+
+def explain(connection, statement):
+    """Returns the plan as a list of lines (SQLite) or the JSON plan tree (PostgreSQL)."""
+    rows = connection.execute(Explain(statement)).fetchall()
+    if connection.dialect.name == 'postgresql':
+        plan = rows[0][0]
+        return json.loads(plan) if isinstance(plan, str) else plan
+    return [row[-1] for row in rows]
+
+
+def _walk_pg_plan(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk_pg_plan(child)
+
+
+def sequential_scans(connection, statement):
+    plan = explain(connection, statement)
+    if connection.dialect.name == 'postgresql':
+        return [node['Relation Name'] for node in _walk_pg_plan(plan[0]['Plan'])
+                if node['Node Type'] == 'Seq Scan']
+    subqueries = set()
+    tables = []
+    for line in plan:
+        subquery = _SQLITE_SUBQUERY.match(line.strip())
+        if subquery:
+            subqueries.add(subquery.group('name').strip('"'))
+        match = _SQLITE_SCAN.match(line.strip())
+        if match:
+            tables.append(match.group('table').strip('"'))
+    return [table for table in tables if table not in subqueries]
+
+
+def discourage_seqscans(connection):
+    """Makes PostgreSQL prefer any usable index, for the rest of the transaction."""
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+
+
+def analyze(connection):
+    """Refreshes planner statistics after seeding."""
+    connection.exec_driver_sql('ANALYZE')
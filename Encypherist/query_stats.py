@@ -0,0 +1,181 @@
+"""
+Per-request SQL instrumentation.
+
+Every statement executed while handling a request is counted and timed via
+engine events, and grouped by its "shape": the SQL with literals and IN
+lists collapsed, so `WHERE id = 3` and `WHERE id = 7` look the same. A shape
+that repeats many times within one request is almost always an N+1 loop.
+
+`RouteQueryStats` aggregates the per-request numbers by endpoint so the
+worst routes can be found in production. `query_budget(n)` marks how many
+queries a view is allowed; in testing mode going over raises
+`QueryBudgetExceeded`, elsewhere it is only logged.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# A shape repeated this many times in one request is reported as a likely N+1
+REPEAT_THRESHOLD = 5
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))*\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its budget allows."""
+
+
+class RequestQueries:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        """Shapes run at least `threshold` times, most frequent first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+# Stats collected outside a request (CLI commands, tests) live per thread
+_local = threading.local()
+
+
+def _stack(create=False):
+    if has_request_context():
+        if create and 'query_stats_stack' not in g:
+            # The first entry always covers the whole request
+            g.query_stats_stack = [RequestQueries()]
+        return g.get('query_stats_stack')
+    if create and not hasattr(_local, 'stack'):
+        _local.stack = []
+    return getattr(_local, 'stack', None)
+
+
+def request_queries():
+    """Stats for everything the current request has run so far."""
+    stack = _stack()
+    return stack[0] if stack else RequestQueries()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+    # Outer blocks include everything their inner blocks ran
+    for stats in _stack(create=has_request_context()) or ():
+        stats.record(statement, duration)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_query_timer(exception_context):
+    starts = exception_context.connection.info.get('query_start') if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts the queries run inside the block:
+
+        with count_queries() as queries:
+            client.get('/home')
+        assert queries.count <= 10
+    """
+    stats = RequestQueries()
+    stack = _stack(create=True)
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.remove(stats)
+
+
+def assert_max_queries(max_queries, func, *args, **kwargs):
+    """Calls `func` and raises `QueryBudgetExceeded` if it ran more than `max_queries` queries."""
+    with count_queries() as queries:
+        result = func(*args, **kwargs)
+    if queries.count > max_queries:
+        raise QueryBudgetExceeded(budget_message(queries, max_queries, getattr(func, '__name__', 'call')))
+    return result
+
+
+def budget_message(queries, max_queries, name):
+    lines = [f"{name} ran {queries.count} queries, budget is {max_queries}"]
+    for shape, n in queries.shapes.most_common(5):
+        lines.append(f"  {n}x {shape[:200]}")
+    return '\n'.join(lines)
+
+
+def query_budget(max_queries):
+    """Declares how many queries a view may run per request."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.query_budget = max_queries
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RouteQueryStats:
+    """Per-endpoint query counts and DB time, aggregated over requests."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, queries):
+        repeated = queries.repeated()
+        with self._lock:
+            totals = self._routes.setdefault(route, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0, 'max_db_time': 0.0,
+                'n_plus_one_requests': 0, 'worst_repeat': None,
+            })
+            totals['requests'] += 1
+            totals['queries'] += queries.count
+            totals['max_queries'] = max(totals['max_queries'], queries.count)
+            totals['db_time'] += queries.duration
+            totals['max_db_time'] = max(totals['max_db_time'], queries.duration)
+            if repeated:
+                totals['n_plus_one_requests'] += 1
+                shape, n = repeated[0]
+                if totals['worst_repeat'] is None or n > totals['worst_repeat']['count']:
+                    totals['worst_repeat'] = {'count': n, 'statement': shape}
+
+    def report(self, limit=20):
+        """The `limit` routes with the most queries per request."""
+        with self._lock:
+            routes = {route: dict(totals) for route, totals in self._routes.items()}
+        for totals in routes.values():
+            totals['avg_queries'] = totals['queries'] / totals['requests']
+            totals['avg_db_ms'] = totals.pop('db_time') / totals['requests'] * 1000
+            totals['max_db_ms'] = totals.pop('max_db_time') * 1000
+        worst = sorted(routes.items(), key=lambda item: (item[1]['avg_queries'], item[1]['avg_db_ms']), reverse=True)
+        return dict(worst[:limit])
@@ -0,0 +1,112 @@
+"""
+Response caching for public pages.
+
+Anonymous responses of public pages are cached per path and the query
+arguments the view reads, so unrelated arguments do not fill the cache with
+copies. Each cached view names the tables it depends on; committing a change to one of those tables
+bumps the table's version, which changes the cache key of every response
+built from it. The same session hooks drop changed users from the user cache.
+"""
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, request, session
+from flask_login import current_user
+
+from extensions import cache, db
+from models import User, invalidate_all_users, invalidate_user
+
+
+def tag_version(tag):
+    version = cache.get(f'tag:{tag}')
+    if version is None:
+        version = time.time_ns()
+        cache.set(f'tag:{tag}', version, timeout=0)
+    return version
+
+def invalidate_tags(*tags):
+    for tag in tags:
+        cache.set(f'tag:{tag}', time.time_ns(), timeout=0)
+
+def _pending_tags(session):
+    return session.info.setdefault('cache_tags', set())
+
+@db.event.listens_for(db.session, 'before_flush')
+def collect_flushed_tags(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tablename = getattr(obj, '__tablename__', None)
+        if tablename:
+            _pending_tags(session).add(tablename)
+        if isinstance(obj, User) and obj.id is not None and obj not in session.new:
+            session.info.setdefault('changed_users', set()).add(obj.id)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def collect_bulk_tags(orm_execute_state):
+    # Query.update()/delete() bypass the flush, so catch them here
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper:
+        _pending_tags(orm_execute_state.session).add(orm_execute_state.bind_mapper.local_table.name)
+        if orm_execute_state.bind_mapper.class_ is User:
+            orm_execute_state.session.info['all_users_changed'] = True
+
+@db.event.listens_for(db.session, 'after_commit')
+def invalidate_committed_tags(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags:
+        invalidate_tags(*tags)
+    if session.info.pop('all_users_changed', False):
+        invalidate_all_users()
+    for user_id in session.info.pop('changed_users', ()):
+        invalidate_user(user_id)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_pending_tags(session):
+    session.info.pop('cache_tags', None)
+    session.info.pop('changed_users', None)
+    session.info.pop('all_users_changed', None)
+
+def cache_key(query_args, versions):
+    args = sorted((name, request.args[name]) for name in query_args if name in request.args)
+    return f'view:{request.path}?{urlencode(args)}:{versions}'
+
+def cached_response(timeout, tags=(), query_args=()):
+    """
+    Caches anonymous GET responses for `timeout` seconds and answers
+    conditional requests (If-None-Match / If-Modified-Since) with 304.
+    The key is the path plus the `query_args` the view reads; other query
+    arguments share the entry. Logged-in users and requests carrying
+    flashed messages skip the cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or current_user.is_authenticated or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            versions = '-'.join(str(tag_version(tag)) for tag in tags)
+            key = cache_key(query_args, versions)
+            entry = cache.get(key)
+
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                body = response.get_data(as_text=True)
+                entry = {
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'etag': response.get_etag()[0] or hashlib.sha1(body.encode()).hexdigest(),
+                    'last_modified': time.time()
+                }
+                cache.set(key, entry, timeout=timeout)
+
+            response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+            response.set_etag(entry['etag'])
+            response.last_modified = datetime.utcfromtimestamp(int(entry['last_modified']))
+            response.headers['Cache-Control'] = f'public, max-age={timeout}'
+            response.vary.add('Cookie')
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import Event, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'WTF_CSRF_ENABLED': False,
+        'HTML_MINIFY': False,
+        'COMPRESS_RESPONSES': False,
+        'SQL_STATS_HEADERS': False,
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make_user(username, role='student'):
+        with app.app_context():
+            user = User(username=username, password='unused', role=role)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make_user
+
+
+@pytest.fixture
+def make_event(app):
+    def make_event(organizer_id, **fields):
+        values = {
+            'title': 'Test event', 'description': 'An event', 'location': 'Hall 1', 'price': 0.0,
+            'date': datetime.utcnow() + timedelta(days=7), 'organizer_id': organizer_id,
+            'total_tickets': 10, 'remaining_tickets': 10, 'category': 'Technical', 'status': 'approved',
+        }
+        values.update(fields)
+        with app.app_context():
+            event = Event(**values)
+            db.session.add(event)
+            db.session.commit()
+            return event.id
+    return make_event
+
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
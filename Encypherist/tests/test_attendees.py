@@ -0,0 +1,92 @@
+import csv
+import importlib
+import io
+import zipfile
+
+import pytest
+
+from conftest import login
+from extensions import db
+from models import Booking, GroupAttendee, GroupBooking
+
+# blueprints/__init__.py rebinds the name to the blueprint, so fetch the module itself
+organizer_module = importlib.import_module('blueprints.organizer')
+
+HEADER = ['Name', 'Email', 'Mobile', 'Branch', 'Year', 'Reference', 'Group size', 'Booked at']
+
+
+@pytest.fixture
+def roster(app, client, make_user, make_event):
+    """An event with two paid single bookings, one pending one and a paid group of two."""
+    organizer_id = make_user('organizer', role='organizer')
+    event_id = make_event(organizer_id, title='Hackathon')
+    students = [make_user(f'student{n}') for n in range(4)]
+    with app.app_context():
+        for student, name, status in zip(students, ['Asha', 'Zoe', 'Pending'], ['succeeded', 'succeeded', 'pending']):
+            db.session.add(Booking(
+                user_id=student, event_id=event_id, name=name, email=f'{name.lower()}@example.com',
+                mobile='9999999999', branch='CSE', year='2', payment_status=status, payment_id=f'ref-{name}'
+            ))
+        group = GroupBooking(reference='grp-1', user_id=students[3], event_id=event_id, size=2)
+        db.session.add(group)
+        db.session.flush()
+        db.session.add_all([
+            GroupAttendee(group_booking_id=group.id, position=0, name='Bela', email='bela@example.com'),
+            GroupAttendee(group_booking_id=group.id, position=1, name='Chen', email='chen@example.com'),
+        ])
+        db.session.commit()
+    login(client, organizer_id)
+    return event_id
+
+
+def test_roster_pages_singles_and_group_members_together(client, roster, monkeypatch):
+    monkeypatch.setattr(organizer_module, 'ATTENDEES_PER_PAGE', 3)
+
+    first = client.get(f'/events/{roster}/attendees').get_data(as_text=True)
+    second = client.get(f'/events/{roster}/attendees?page=2').get_data(as_text=True)
+
+    assert '4 attendees' in first
+    assert 'Page 1 of 2' in first
+    assert all(name in first for name in ('Asha', 'Bela', 'Chen'))
+    assert 'Zoe' in second and 'Asha' not in second
+    assert 'Pending' not in first + second
+
+
+def test_roster_search(client, roster):
+    page = client.get(f'/events/{roster}/attendees?q=chen').get_data(as_text=True)
+
+    assert '1 attendee matching "chen"' in page
+    assert 'Chen' in page and 'Asha' not in page
+
+
+def test_csv_export(client, roster):
+    response = client.get(f'/events/{roster}/attendees.csv')
+
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == f'attachment; filename=attendees-event-{roster}.csv'
+    rows = list(csv.reader(io.StringIO(response.get_data().decode('utf-8-sig'))))
+    assert rows[0] == HEADER
+    assert [row[0] for row in rows[1:]] == ['Asha', 'Bela', 'Chen', 'Zoe']
+    assert rows[1][:7] == ['Asha', 'asha@example.com', '9999999999', 'CSE', '2', 'ref-Asha', '']
+    assert rows[2][5:7] == ['grp-1', '2']
+
+
+def test_xlsx_export_is_a_workbook(client, roster):
+    response = client.get(f'/events/{roster}/attendees.xlsx')
+
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as workbook:
+        assert workbook.testzip() is None
+        assert {'[Content_Types].xml', 'xl/workbook.xml', 'xl/worksheets/sheet1.xml'} <= set(workbook.namelist())
+        assert '<sheet name="Hackathon"' in workbook.read('xl/workbook.xml').decode()
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+    assert sheet.count('<row>') == 5
+    assert '<t xml:space="preserve">Booked at</t>' in sheet
+    assert '<t xml:space="preserve">chen@example.com</t>' in sheet
+    assert sheet.endswith('</sheetData></worksheet>')
+
+
+def test_roster_is_for_the_event_s_organizer(client, roster, make_user):
+    login(client, make_user('someone', role='organizer'))
+
+    assert client.get(f'/events/{roster}/attendees').status_code == 302
+    assert client.get(f'/events/{roster}/attendees.csv').status_code == 302
@@ -0,0 +1,126 @@
+from sqlalchemy import event as orm_event
+from sqlalchemy.orm.attributes import set_committed_value
+
+from conftest import login
+from extensions import db
+from models import Booking, Event, GroupAttendee, GroupBooking
+
+FORM = {'name': 'Asha', 'email': 'asha@example.com', 'mobile': '9999999999', 'branch': 'CSE', 'year': '2'}
+
+
+def bookings_for(event_id):
+    return db.session.scalar(db.select(db.func.count()).select_from(Booking).where(Booking.event_id == event_id))
+
+
+def test_repeated_submit_is_replayed(app, client, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    student = make_user('student')
+    event_id = make_event(organizer)
+    login(client, student)
+    form = dict(FORM, idempotency_key='01JTESTKEY0000000000000000')
+
+    first = client.post(f'/submit_booking/{event_id}', data=form)
+    second = client.post(f'/submit_booking/{event_id}', data=form)
+
+    assert first.status_code == second.status_code == 302
+    assert second.headers['Location'] == first.headers['Location']
+    assert 'Idempotent-Replayed' not in first.headers
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    with app.app_context():
+        assert bookings_for(event_id) == 1
+        assert db.session.get(Event, event_id).remaining_tickets == 9
+
+
+def test_keys_are_scoped_to_the_user(app, client, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    first_student = make_user('first')
+    second_student = make_user('second')
+    event_id = make_event(organizer)
+    form = dict(FORM, idempotency_key='01JTESTKEY0000000000000000')
+
+    login(client, first_student)
+    client.post(f'/submit_booking/{event_id}', data=form)
+    login(client, second_student)
+    response = client.post(f'/submit_booking/{event_id}', data=form)
+
+    assert 'Idempotent-Replayed' not in response.headers
+    with app.app_context():
+        assert bookings_for(event_id) == 2
+
+
+def test_last_ticket_is_taken_once(app, client, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    first_student = make_user('first')
+    second_student = make_user('second')
+    event_id = make_event(organizer, total_tickets=1, remaining_tickets=1)
+
+    login(client, first_student)
+    client.post(f'/submit_booking/{event_id}', data=FORM)
+    login(client, second_student)
+    response = client.post(f'/submit_booking/{event_id}', data=FORM)
+
+    assert response.headers['Location'].endswith('/home')
+    with app.app_context():
+        assert bookings_for(event_id) == 1
+        assert db.session.get(Event, event_id).remaining_tickets == 0
+
+
+def test_stale_read_does_not_oversell(app, client, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    student = make_user('student')
+    event_id = make_event(organizer, total_tickets=1, remaining_tickets=0)
+    login(client, student)
+
+    # Another request took the last ticket after this one read the event
+    def stale(target, context):
+        set_committed_value(target, 'remaining_tickets', 1)
+    orm_event.listen(Event, 'load', stale)
+    try:
+        response = client.post(f'/submit_booking/{event_id}', data=FORM)
+    finally:
+        orm_event.remove(Event, 'load', stale)
+
+    assert response.headers['Location'].endswith('/home')
+    with app.app_context():
+        assert bookings_for(event_id) == 0
+        assert db.session.get(Event, event_id).remaining_tickets == 0
+
+
+def group_form(size):
+    form = {'group_size': str(size)}
+    for i in range(size):
+        form[f'member_name_{i}'] = f'Member {i}'
+        form[f'member_email_{i}'] = f'member{i}@example.com'
+    return form
+
+
+def test_group_booking_takes_the_group_s_tickets(app, client, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    student = make_user('student')
+    event_id = make_event(organizer, is_group_event=True, min_group_size=2, max_group_size=5)
+    login(client, student)
+
+    response = client.post(f'/book_group/{event_id}', data=group_form(3))
+
+    assert '/group_ticket/' in response.headers['Location']
+    with app.app_context():
+        group = GroupBooking.query.filter_by(event_id=event_id).one()
+        assert group.size == 3
+        assert [member.name for member in GroupAttendee.query.order_by(GroupAttendee.position)] == \
+            ['Member 0', 'Member 1', 'Member 2']
+        assert db.session.get(Event, event_id).remaining_tickets == 7
+
+
+def test_group_larger_than_remaining_tickets_is_rejected(app, client, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    student = make_user('student')
+    event_id = make_event(organizer, remaining_tickets=2, is_group_event=True, min_group_size=2, max_group_size=5)
+    login(client, student)
+
+    response = client.post(f'/book_group/{event_id}', data=group_form(3))
+
+    assert response.headers['Location'].endswith(f'/book_group/{event_id}')
+    with app.app_context():
+        assert GroupBooking.query.count() == 0
+        assert GroupAttendee.query.count() == 0
+        assert db.session.get(Event, event_id).remaining_tickets == 2
@@ -0,0 +1,64 @@
+from cache import SimpleCache
+from conftest import login
+from extensions import cache, db
+from models import User
+
+
+def test_get_many_returns_values_in_key_order():
+    simple = SimpleCache()
+    simple.set('a', 1)
+    simple.set('gone', 2, timeout=-1)
+
+    assert simple.get_many('a', 'missing', 'gone') == [1, None, None]
+
+
+def test_simple_cache_evicts_least_recently_used_keys():
+    simple = SimpleCache(max_entries=3)
+    for key in 'abc':
+        simple.set(key, key)
+    simple.get('a')
+    simple.set('d', 'd')
+
+    assert simple.get_many('a', 'b', 'c', 'd') == ['a', None, 'c', 'd']
+
+
+def test_simple_cache_sweeps_expired_keys_before_evicting():
+    simple = SimpleCache(max_entries=3)
+    simple.set('a', 'a')
+    simple.set('expired', 'x', timeout=-1)
+    simple.set('b', 'b')
+    simple.set('c', 'c')
+
+    assert simple.get_many('a', 'b', 'c') == ['a', 'b', 'c']
+    assert len(simple._data) == 3
+
+
+def test_load_user_reads_version_stamps_in_one_call(app, client, make_user, monkeypatch):
+    alice = make_user('alice')
+    login(client, alice)
+    client.get('/api/unread')
+
+    with app.app_context():
+        calls = []
+        real_get, real_get_many = cache.get, cache.get_many
+        monkeypatch.setattr(cache._get_current_object(), 'get', lambda key: calls.append(key) or real_get(key))
+        monkeypatch.setattr(cache._get_current_object(), 'get_many',
+                            lambda *keys: calls.append(keys) or real_get_many(*keys))
+
+    client.get('/api/unread')
+    assert calls[0] == ('user_version:all', f'user_version:{alice}')
+    assert not any(isinstance(call, str) and call.startswith('user_version') for call in calls)
+
+
+def test_renamed_user_is_reloaded(app, client, make_user):
+    alice = make_user('alice')
+    login(client, alice)
+    client.get('/api/unread')
+
+    with app.app_context():
+        db.session.get(User, alice).username = 'alice2'
+        db.session.commit()
+
+    with app.test_request_context():
+        from models import load_user
+        assert load_user(alice).username == 'alice2'
@@ -0,0 +1,59 @@
+import pytest
+
+from conftest import login
+from extensions import db
+from models import Event, Review
+
+
+@pytest.fixture
+def reviewed_event(app, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    event_id = make_event(organizer)
+    students = [make_user(f'student{n}') for n in range(30)]
+    with app.app_context():
+        db.session.add_all(
+            Review(user_id=student, event_id=event_id, rating=4, review_text='Great talks and a friendly crowd.')
+            for student in students
+        )
+        Event.query.filter_by(id=event_id).update({'rating_sum': 4 * len(students), 'rating_count': len(students)})
+        db.session.commit()
+    return event_id
+
+
+@pytest.fixture
+def compressing_app(app):
+    app.config['COMPRESS_RESPONSES'] = True
+    return app
+
+
+@pytest.mark.parametrize('logged_in', [True, False])
+def test_compressed_reviews_revalidate_with_304(compressing_app, client, make_user, reviewed_event, logged_in):
+    if logged_in:
+        login(client, make_user('reader'))
+    url = f'/event_reviews/{reviewed_event}'
+
+    first = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert first.status_code == 200
+    assert first.headers['Content-Encoding'] == 'gzip'
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+
+    second = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+
+
+def test_new_review_changes_the_etag(app, client, make_user, reviewed_event):
+    url = f'/event_reviews/{reviewed_event}'
+    etag = client.get(url).headers['ETag']
+
+    with app.app_context():
+        db.session.add(Review(user_id=make_user('late'), event_id=reviewed_event, rating=5))
+        Event.query.filter_by(id=reviewed_event).update({
+            'rating_sum': Event.rating_sum + 5, 'rating_count': Event.rating_count + 1
+        })
+        db.session.commit()
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['total_reviews'] == 31
@@ -0,0 +1,107 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import login
+from models import Event
+
+FUTURE = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d %H:%M')
+PAST = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M')
+
+
+def event_row(**fields):
+    row = {
+        'title': 'Imported', 'description': 'From a file', 'location': 'Hall 2', 'price': '50',
+        'date': FUTURE, 'total_tickets': '100', 'category': 'Technical', 'is_group_event': 'false',
+        'min_group_size': '', 'max_group_size': '',
+    }
+    row.update(fields)
+    return row
+
+
+def csv_file(rows):
+    header = list(rows[0])
+    lines = [','.join(header)] + [','.join(row[column] for column in header) for row in rows]
+    return io.BytesIO('\n'.join(lines).encode('utf-8')), 'events.csv'
+
+
+def json_file(data):
+    return io.BytesIO(json.dumps(data).encode('utf-8')), 'events.json'
+
+
+@pytest.fixture
+def organizer_client(client, make_user):
+    login(client, make_user('organizer', role='organizer'))
+    return client
+
+
+def test_csv_imports_valid_rows_and_reports_the_rest(app, organizer_client):
+    upload = csv_file([
+        event_row(title='Good'),
+        event_row(title='No price', price=''),
+        event_row(title='Bad price', price='free'),
+        event_row(title='Past', date=PAST),
+        event_row(title='Group', is_group_event='true', min_group_size='3', max_group_size='6'),
+    ])
+
+    response = organizer_client.post('/events/import', data={'file': upload}, content_type='multipart/form-data')
+
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'Imported 2 events; 3 rows skipped.' in body
+    # Row numbers count the header as row 1
+    assert '<td class="text-gray-400">3</td>' in body
+    assert 'Please fill in all required fields' in body
+    assert 'Invalid price or ticket quantity' in body
+    assert 'Event date must be in the future' in body
+    with app.app_context():
+        events = {event.title: event for event in Event.query.all()}
+        assert set(events) == {'Good', 'Group'}
+        assert events['Good'].status == 'pending'
+        assert events['Good'].remaining_tickets == 100
+        assert (events['Group'].min_group_size, events['Group'].max_group_size) == (3, 6)
+
+
+@pytest.mark.parametrize('data', [
+    [event_row(title='One'), event_row(title='Two')],
+    {'events': [event_row(title='One'), event_row(title='Two')]},
+])
+def test_json_list_or_events_object(app, organizer_client, data):
+    response = organizer_client.post('/events/import', data={'file': json_file(data)},
+                                     content_type='multipart/form-data')
+
+    assert 'Imported 2 events.' in response.get_data(as_text=True)
+    with app.app_context():
+        assert sorted(event.title for event in Event.query.all()) == ['One', 'Two']
+
+
+def test_json_rows_that_are_not_objects_are_reported(app, organizer_client):
+    response = organizer_client.post('/events/import', data={'file': json_file([event_row(), 'oops'])},
+                                     content_type='multipart/form-data')
+
+    body = response.get_data(as_text=True)
+    assert 'Imported 1 event; 1 row skipped.' in body
+    assert 'Please fill in all required fields' in body
+
+
+@pytest.mark.parametrize('content', [b'{not json', b'{"title": "Not a list"}'])
+def test_unreadable_json_imports_nothing(app, organizer_client, content):
+    response = organizer_client.post('/events/import', data={'file': (io.BytesIO(content), 'events.json')},
+                                     content_type='multipart/form-data')
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert Event.query.count() == 0
+
+
+def test_import_is_for_organizers(app, client, make_user):
+    login(client, make_user('student'))
+
+    response = client.post('/events/import', data={'file': csv_file([event_row()])},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert Event.query.count() == 0
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from conftest import login
+from extensions import db
+from models import Message
+
+
+def add_messages(app, alice, bob, count):
+    start = datetime(2026, 1, 1)
+    with app.app_context():
+        # Pairs of messages share a timestamp, so paging must use the id tie-breaker
+        db.session.add_all(
+            Message(sender_id=alice if n % 2 else bob, receiver_id=bob if n % 2 else alice,
+                    content=f'message {n}', timestamp=start + timedelta(seconds=n // 2))
+            for n in range(count)
+        )
+        db.session.commit()
+
+
+def test_history_pages_through_every_message_once(app, client, make_user):
+    alice, bob = make_user('alice'), make_user('bob')
+    add_messages(app, alice, bob, 125)
+    login(client, alice)
+
+    seen = []
+    cursor = None
+    while True:
+        query = {'limit': 50, 'before': cursor} if cursor else {'limit': 50}
+        page = client.get(f'/api/messages/{bob}/history', query_string=query).get_json()
+        # Each page is oldest first and older than everything seen so far
+        ids = [message['id'] for message in page['messages']]
+        assert ids == sorted(ids)
+        seen = ids + seen
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(seen) == 125
+    assert seen == sorted(set(seen))
+
+
+def test_history_rejects_a_malformed_cursor(client, make_user):
+    alice, bob = make_user('alice'), make_user('bob')
+    login(client, alice)
+
+    response = client.get(f'/api/messages/{bob}/history', query_string={'before': 'not-a-cursor'})
+
+    assert response.status_code == 400
+
+
+def test_new_messages_after_id(app, client, make_user):
+    alice, bob = make_user('alice'), make_user('bob')
+    add_messages(app, alice, bob, 10)
+    login(client, alice)
+
+    first = client.get(f'/api/messages/{bob}/new').get_json()
+    assert len(first['messages']) == 10
+
+    add_messages(app, alice, bob, 3)
+    update = client.get(f'/api/messages/{bob}/new', query_string={'after_id': first['last_id']}).get_json()
+    assert [message['id'] for message in update['messages']] == [11, 12, 13]
@@ -0,0 +1,28 @@
+import pytest
+
+
+def test_metrics_is_off_without_a_token(app, client):
+    app.config['METRICS_TOKEN'] = None
+
+    assert client.get('/metrics').status_code == 404
+
+
+@pytest.mark.parametrize('authorization, status', [
+    (None, 401),
+    ('Bearer wrong', 401),
+    ('Bearer s3cret', 200),
+])
+def test_metrics_requires_the_token(app, client, authorization, status):
+    app.config['METRICS_TOKEN'] = 's3cret'
+    headers = {'Authorization': authorization} if authorization else {}
+
+    assert client.get('/metrics', headers=headers).status_code == status
+
+
+def test_pool_gauges_are_labelled_by_pool(app, client, make_user):
+    app.config['METRICS_TOKEN'] = 's3cret'
+    make_user('alice')
+
+    body = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).get_data(as_text=True)
+
+    assert 'db_pool_size{pool="primary"}' in body
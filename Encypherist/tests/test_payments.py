@@ -0,0 +1,38 @@
+from conftest import login
+from extensions import db
+from models import Booking, PaymentEvent
+
+DETAILS = {'name': 'Asha', 'email': 'asha@example.com', 'mobile': '9999999999', 'branch': 'CSE', 'year': '2'}
+
+
+def test_process_payment_stores_details_from_payment_step(app, client, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    student = make_user('student')
+    event_id = make_event(organizer, price=100.0)
+    login(client, student)
+    with client.session_transaction() as session:
+        session['booking_details'] = {'event_id': event_id, **DETAILS}
+
+    response = client.get(f'/process_payment/{event_id}?paymentId=PAY-1&PayerID=PAYER-1')
+
+    assert response.status_code == 302
+    assert '/payment/pending/PAY-1' in response.headers['Location']
+    with app.app_context():
+        booking = Booking.query.filter_by(payment_id='PAY-1').one()
+        assert booking.payment_status == 'pending'
+        assert (booking.name, booking.email, booking.mobile, booking.branch, booking.year) == tuple(DETAILS.values())
+        assert PaymentEvent.query.filter_by(payment_id='PAY-1').count() == 1
+
+
+def test_process_payment_without_details_asks_for_them(app, client, make_user, make_event):
+    organizer = make_user('organizer', role='organizer')
+    student = make_user('student')
+    event_id = make_event(organizer, price=100.0)
+    login(client, student)
+
+    response = client.get(f'/process_payment/{event_id}?paymentId=PAY-2&PayerID=PAYER-2')
+
+    assert response.status_code == 302
+    assert f'/book_event/{event_id}' in response.headers['Location']
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Booking)) == 0
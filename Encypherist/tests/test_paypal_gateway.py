@@ -0,0 +1,98 @@
+import threading
+from argparse import Namespace
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.fake_paypal import FakePayPal
+from payments import CircuitBreaker, GatewayUnavailable, create_gateway
+
+
+class CountingPayPal(FakePayPal):
+    """The fake PayPal, counting connections and calls, and optionally expiring the first token."""
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def simulate_provider(self):
+        self.server.calls.append(self.path)
+        return super().simulate_provider()
+
+    def do_POST(self):
+        if self.path.endswith('/execute') and self.server.expire_first_token:
+            self.server.expire_first_token = False
+            self.simulate_provider()
+            return self.send_json(401, {'error': 'invalid_token'})
+        return super().do_POST()
+
+
+@pytest.fixture
+def paypal():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), type('Handler', (CountingPayPal,), {
+        'options': Namespace(latency=0.0, fail_rate=0.0, hang_rate=0.0),
+        'executed': set(),
+        'lock': threading.Lock(),
+    }))
+    server.daemon_threads = True
+    server.connections = 0
+    server.calls = []
+    server.expire_first_token = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def gateway_for(server, **options):
+    host, port = server.server_address
+    return create_gateway(base_url=f'http://{host}:{port}', client_id='id', client_secret='secret', **options)
+
+
+def test_calls_reuse_one_pooled_connection(paypal):
+    gateway = gateway_for(paypal)
+
+    for n in range(3):
+        assert gateway.execute_payment(f'PAY-{n}', 'PAYER')['state'] == 'approved'
+
+    assert paypal.calls.count('/v1/oauth2/token') == 1
+    assert paypal.connections == 1
+
+
+def test_expired_token_is_refreshed_and_the_call_retried(paypal):
+    gateway = gateway_for(paypal)
+    paypal.expire_first_token = True
+
+    assert gateway.execute_payment('PAY-1', 'PAYER')['state'] == 'approved'
+    assert paypal.calls == [
+        '/v1/oauth2/token', '/v1/payments/payment/PAY-1/execute',
+        '/v1/oauth2/token', '/v1/payments/payment/PAY-1/execute',
+    ]
+
+
+def test_breaker_opens_after_repeated_failures(paypal):
+    paypal.RequestHandlerClass.options.fail_rate = 1.0
+    gateway = gateway_for(paypal, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+
+    for _ in range(5):
+        with pytest.raises(GatewayUnavailable):
+            gateway.execute_payment('PAY-1', 'PAYER')
+
+    assert len(paypal.calls) == 3
+    assert gateway.breaker.state == 'open'
+
+
+def test_half_open_trial_that_raises_does_not_block_later_calls(paypal, monkeypatch):
+    gateway = gateway_for(paypal, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    gateway.breaker.record_failure()
+    assert gateway.breaker.state == 'half-open'
+
+    def broken_request(*args, **kwargs):
+        raise ValueError('unexpected')
+    monkeypatch.setattr(gateway._get_session(), 'request', broken_request)
+    with pytest.raises(ValueError):
+        gateway.execute_payment('PAY-1', 'PAYER')
+    monkeypatch.undo()
+
+    assert gateway.breaker.allow()
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from commands import hot_queries
+from extensions import db
+from query_plans import _SQLITE_SCAN, explain, sequential_scans
+
+
+@pytest.fixture
+def connection():
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        connection.exec_driver_sql('CREATE TABLE event (id INTEGER PRIMARY KEY, date TEXT, title TEXT)')
+        connection.exec_driver_sql('CREATE INDEX ix_event_date ON event (date)')
+        yield connection
+    engine.dispose()
+
+
+@pytest.mark.parametrize('statement, scanned', [
+    ('SELECT * FROM event', True),
+    ("SELECT * FROM event WHERE date > '2026'", False),
+    ('SELECT id, date FROM event ORDER BY date', False),
+])
+def test_sqlite_scan_pattern_on_real_plans(connection, statement, scanned):
+    plan = explain(connection, text(statement))
+
+    assert any(_SQLITE_SCAN.match(line) for line in plan) == scanned
+
+
+def test_table_scans_are_reported(connection):
+    assert sequential_scans(connection, text('SELECT * FROM event')) == ['event']
+    assert sequential_scans(connection, text("SELECT * FROM event WHERE title = 'x'")) == ['event']
+
+
+@pytest.mark.parametrize('statement', [
+    "SELECT count(*) FROM (SELECT id FROM event WHERE date > '2026' "
+    "UNION ALL SELECT id FROM event WHERE date < '2020') AS roster",
+    "WITH recent AS MATERIALIZED (SELECT * FROM event WHERE date > '2026') SELECT * FROM recent",
+])
+def test_scans_of_subqueries_are_not_reported(connection, statement):
+    plan = explain(connection, text(statement))
+
+    # The subquery is read back with a plain SCAN line, which the pattern alone would flag
+    assert any(_SQLITE_SCAN.match(line) for line in plan)
+    assert sequential_scans(connection, text(statement)) == []
+
+
+def test_subquery_over_an_unindexed_filter_is_still_reported(connection):
+    statement = text("SELECT count(*) FROM (SELECT id FROM event WHERE title = 'x' "
+                     "UNION ALL SELECT id FROM event WHERE date < '2020') AS roster")
+
+    assert sequential_scans(connection, statement) == ['event']
+
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        connection = db.session.connection()
+        scanned = {name: tables for name, statement in hot_queries(1, 2, 1, 1).items()
+                   if (tables := sequential_scans(connection, statement))}
+
+    assert scanned == {}
+
+
+def test_check_query_plans_passes_on_a_seeded_database(app):
+    result = app.test_cli_runner().invoke(args=['check-query-plans', '--seed', '200'])
+
+    assert result.exit_code == 0, result.output
+    assert 'All hot queries use an index' in result.output
@@ -0,0 +1,32 @@
+import logging
+
+from conftest import login
+from extensions import db
+from models import Message
+
+
+def test_repeated_queries_are_logged_as_possible_n_plus_one(app, client, make_user, caplog):
+    alice = make_user('alice')
+    others = [make_user(f'user{n}') for n in range(6)]
+    with app.app_context():
+        db.session.add_all(Message(sender_id=other, receiver_id=alice, content='hi') for other in others)
+        db.session.commit()
+    login(client, alice)
+
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        client.get('/messages')
+
+    assert any('Possible N+1 in messaging.messages' in record.getMessage() for record in caplog.records)
+
+
+def test_perf_page_renders_and_keeps_json(app, client, make_user):
+    login(client, make_user('admin', role='admin'))
+    client.get('/messages')
+
+    page = client.get('/admin/perf')
+    data = client.get('/admin/perf?format=json').get_json()
+
+    assert page.status_code == 200
+    assert page.mimetype == 'text/html'
+    assert 'messaging.messages' in page.get_data(as_text=True)
+    assert data['routes']['messaging.messages']['requests'] == 1
@@ -0,0 +1,76 @@
+import pytest
+from flask import jsonify
+
+from conftest import login
+from database import read_only, replica_router
+from extensions import db
+from models import Event
+
+
+def event_titles():
+    return jsonify(sorted(db.session.scalars(db.select(Event.title))))
+
+
+@pytest.fixture
+def routes(app):
+    @read_only
+    def read():
+        return event_titles()
+
+    @read_only
+    def write_then_read():
+        db.session.execute(db.update(Event).values(location='Moved'))
+        db.session.commit()
+        return event_titles()
+
+    def create():
+        db.session.add(Event(title='Created', description='-', location='-', price=0, date=db.func.now(),
+                             total_tickets=1, remaining_tickets=1))
+        db.session.commit()
+        return 'ok'
+
+    app.add_url_rule('/replica/read', 'replica_read', read)
+    app.add_url_rule('/replica/write-then-read', 'replica_write_then_read', write_then_read)
+    app.add_url_rule('/replica/create', 'replica_create', create, methods=['POST'])
+
+
+@pytest.fixture
+def replica(app, tmp_path, make_user, make_event):
+    """A second SQLite database standing in for a replica, with different rows than the primary."""
+    make_event(make_user('organizer', role='organizer'), title='On primary')
+    replica_router.configure([f"sqlite:///{tmp_path / 'replica.db'}"], lambda url: {})
+    engine = replica_router.engines[0]
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(db.insert(Event).values(
+            title='On replica', description='-', location='-', price=0, date=db.func.now(),
+            total_tickets=1, remaining_tickets=1
+        ))
+    yield engine
+    engine.dispose()
+    replica_router.configure([], None)
+
+
+def test_read_only_views_read_from_the_replica(client, routes, replica):
+    assert client.get('/replica/read').get_json() == ['On replica']
+
+
+def test_writes_and_later_reads_in_the_request_use_the_primary(app, client, routes, replica):
+    assert client.get('/replica/write-then-read').get_json() == ['On primary']
+    with app.app_context():
+        assert db.session.scalar(db.select(Event.location)) == 'Moved'
+    with replica.connect() as connection:
+        assert connection.scalar(db.select(Event.location)) == '-'
+
+
+def test_recent_writers_read_from_the_primary(client, routes, replica, make_user):
+    login(client, make_user('alice'))
+    client.post('/replica/create')
+
+    assert client.get('/replica/read').get_json() == ['Created', 'On primary']
+
+
+def test_reads_fall_back_to_the_primary_without_replicas(client, routes, make_user, make_event):
+    make_event(make_user('organizer', role='organizer'), title='On primary')
+
+    assert client.get('/replica/read').get_json() == ['On primary']
@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import login
+from response_cache import cached_response
+
+
+@pytest.fixture
+def counted(app):
+    """A cached view tagged with the event table that counts how often it runs."""
+    calls = []
+
+    @cached_response(timeout=60, tags=('event',), query_args=('page',))
+    def view():
+        calls.append(1)
+        return f'render {len(calls)}'
+
+    app.add_url_rule('/cached', 'cached', view, methods=['GET', 'POST'])
+    return calls
+
+
+def test_repeated_get_is_served_from_the_cache(client, counted):
+    first = client.get('/cached')
+    second = client.get('/cached')
+
+    assert first.get_data(as_text=True) == second.get_data(as_text=True) == 'render 1'
+    assert len(counted) == 1
+    assert client.get('/cached', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+
+def test_only_listed_query_args_make_a_new_entry(client, counted):
+    client.get('/cached?page=2')
+    client.get('/cached?page=2&utm_source=mail')
+    client.get('/cached?page=3')
+
+    assert len(counted) == 2
+
+
+def test_commit_to_a_tagged_table_invalidates(client, counted, make_user, make_event):
+    client.get('/cached')
+    make_event(make_user('organizer', role='organizer'))
+
+    assert client.get('/cached').get_data(as_text=True) == 'render 2'
+
+
+def test_logged_in_and_non_get_requests_skip_the_cache(client, counted, make_user):
+    client.get('/cached')
+    client.post('/cached')
+    login(client, make_user('alice'))
+    client.get('/cached')
+    client.get('/cached')
+
+    assert len(counted) == 4
@@ -0,0 +1,29 @@
+import pytest
+
+from models import search_users
+
+
+@pytest.fixture
+def users(app, make_user):
+    for username in ('Alice', 'Sal', 'bob', 'alfred', 'Malibu'):
+        make_user(username)
+
+
+@pytest.mark.parametrize('search_query, expected', [
+    # Too short for the trigram table
+    ('al', ['Alice', 'alfred', 'Sal', 'Malibu']),
+    ('AL', ['Alice', 'alfred', 'Sal', 'Malibu']),
+    # Served by the trigram table
+    ('ali', ['Alice', 'Malibu']),
+    ('LIB', ['Malibu']),
+])
+def test_search_is_case_insensitive_substring_match(app, users, search_query, expected):
+    with app.app_context():
+        assert [user.username for user in search_users(search_query)] == expected
+
+
+def test_search_escapes_like_wildcards(app, make_user):
+    make_user('a_b')
+    make_user('axb')
+    with app.app_context():
+        assert [user.username for user in search_users('_')] == ['a_b']